@@ -2,9 +2,12 @@
 Fetch alerts for UI
 """
 
-from fastapi import APIRouter, Query
-from typing import List, Optional
-from app.models.api import AlertResponse
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal, Optional
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, page_response
+from app.models.api import AlertResponse, IncidentResponse
+from app.models.core import AlertStatus
 from app.services.alerts import alert_service
 
 router = APIRouter()
@@ -13,25 +16,48 @@ router = APIRouter()
 @router.get("", response_model=List[AlertResponse])
 async def list_alerts(
     table_id: Optional[int] = Query(None, description="Filter by table ID"),
-    status: Optional[str] = Query(None, description="Filter by status"),
+    status: Optional[AlertStatus] = Query(None, description="Filter by status"),
+    cursor: Optional[str] = Query(None, description=f"{NEXT_CURSOR_HEADER} from the previous page"),
     limit: int = Query(100, ge=1, le=1000)
 ):
     """
-    Get list of alerts
-    TODO: Fetch from database with filters
+    Get alerts, newest first, one keyset page at a time
+    The next page's cursor is returned in the X-Next-Cursor header
     """
-    alerts = alert_service.get_active_alerts(table_id)
-    # Placeholder - will be replaced with DB query
-    return []
+    alerts = await asyncio.to_thread(
+        alert_service.store.list_alerts,
+        table_id,
+        status.value if status else None,
+        decode_cursor(cursor),
+        limit
+    )
+    return page_response(alerts, limit)
+
+
+@router.get("/incidents", response_model=List[IncidentResponse])
+async def list_incidents(
+    connection_id: Optional[int] = Query(None, description="Filter by connection ID"),
+    status: Optional[Literal["active", "resolved"]] = Query(None, description="Filter by status"),
+    cursor: Optional[str] = Query(None, description=f"{NEXT_CURSOR_HEADER} from the previous page"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Get incidents (alerts grouped per connection), newest first, one keyset page at a time"""
+    incidents = await asyncio.to_thread(
+        alert_service.store.list_incidents, connection_id, status, decode_cursor(cursor), limit
+    )
+    return page_response(incidents, limit)
+
+
+@router.get("/suppressions")
+async def list_suppressions():
+    """Get open alert suppression windows per connection and table"""
+    return await asyncio.to_thread(alert_service.get_suppressions)
 
 
 @router.get("/{alert_id}", response_model=AlertResponse)
 async def get_alert(alert_id: int):
-    """
-    Get a specific alert
-    TODO: Fetch from database
-    """
-    # Placeholder
-    from fastapi import HTTPException
-    raise HTTPException(status_code=404, detail="Alert not found")
-
+    """Get a specific alert"""
+    alert = await asyncio.to_thread(alert_service.store.get_alert, alert_id)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return alert
@@ -2,11 +2,12 @@
 DB connection setup endpoints
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List
 from app.models.api import ConnectionCreate, ConnectionResponse
 from app.db.replica_db import replica_db_manager
 from app.services.safety import SafetyGuardrails
+from app.services.scheduler import scheduler_service
 
 router = APIRouter()
 
@@ -31,6 +32,31 @@ async def get_connection(connection_id: int):
     raise HTTPException(status_code=404, detail="Connection not found")
 
 
+@router.get("/{connection_id}/load")
+def get_connection_load(connection_id: int, bucket_seconds: int = Query(10, ge=1, le=600)):
+    """
+    Get the expected queries-per-second histogram for a connection's schedule
+    """
+    return scheduler_service.expected_load(connection_id, bucket_seconds)
+
+
+@router.get("/{connection_id}/guardrails")
+async def get_connection_guardrails(connection_id: int):
+    """
+    Get query slot usage (in-flight, peak, rejected), admission queue stats
+    and the cached replica lag / backpressure state
+    """
+    replica_conn = replica_db_manager.get_connection(connection_id)
+    if not replica_conn:
+        raise HTTPException(status_code=404, detail="Connection not found")
+    
+    return {
+        "guardrails": replica_conn.get_guardrail_stats(),
+        "admission": replica_conn.get_admission_stats(),
+        "lag": replica_conn.lag.get_stats()
+    }
+
+
 @router.post("", response_model=ConnectionResponse, status_code=201)
 async def create_connection(connection: ConnectionCreate):
     """
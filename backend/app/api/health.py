@@ -3,6 +3,7 @@ Health check endpoint
 """
 
 from fastapi import APIRouter
+from app.db.pulse_db import pulse_db
 
 router = APIRouter()
 
@@ -12,3 +13,8 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+
+@router.get("/health/db")
+async def db_health():
+    """Pulse DB pool utilization and wait times"""
+    return {"pools": pulse_db.get_pool_stats()}
@@ -0,0 +1,80 @@
+"""
+Prometheus metrics endpoint
+"""
+
+from fastapi import APIRouter, Response
+from app.db.pulse_db import pulse_db
+from app.db.replica_db import replica_db_manager
+from app.utils.metrics import CONTENT_TYPE, metrics
+
+router = APIRouter()
+
+# Read from the pools, guardrails and lag trackers at scrape time
+POOL_SIZE = metrics.gauge("pulse_pool_connections", "Open connections (idle + in use)", ("pool",))
+POOL_IN_USE = metrics.gauge("pulse_pool_in_use_connections", "Connections checked out", ("pool",))
+POOL_MAX_SIZE = metrics.gauge("pulse_pool_max_connections", "Pool size limit", ("pool",))
+POOL_UTILIZATION = metrics.gauge("pulse_pool_utilization_ratio", "in_use / max_size", ("pool",))
+POOL_REQUESTS = metrics.counter("pulse_pool_requests_total", "Connection checkouts", ("pool",))
+POOL_WAITS = metrics.counter("pulse_pool_waits_total", "Checkouts that waited for a free connection", ("pool",))
+POOL_TIMEOUTS = metrics.counter("pulse_pool_timeouts_total", "Checkouts that gave up waiting", ("pool",))
+GUARDRAIL_REJECTIONS = metrics.counter(
+    "pulse_guardrail_rejections_total",
+    "Queries refused by a connection's guardrails",
+    ("connection_id", "reason")
+)
+GUARDRAIL_IN_FLIGHT = metrics.gauge(
+    "pulse_guardrail_in_flight_queries", "Queries running against a replica", ("connection_id",)
+)
+ADMISSION_QUEUE_DEPTH = metrics.gauge(
+    "pulse_admission_queue_depth", "Checks waiting for query budget", ("connection_id",)
+)
+ADMISSION_TIMEOUTS = metrics.counter(
+    "pulse_admission_timeouts_total", "Waits for query budget that timed out (checks skipped)", ("connection_id",)
+)
+REPLICA_LAG = metrics.gauge("pulse_replica_lag_seconds", "Last replica lag reading", ("connection_id",))
+
+_SCRAPED = (
+    POOL_SIZE, POOL_IN_USE, POOL_MAX_SIZE, POOL_UTILIZATION, POOL_REQUESTS, POOL_WAITS, POOL_TIMEOUTS,
+    GUARDRAIL_REJECTIONS, GUARDRAIL_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_TIMEOUTS, REPLICA_LAG
+)
+
+
+def collect_runtime_metrics():
+    """Refresh pool saturation, guardrail, admission and lag metrics (removed connections drop out)"""
+    for metric in _SCRAPED:
+        metric.clear()
+    
+    pools = list(pulse_db.get_pool_stats().values())
+    for connection_pools in replica_db_manager.get_pool_stats().values():
+        pools.extend(connection_pools.values())
+    for stats in pools:
+        pool = stats["name"]
+        POOL_SIZE.set(stats["size"], pool)
+        POOL_IN_USE.set(stats["in_use"], pool)
+        POOL_MAX_SIZE.set(stats["max_size"], pool)
+        POOL_UTILIZATION.set(stats["utilization"], pool)
+        POOL_REQUESTS.set(stats["requests"], pool)
+        POOL_WAITS.set(stats["waits"], pool)
+        POOL_TIMEOUTS.set(stats["timeouts"], pool)
+    
+    for connection_id, stats in replica_db_manager.get_guardrail_stats().items():
+        GUARDRAIL_IN_FLIGHT.set(stats["in_flight"], connection_id)
+        for reason, count in stats["rejected_by_reason"].items():
+            GUARDRAIL_REJECTIONS.set(count, connection_id, reason)
+    
+    for connection_id, stats in replica_db_manager.get_admission_stats().items():
+        ADMISSION_QUEUE_DEPTH.set(stats["queue_depth"], connection_id)
+        ADMISSION_TIMEOUTS.set(stats["timeouts"], connection_id)
+    
+    for connection_id, stats in replica_db_manager.get_lag_stats().items():
+        if stats["lag_seconds"] is not None:
+            REPLICA_LAG.set(stats["lag_seconds"], connection_id)
+
+
+metrics.add_collector(collect_runtime_metrics)
+
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics():
+    """Check pipeline, replica query, scheduler and pool metrics in the Prometheus text format"""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
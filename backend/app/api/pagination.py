@@ -0,0 +1,43 @@
+"""
+Cursor pagination helpers for list endpoints
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from app.db.keyset import Cursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past a row"""
+    payload = orjson.dumps([row["created_at"].isoformat(), row["id"]])
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Parse a cursor from X-Next-Cursor; 400 if it was tampered with"""
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_response(rows: List[Dict[str, Any]], limit: int) -> ORJSONResponse:
+    """
+    Serialize one page with orjson, skipping per-row model validation
+    rows: limit + 1 rows from fetch_page; the extra row only signals a next page
+    """
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1])
+    return ORJSONResponse(rows, headers=headers)
@@ -2,22 +2,44 @@
 CRUD for monitored tables
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
-from app.models.api import TableCreate, TableUpdate, TableResponse, TableStatusResponse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Literal, Optional
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, page_response
+from app.db.check_store import CheckPartitionStore
+from app.db.table_store import TableStore
+from app.models.api import (
+    TableCreate, TableUpdate, TableResponse, TableStatusResponse, CheckRollupResponse
+)
 from app.models.core import MonitorType
+from app.services.alerts import alert_service
+from app.services.table_status import table_status_service
 
 router = APIRouter()
+rollup_store = CheckPartitionStore()
+table_store = TableStore()
 
 
 @router.get("", response_model=List[TableResponse])
-async def list_tables():
+async def list_tables(
+    connection_id: Optional[int] = Query(None, description="Filter by connection ID"),
+    cursor: Optional[str] = Query(None, description=f"{NEXT_CURSOR_HEADER} from the previous page"),
+    limit: int = Query(100, ge=1, le=1000)
+):
     """
-    Get list of all monitored tables
-    TODO: Fetch from database
+    Get monitored tables, newest first, one keyset page at a time
+    Status and last check time come from the table_status cache
     """
-    # Placeholder - will be replaced with DB query
-    return []
+    tables = await asyncio.to_thread(
+        table_store.list_tables, connection_id, decode_cursor(cursor), limit
+    )
+    statuses = await table_status_service.get_many(table["id"] for table in tables)
+    for table in tables:
+        status = statuses.get(table["id"])
+        table["status"] = status["status"] if status else "unknown"
+        table["last_check_at"] = status["last_check_at"] if status else None
+    return page_response(tables, limit)
 
 
 @router.get("/{table_id}", response_model=TableResponse)
@@ -64,8 +86,27 @@ async def delete_table(table_id: int):
 async def get_table_status(table_id: int):
     """
     Get table status for dashboard (green/yellow/red)
-    TODO: Fetch status from database
+    Served from the table_status projection through an in-process cache,
+    plus the table's newest active alerts
     """
-    # Placeholder
-    raise HTTPException(status_code=404, detail="Table not found")
+    status = await table_status_service.get(table_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Table not found")
+    recent_alerts = await asyncio.to_thread(alert_service.get_active_alerts, table_id, 10)
+    return {**status, "recent_alerts": recent_alerts}
 
+
+@router.get("/{table_id}/history", response_model=List[CheckRollupResponse])
+async def get_table_history(
+    table_id: int,
+    granularity: Literal["hour", "day"] = "hour",
+    days: int = Query(7, ge=1, le=365)
+):
+    """
+    Get success rate and volume history for dashboard charts
+    Served from the hourly/daily rollups, never from raw checks
+    """
+    end = datetime.now(timezone.utc)
+    return await asyncio.to_thread(
+        rollup_store.load_rollups, table_id, granularity, end - timedelta(days=days), end
+    )
@@ -0,0 +1,294 @@
+"""
+Alert persistence in the Pulse DB
+"""
+
+from typing import Any, Dict, List, Optional
+from psycopg.types.json import Jsonb
+from app.db.keyset import Cursor, fetch_page
+from app.db.pulse_db import PulseDB, pulse_db
+
+_SELECT_ALERTS = """
+    SELECT id, table_id, monitor_type, message, status, incident_id, created_at, resolved_at
+    FROM alerts
+"""
+
+_SELECT_INCIDENTS = """
+    SELECT id, connection_id, status, alert_count, created_at, last_alert_at, resolved_at
+    FROM incidents
+"""
+
+# One statement per batch of evaluated checks: bump or reset the shared
+# failure counters, open an alert where a counter reached the threshold and
+# the table or its connection is not suppressed (the partial unique index
+# makes a concurrent duplicate a no-op), and resolve
+# active alerts of passing checks. Rows are locked in key order, so
+# concurrent batches cannot deadlock. active_id is the alert that is active
+# after the statement; CTE writes are invisible to the outer query, so the
+# pre-existing active alert is read separately.
+_EVALUATE_ALERTS = """
+    WITH input AS (
+        SELECT c.*, EXISTS (
+            SELECT 1 FROM alert_suppressions s
+            WHERE s.expires_at > NOW()
+              AND ((s.scope = 'table' AND s.target_id = c.table_id)
+                OR (s.scope = 'connection' AND s.target_id = c.connection_id))
+        ) AS suppressed
+        FROM jsonb_to_recordset(%(checks)s)
+            AS c(table_id integer, connection_id integer, monitor_type text, failed boolean, message text)
+    ), counters AS (
+        INSERT INTO alert_state AS s (table_id, monitor_type, consecutive_failures, updated_at)
+        SELECT table_id, monitor_type, CASE WHEN failed THEN 1 ELSE 0 END, NOW()
+        FROM input
+        ORDER BY table_id, monitor_type
+        ON CONFLICT (table_id, monitor_type) DO UPDATE SET
+            consecutive_failures = CASE
+                WHEN EXCLUDED.consecutive_failures = 1 THEN s.consecutive_failures + 1
+                ELSE 0
+            END,
+            updated_at = NOW()
+        RETURNING table_id, monitor_type, consecutive_failures
+    ), opened AS (
+        INSERT INTO alerts (table_id, monitor_type, message, status)
+        SELECT i.table_id, i.monitor_type, i.message, 'active'
+        FROM input i
+        JOIN counters c USING (table_id, monitor_type)
+        WHERE i.failed AND NOT i.suppressed AND c.consecutive_failures >= %(threshold)s
+        ORDER BY i.table_id, i.monitor_type
+        ON CONFLICT (table_id, monitor_type) WHERE status = 'active' DO NOTHING
+        RETURNING id, table_id, monitor_type
+    ), resolved AS (
+        UPDATE alerts a SET status = 'resolved', resolved_at = NOW()
+        FROM input i
+        WHERE NOT i.failed
+          AND a.table_id = i.table_id
+          AND a.monitor_type = i.monitor_type
+          AND a.status = 'active'
+        RETURNING a.id, a.table_id, a.monitor_type
+    )
+    SELECT
+        c.table_id,
+        c.monitor_type,
+        c.consecutive_failures,
+        i.failed AND i.suppressed AS suppressed,
+        o.id AS opened_id,
+        r.id AS resolved_id,
+        COALESCE(o.id, CASE WHEN r.id IS NULL THEN existing.id END) AS active_id
+    FROM counters c
+    JOIN input i USING (table_id, monitor_type)
+    LEFT JOIN opened o USING (table_id, monitor_type)
+    LEFT JOIN resolved r USING (table_id, monitor_type)
+    LEFT JOIN alerts existing
+        ON existing.table_id = c.table_id
+       AND existing.monitor_type = c.monitor_type
+       AND existing.status = 'active'
+"""
+
+# Resolve the active incidents of connections with newly opened alerts whose
+# last alert is older than the grouping window, so the new alerts open a
+# fresh incident instead of joining one kept open by a long-running alert.
+# Separate from the grouping upsert, which could not see this update within
+# one statement. Rows are locked in connection order.
+_CLOSE_STALE_INCIDENTS = """
+    UPDATE incidents SET status = 'resolved', resolved_at = NOW()
+    WHERE id IN (
+        SELECT inc.id
+        FROM incidents inc
+        WHERE inc.status = 'active'
+          AND inc.last_alert_at < NOW() - make_interval(secs => %(window_seconds)s)
+          AND inc.connection_id IN (
+              SELECT t.connection_id
+              FROM alerts a
+              JOIN tables t ON t.id = a.table_id
+              WHERE a.id = ANY(%(alert_ids)s)
+          )
+        ORDER BY inc.connection_id
+        FOR UPDATE
+    )
+"""
+
+# Attach newly opened alerts to their connection's active incident, opening
+# one where there is none, so an outage on a replica is one incident however
+# many tables it hits. Incidents are upserted in connection order.
+_GROUP_INCIDENTS = """
+    WITH opened AS (
+        SELECT a.id AS alert_id, t.connection_id
+        FROM alerts a
+        JOIN tables t ON t.id = a.table_id
+        WHERE a.id = ANY(%(alert_ids)s)
+    ), incident AS (
+        INSERT INTO incidents AS inc (connection_id, alert_count)
+        SELECT connection_id, COUNT(*)
+        FROM opened
+        GROUP BY connection_id
+        ORDER BY connection_id
+        ON CONFLICT (connection_id) WHERE status = 'active' DO UPDATE SET
+            alert_count = inc.alert_count + EXCLUDED.alert_count,
+            last_alert_at = NOW()
+        RETURNING id, connection_id
+    )
+    UPDATE alerts a SET incident_id = incident.id
+    FROM opened
+    JOIN incident USING (connection_id)
+    WHERE a.id = opened.alert_id
+    RETURNING a.id, a.incident_id
+"""
+
+# Resolve the incidents of resolved alerts that have no active alert left
+_RESOLVE_INCIDENTS = """
+    UPDATE incidents inc SET status = 'resolved', resolved_at = NOW()
+    WHERE inc.status = 'active'
+      AND inc.id IN (SELECT incident_id FROM alerts WHERE id = ANY(%(alert_ids)s))
+      AND NOT EXISTS (
+          SELECT 1 FROM alerts a WHERE a.incident_id = inc.id AND a.status = 'active'
+      )
+"""
+
+# Open or extend (never shorten) a suppression window; opened is false if one was already open
+_SUPPRESS = """
+    WITH previous AS (
+        SELECT expires_at FROM alert_suppressions
+        WHERE scope = %(scope)s AND target_id = %(target_id)s AND expires_at > NOW()
+    )
+    INSERT INTO alert_suppressions AS s (scope, target_id, reason, expires_at)
+    VALUES (%(scope)s, %(target_id)s, %(reason)s, NOW() + make_interval(secs => %(seconds)s))
+    ON CONFLICT (scope, target_id) DO UPDATE SET
+        reason = EXCLUDED.reason,
+        expires_at = GREATEST(s.expires_at, EXCLUDED.expires_at)
+    RETURNING NOT EXISTS (SELECT 1 FROM previous) AS opened
+"""
+
+
+class AlertStore:
+    """Durable alert state and keyset-paginated alert reads"""
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def list_alerts(
+        self,
+        table_id: Optional[int] = None,
+        status: Optional[str] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Get alerts newest first (limit + 1 rows; see fetch_page)"""
+        return fetch_page(
+            self.db, _SELECT_ALERTS, {"table_id": table_id, "status": status}, after, limit
+        )
+    
+    def evaluate(
+        self,
+        checks: List[Dict[str, Any]],
+        threshold: int,
+        grouping_window_seconds: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Apply a batch of check outcomes to alert state and incidents in one transaction
+        checks: dicts with table_id, connection_id, monitor_type, failed, message; at most one
+        per (table_id, monitor_type)
+        Returns per check: table_id, monitor_type, consecutive_failures, suppressed (a failure
+        inside a suppression window), opened_id, resolved_id, active_id, incident_id (of an
+        opened alert)
+        """
+        if not checks:
+            return []
+        
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_EVALUATE_ALERTS, {"checks": Jsonb(checks), "threshold": threshold})
+                columns = [col.name for col in cur.description]
+                transitions = [dict(zip(columns, row)) for row in cur.fetchall()]
+                
+                # Incident statements only run for batches that opened or resolved alerts
+                opened = [t["opened_id"] for t in transitions if t["opened_id"] is not None]
+                resolved = [t["resolved_id"] for t in transitions if t["resolved_id"] is not None]
+                incidents = {}
+                if opened:
+                    cur.execute(
+                        _CLOSE_STALE_INCIDENTS,
+                        {"alert_ids": opened, "window_seconds": grouping_window_seconds}
+                    )
+                    cur.execute(_GROUP_INCIDENTS, {"alert_ids": opened})
+                    incidents = dict(cur.fetchall())
+                if resolved:
+                    cur.execute(_RESOLVE_INCIDENTS, {"alert_ids": resolved})
+        
+        for transition in transitions:
+            transition["incident_id"] = incidents.get(transition["opened_id"])
+        return transitions
+    
+    def list_incidents(
+        self,
+        connection_id: Optional[int] = None,
+        status: Optional[str] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Get incidents newest first (limit + 1 rows; see fetch_page)"""
+        return fetch_page(
+            self.db, _SELECT_INCIDENTS, {"connection_id": connection_id, "status": status}, after, limit
+        )
+    
+    def get_alert(self, alert_id: int) -> Optional[Dict[str, Any]]:
+        """Get one alert by id"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_SELECT_ALERTS + " WHERE id = %s", (alert_id,))
+                row = cur.fetchone()
+                if row is None:
+                    return None
+                return dict(zip([col.name for col in cur.description], row))
+    
+    def suppress(self, scope: str, target_id: int, reason: str, seconds: float) -> bool:
+        """
+        Open or extend (never shorten) a suppression window for a 'connection' or 'table'
+        Returns whether a new window was opened
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    _SUPPRESS,
+                    {"scope": scope, "target_id": target_id, "reason": reason, "seconds": seconds}
+                )
+                return cur.fetchone()[0]
+    
+    def unsuppress(self, scope: str, target_id: int):
+        """End a suppression window early"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM alert_suppressions WHERE scope = %s AND target_id = %s",
+                    (scope, target_id)
+                )
+    
+    def is_suppressed(self, table_id: int, connection_id: Optional[int] = None) -> bool:
+        """Whether the table or its connection has an open suppression window"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT EXISTS (
+                        SELECT 1 FROM alert_suppressions
+                        WHERE expires_at > NOW()
+                          AND ((scope = 'table' AND target_id = %s)
+                            OR (scope = 'connection' AND target_id = %s))
+                    )
+                    """,
+                    (table_id, connection_id)
+                )
+                return cur.fetchone()[0]
+    
+    def list_suppressions(self) -> List[Dict[str, Any]]:
+        """Get open suppression windows: scope, target_id, reason, seconds_left"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT scope, target_id, reason, EXTRACT(EPOCH FROM expires_at - NOW()) AS seconds_left
+                    FROM alert_suppressions
+                    WHERE expires_at > NOW()
+                    ORDER BY scope, target_id
+                    """
+                )
+                columns = [col.name for col in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
@@ -0,0 +1,162 @@
+"""
+Persistence for volume baselines and schema snapshots in the Pulse DB
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+from psycopg.types.json import Jsonb
+from app.db.pulse_db import PulseDB, pulse_db
+
+
+class BaselineStore:
+    """Bulk load/save of baseline state (one round trip per call)"""
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def load_volume(self, table_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Get recent volume values (oldest first) per table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT table_id, recent_values
+                    FROM volume_baselines
+                    WHERE table_id = ANY(%s)
+                    """,
+                    (list(table_ids),)
+                )
+                return {table_id: list(values) for table_id, values in cur.fetchall()}
+    
+    def save_volume(self, rows: List[Dict[str, Any]]):
+        """
+        Upsert volume baselines
+        rows: dicts with table_id, values, count, sum, sum_sq, min, max
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO volume_baselines (
+                        table_id, recent_values, sample_count,
+                        value_sum, value_sum_sq, min_value, max_value, updated_at
+                    )
+                    VALUES (
+                        %(table_id)s, %(values)s, %(count)s,
+                        %(sum)s, %(sum_sq)s, %(min)s, %(max)s, NOW()
+                    )
+                    ON CONFLICT (table_id) DO UPDATE SET
+                        recent_values = EXCLUDED.recent_values,
+                        sample_count = EXCLUDED.sample_count,
+                        value_sum = EXCLUDED.value_sum,
+                        value_sum_sq = EXCLUDED.value_sum_sq,
+                        min_value = EXCLUDED.min_value,
+                        max_value = EXCLUDED.max_value,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    rows
+                )
+    
+    def load_counters(self, table_ids: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+        """Get the last (n_tup_ins, n_tup_del) reading per table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT table_id, n_tup_ins, n_tup_del
+                    FROM table_counters
+                    WHERE table_id = ANY(%s)
+                    """,
+                    (list(table_ids),)
+                )
+                return {
+                    table_id: (n_tup_ins, n_tup_del) for table_id, n_tup_ins, n_tup_del in cur.fetchall()
+                }
+    
+    def save_counters(self, counters: Dict[int, Tuple[int, int]]):
+        """Upsert the last counter reading per table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO table_counters (table_id, n_tup_ins, n_tup_del, updated_at)
+                    VALUES (%s, %s, %s, NOW())
+                    ON CONFLICT (table_id) DO UPDATE SET
+                        n_tup_ins = EXCLUDED.n_tup_ins,
+                        n_tup_del = EXCLUDED.n_tup_del,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    [
+                        (table_id, n_tup_ins, n_tup_del)
+                        for table_id, (n_tup_ins, n_tup_del) in counters.items()
+                    ]
+                )
+    
+    def load_seasonal(self, table_ids: Iterable[int]) -> Dict[int, Dict[str, list]]:
+        """Get seasonal models (bucket mean, dev and count) per table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT table_id, bucket_mean, bucket_dev, bucket_count
+                    FROM seasonal_models
+                    WHERE table_id = ANY(%s)
+                    """,
+                    (list(table_ids),)
+                )
+                return {
+                    table_id: {"mean": mean, "dev": dev, "count": count}
+                    for table_id, mean, dev, count in cur.fetchall()
+                }
+    
+    def save_seasonal(self, models: Dict[int, Dict[str, list]]):
+        """Upsert seasonal models"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO seasonal_models (table_id, bucket_mean, bucket_dev, bucket_count, updated_at)
+                    VALUES (%s, %s, %s, %s, NOW())
+                    ON CONFLICT (table_id) DO UPDATE SET
+                        bucket_mean = EXCLUDED.bucket_mean,
+                        bucket_dev = EXCLUDED.bucket_dev,
+                        bucket_count = EXCLUDED.bucket_count,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    [
+                        (table_id, model["mean"], model["dev"], model["count"])
+                        for table_id, model in models.items()
+                    ]
+                )
+    
+    def load_schemas(self, table_ids: Iterable[int]) -> Dict[int, dict]:
+        """Get the last schema snapshot per table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT table_id, snapshot
+                    FROM schema_snapshots
+                    WHERE table_id = ANY(%s)
+                    """,
+                    (list(table_ids),)
+                )
+                return dict(cur.fetchall())
+    
+    def save_schemas(self, snapshots: Dict[int, dict]):
+        """Upsert schema snapshots"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO schema_snapshots (table_id, snapshot, fingerprint, updated_at)
+                    VALUES (%s, %s, %s, NOW())
+                    ON CONFLICT (table_id) DO UPDATE SET
+                        snapshot = EXCLUDED.snapshot,
+                        fingerprint = EXCLUDED.fingerprint,
+                        updated_at = EXCLUDED.updated_at
+                    """,
+                    [
+                        (table_id, Jsonb(snapshot), snapshot.get("fingerprint"))
+                        for table_id, snapshot in snapshots.items()
+                    ]
+                )
@@ -0,0 +1,207 @@
+"""
+Persistence for check results in the Pulse DB
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List
+from psycopg import sql
+from psycopg.types.json import Jsonb
+from app.db.pulse_db import PulseDB, pulse_db
+
+_COPY_CHECKS = """
+    COPY checks (table_id, monitor_type, status, result_data, error_message, executed_at)
+    FROM STDIN
+"""
+
+# Recompute whole buckets in [start, end) so reruns and late rows are idempotent
+_ROLLUP_HOURLY = """
+    INSERT INTO check_rollups_hourly (
+        table_id, monitor_type, bucket_start, check_count, success_count, failure_count,
+        error_count, skipped_count, row_count_min, row_count_max, row_count_sum, row_count_samples
+    )
+    SELECT
+        table_id,
+        monitor_type,
+        date_trunc('hour', executed_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        COUNT(*),
+        COUNT(*) FILTER (WHERE status = 'success'),
+        COUNT(*) FILTER (WHERE status = 'failure'),
+        COUNT(*) FILTER (WHERE status = 'error'),
+        COUNT(*) FILTER (WHERE status = 'skipped'),
+        MIN((result_data->>'row_count')::numeric::bigint),
+        MAX((result_data->>'row_count')::numeric::bigint),
+        SUM((result_data->>'row_count')::numeric::bigint),
+        COUNT(result_data->>'row_count')
+    FROM checks
+    WHERE executed_at >= %(start)s AND executed_at < %(end)s
+    GROUP BY 1, 2, 3
+    ON CONFLICT (table_id, monitor_type, bucket_start) DO UPDATE SET
+        check_count = EXCLUDED.check_count,
+        success_count = EXCLUDED.success_count,
+        failure_count = EXCLUDED.failure_count,
+        error_count = EXCLUDED.error_count,
+        skipped_count = EXCLUDED.skipped_count,
+        row_count_min = EXCLUDED.row_count_min,
+        row_count_max = EXCLUDED.row_count_max,
+        row_count_sum = EXCLUDED.row_count_sum,
+        row_count_samples = EXCLUDED.row_count_samples
+"""
+
+# Days are rolled up from the hourly rollups, never from raw checks
+_ROLLUP_DAILY = """
+    INSERT INTO check_rollups_daily (
+        table_id, monitor_type, bucket_start, check_count, success_count, failure_count,
+        error_count, skipped_count, row_count_min, row_count_max, row_count_sum, row_count_samples
+    )
+    SELECT
+        table_id,
+        monitor_type,
+        date_trunc('day', bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        SUM(check_count),
+        SUM(success_count),
+        SUM(failure_count),
+        SUM(error_count),
+        SUM(skipped_count),
+        MIN(row_count_min),
+        MAX(row_count_max),
+        SUM(row_count_sum),
+        SUM(row_count_samples)
+    FROM check_rollups_hourly
+    WHERE bucket_start >= %(start)s AND bucket_start < %(end)s
+    GROUP BY 1, 2, 3
+    ON CONFLICT (table_id, monitor_type, bucket_start) DO UPDATE SET
+        check_count = EXCLUDED.check_count,
+        success_count = EXCLUDED.success_count,
+        failure_count = EXCLUDED.failure_count,
+        error_count = EXCLUDED.error_count,
+        skipped_count = EXCLUDED.skipped_count,
+        row_count_min = EXCLUDED.row_count_min,
+        row_count_max = EXCLUDED.row_count_max,
+        row_count_sum = EXCLUDED.row_count_sum,
+        row_count_samples = EXCLUDED.row_count_samples
+"""
+
+_ROLLUP_TABLES = {"hour": "check_rollups_hourly", "day": "check_rollups_daily"}
+
+PARTITION_PREFIX = "checks_"
+
+
+def partition_name(day: date) -> str:
+    """Name of the checks partition holding one UTC day"""
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> date:
+    """Inverse of partition_name"""
+    return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+
+
+def day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+class CheckResultStore:
+    """Writes check results to the checks table"""
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def save(self, rows: List[Dict[str, Any]]):
+        """
+        Insert check results with one COPY
+        rows: dicts with table_id, monitor_type, status, result_data, error_message, executed_at
+        """
+        if not rows:
+            return
+        
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                with cur.copy(_COPY_CHECKS) as copy:
+                    for row in rows:
+                        copy.write_row((
+                            row["table_id"],
+                            row["monitor_type"],
+                            row["status"],
+                            Jsonb(row["result_data"]),
+                            row["error_message"],
+                            row["executed_at"]
+                        ))
+
+
+class CheckPartitionStore:
+    """Daily partitions of the checks table and the rollups built from them"""
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def list_partitions(self) -> List[str]:
+        """Names of the existing checks partitions"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.relname
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'checks'::regclass
+                """)
+                return [row[0] for row in cur.fetchall()]
+    
+    def create_partitions(self, days: List[date]):
+        """Create partitions for the given UTC days (existing ones are left alone)"""
+        if not days:
+            return
+        
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                for day in days:
+                    cur.execute(
+                        sql.SQL(
+                            "CREATE TABLE IF NOT EXISTS {} PARTITION OF checks "
+                            "FOR VALUES FROM ({}) TO ({})"
+                        ).format(
+                            sql.Identifier(partition_name(day)),
+                            sql.Literal(day_start(day)),
+                            sql.Literal(day_start(day + timedelta(days=1)))
+                        )
+                    )
+    
+    def drop_partitions(self, names: List[str]):
+        """Drop whole partitions (retention); far cheaper than DELETE"""
+        if not names:
+            return
+        
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                for name in names:
+                    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(name)))
+    
+    def rollup(self, start: datetime, end: datetime):
+        """Recompute hourly rollups for [start, end), then the days they fall in"""
+        day_from = day_start(start.astimezone(timezone.utc).date())
+        day_to = day_start(end.astimezone(timezone.utc).date()) + timedelta(days=1)
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_ROLLUP_HOURLY, {"start": start, "end": end})
+                cur.execute(_ROLLUP_DAILY, {"start": day_from, "end": day_to})
+    
+    def load_rollups(
+        self,
+        table_id: int,
+        granularity: str,
+        start: datetime,
+        end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Rollup rows for one table, oldest first (granularity: hour or day)"""
+        query = sql.SQL("""
+            SELECT monitor_type, bucket_start, check_count, success_count, failure_count,
+                   error_count, skipped_count, success_rate, row_count_min, row_count_max, row_count_avg
+            FROM {}
+            WHERE table_id = %(table_id)s AND bucket_start >= %(start)s AND bucket_start < %(end)s
+            ORDER BY bucket_start, monitor_type
+        """).format(sql.Identifier(_ROLLUP_TABLES[granularity]))
+        
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(query, {"table_id": table_id, "start": start, "end": end})
+                columns = [col.name for col in cur.description]
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
@@ -0,0 +1,186 @@
+"""
+Durable, lease-based check schedule in the Pulse DB
+"""
+
+import os
+import socket
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+from app.db.pulse_db import PulseDB, pulse_db
+
+
+class ClaimedCheck(NamedTuple):
+    """A table whose checks are due, leased to this worker"""
+    table_id: int
+    connection_id: int
+    due_at: Optional[datetime] = None  # next_run_at before the claim advanced it
+
+
+# Spread each connection's tables evenly across their intervals. Mirrors
+# PhasePlanner: tables sharing an interval are interval/n apart, and interval
+# groups are shifted by a fraction of that spacing so they interleave. Each
+# table's next_run_at moves to the next point on its epoch-anchored grid.
+_PLACEMENT_QUERY = """
+    WITH ranked AS (
+        SELECT
+            table_id,
+            connection_id,
+            (interval_minutes * 60)::float8 AS period,
+            ROW_NUMBER() OVER (PARTITION BY connection_id, interval_minutes ORDER BY table_id) - 1 AS position,
+            COUNT(*) OVER (PARTITION BY connection_id, interval_minutes) AS group_size,
+            DENSE_RANK() OVER (PARTITION BY connection_id ORDER BY interval_minutes) - 1 AS group_index
+        FROM check_schedule
+        WHERE %(connection_id)s::integer IS NULL OR connection_id = %(connection_id)s
+    ), placed AS (
+        SELECT
+            table_id,
+            period,
+            period / group_size * (
+                position + group_index::float8 / (MAX(group_index) OVER (PARTITION BY connection_id) + 1)
+            ) AS phase
+        FROM ranked
+    )
+    UPDATE check_schedule s SET
+        next_run_at = to_timestamp(
+            CEIL((EXTRACT(EPOCH FROM NOW())::float8 - placed.phase) / placed.period) * placed.period + placed.phase
+        )
+    FROM placed
+    WHERE s.table_id = placed.table_id
+"""
+
+
+def default_worker_id() -> str:
+    """Identify this worker process in leases"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CheckScheduleStore:
+    """
+    Check schedule shared by every worker process
+    
+    Claiming locks due rows with FOR UPDATE SKIP LOCKED and advances their
+    next_run_at in the same statement, so concurrent workers split the due
+    set without double-running a table. The lease keeps a table from being
+    claimed again while its checks are still running, and expires if the
+    worker dies.
+    """
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def rebuild_from_tables(self) -> int:
+        """
+        Sync the schedule with the tables table and re-place every table
+        Returns the number of scheduled tables
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO check_schedule (table_id, connection_id, interval_minutes, next_run_at)
+                    SELECT id, connection_id, check_interval_minutes, NOW()
+                    FROM tables
+                    ON CONFLICT (table_id) DO UPDATE SET
+                        connection_id = EXCLUDED.connection_id,
+                        interval_minutes = EXCLUDED.interval_minutes
+                    """
+                )
+                cur.execute(_PLACEMENT_QUERY, {"connection_id": None})
+                cur.execute("SELECT COUNT(*) FROM check_schedule")
+                return cur.fetchone()[0]
+    
+    def upsert(self, table_id: int, interval_minutes: int):
+        """Schedule (or reschedule) a table and rebalance its connection"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO check_schedule (table_id, connection_id, interval_minutes, next_run_at)
+                    SELECT id, connection_id, %s, NOW()
+                    FROM tables
+                    WHERE id = %s
+                    ON CONFLICT (table_id) DO UPDATE SET
+                        interval_minutes = EXCLUDED.interval_minutes,
+                        next_run_at = EXCLUDED.next_run_at
+                    RETURNING connection_id
+                    """,
+                    (interval_minutes, table_id)
+                )
+                row = cur.fetchone()
+                if row:
+                    cur.execute(_PLACEMENT_QUERY, {"connection_id": row[0]})
+    
+    def remove(self, table_id: int):
+        """Stop scheduling a table and rebalance its connection"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM check_schedule WHERE table_id = %s RETURNING connection_id",
+                    (table_id,)
+                )
+                row = cur.fetchone()
+                if row:
+                    cur.execute(_PLACEMENT_QUERY, {"connection_id": row[0]})
+    
+    def placements(self, connection_id: int) -> List[Tuple[int, float]]:
+        """(interval_seconds, offset_seconds) for every table on a connection"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT interval_minutes * 60, EXTRACT(EPOCH FROM next_run_at)::float8
+                    FROM check_schedule
+                    WHERE connection_id = %s
+                    """,
+                    (connection_id,)
+                )
+                return [(period, epoch % period) for period, epoch in cur.fetchall()]
+    
+    def claim_due(self, worker_id: str, limit: int, lease_seconds: int) -> List[ClaimedCheck]:
+        """
+        Lease up to `limit` due tables to this worker
+        next_run_at advances by whole intervals, so missed runs are coalesced
+        and each table keeps its phase within the interval
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    WITH due AS (
+                        SELECT table_id, next_run_at
+                        FROM check_schedule
+                        WHERE next_run_at <= NOW()
+                          AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
+                        ORDER BY next_run_at
+                        LIMIT %(limit)s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    UPDATE check_schedule s SET
+                        lease_owner = %(worker_id)s,
+                        lease_expires_at = NOW() + make_interval(secs => %(lease_seconds)s),
+                        next_run_at = s.next_run_at + make_interval(mins => s.interval_minutes) * (
+                            FLOOR(EXTRACT(EPOCH FROM (NOW() - s.next_run_at)) / (s.interval_minutes * 60)) + 1
+                        )
+                    FROM due
+                    WHERE s.table_id = due.table_id
+                    RETURNING s.table_id, s.connection_id, due.next_run_at
+                    """,
+                    {"worker_id": worker_id, "limit": limit, "lease_seconds": lease_seconds}
+                )
+                return [ClaimedCheck(*row) for row in cur.fetchall()]
+    
+    def complete(self, worker_id: str, table_ids: List[int]):
+        """Release leases for finished tables"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE check_schedule SET
+                        lease_owner = NULL,
+                        lease_expires_at = NULL,
+                        last_run_at = NOW()
+                    WHERE table_id = ANY(%s)
+                      AND lease_owner = %s
+                    """,
+                    (table_ids, worker_id)
+                )
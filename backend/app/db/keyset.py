@@ -0,0 +1,47 @@
+"""
+Keyset (cursor) pagination on (created_at, id)
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from psycopg import sql
+from app.db.pulse_db import PulseDB
+
+# Position of the last row of a page: (created_at, id)
+Cursor = Tuple[datetime, int]
+
+
+def fetch_page(
+    db: PulseDB,
+    select: str,
+    filters: Dict[str, Any],
+    after: Optional[Cursor],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Get up to limit + 1 rows, newest first, strictly after the cursor
+    The extra row tells the caller whether there is a next page.
+    select: SELECT ... FROM <table> without WHERE/ORDER BY; filters: column -> value (None = no filter)
+    """
+    conditions = [
+        sql.SQL("{} = {}").format(sql.Identifier(column), sql.Placeholder(column))
+        for column, value in filters.items()
+        if value is not None
+    ]
+    params = {column: value for column, value in filters.items() if value is not None}
+    if after is not None:
+        # A row comparison keeps this a single range scan on (created_at DESC, id DESC)
+        conditions.append(sql.SQL("(created_at, id) < (%(after_created_at)s, %(after_id)s)"))
+        params["after_created_at"], params["after_id"] = after
+    params["limit"] = limit + 1
+    
+    query = sql.SQL(select)
+    if conditions:
+        query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+    query += sql.SQL(" ORDER BY created_at DESC, id DESC LIMIT %(limit)s")
+    
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            columns = [col.name for col in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
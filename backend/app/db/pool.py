@@ -0,0 +1,689 @@
+"""
+Bounded connection pools (sync and asyncio) with lifetime recycling,
+idle health checks and idle connection reaping
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Callable, Deque, Dict, Generator, List, Optional
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CONNECT_SECONDS = metrics.histogram(
+    "pulse_pool_connect_duration_seconds",
+    "Time to open and configure a physical connection",
+    ("pool",)
+)
+CONNECT_FAILURES = metrics.counter(
+    "pulse_pool_connect_failures_total",
+    "Physical connections that failed to open or configure",
+    ("pool",)
+)
+WAIT_SECONDS = metrics.histogram(
+    "pulse_pool_wait_seconds",
+    "Time requests waited for a free connection (only requests that waited)",
+    ("pool",)
+)
+
+# How often a pool blocked only by a shared limit re-checks it; the pools
+# sharing a limit wait on different kinds of condition, so they cannot notify
+SHARED_LIMIT_POLL_SECONDS = 0.05
+
+
+class PoolTimeout(TimeoutError):
+    """Raised when no connection became available before the deadline"""
+
+
+class PoolClosed(RuntimeError):
+    """Raised when acquiring from a pool that has been closed"""
+
+
+class PoolStats:
+    """Counters describing pool usage"""
+
+    def __init__(self):
+        self.connections_created = 0
+        self.requests = 0
+        self.hits = 0  # Requests served by an idle connection
+        self.waits = 0  # Requests that had to wait for a free slot
+        self.wait_time_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.timeouts = 0
+        self.recycled = 0  # Connections closed after max_lifetime
+        self.health_check_failures = 0
+        self.discarded = 0  # Connections closed because they were broken
+        self.reaped = 0  # Connections closed after sitting idle for max_idle_seconds
+        self.peak_in_use = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class SharedLimit:
+    """
+    Cap on open connections shared by several pools
+    Used so a replica's sync and async pools together stay within its
+    max_concurrent_queries guardrail instead of each getting the full cap.
+    """
+
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._open = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> int:
+        return self._open
+
+    @property
+    def waiting(self) -> int:
+        """Pools blocked on this limit; other pools hand slots over instead of idling"""
+        return self._waiting
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._open >= self.max_size:
+                return False
+            self._open += 1
+            return True
+
+    def release(self, count: int = 1):
+        with self._lock:
+            self._open -= count
+
+    def add_waiter(self):
+        with self._lock:
+            self._waiting += 1
+
+    def remove_waiter(self):
+        with self._lock:
+            self._waiting -= 1
+
+
+class _PooledConnection:
+    """A physical connection plus its bookkeeping timestamps"""
+
+    __slots__ = ("conn", "created_at", "last_used_at")
+
+    def __init__(self, conn: Any):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+
+
+class _BasePool:
+    """Configuration, stats and bookkeeping shared by the sync and async pools"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int,
+        min_size: int = 0,
+        max_idle_seconds: Optional[float] = None,
+        max_lifetime_seconds: Optional[float] = None,
+        check_idle_seconds: Optional[float] = None,
+        acquire_timeout_seconds: Optional[float] = None,
+        configure: Optional[Callable[[Any], Any]] = None,
+        check: Optional[Callable[[Any], Any]] = None,
+        reset: Optional[Callable[[Any], Any]] = None,
+        name: str = "pool",
+        limit: Optional[SharedLimit] = None
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if not 0 <= min_size <= max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+        if limit is not None and min_size > limit.max_size:
+            raise ValueError("min_size must not exceed the shared limit")
+
+        self.max_size = max_size
+        self.min_size = min_size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.check_idle_seconds = check_idle_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.name = name
+        self.limit = limit
+        self.stats = PoolStats()
+
+        self._connect = connect
+        self._configure = configure
+        self._check = check
+        self._reset = reset
+
+        self._idle: Deque[_PooledConnection] = deque()
+        self._size = 0  # Open connections, idle + in use + being created
+        self._limit_waiters = 0  # Requests here blocked only by the shared limit
+        self._closed = False
+
+    def _snapshot_stats(self) -> Dict[str, Any]:
+        stats = self.stats.as_dict()
+        in_use = self._size - len(self._idle)
+        stats.update({
+            "name": self.name,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": in_use,
+            "utilization": round(in_use / self.max_size, 3),
+            "avg_wait_ms": round(self.stats.wait_time_ms / self.stats.waits, 3) if self.stats.waits else 0.0,
+        })
+        stats["wait_time_ms"] = round(stats["wait_time_ms"], 3)
+        stats["max_wait_ms"] = round(stats["max_wait_ms"], 3)
+        return stats
+
+    def _claim_slot(self) -> bool:
+        """Count a connection about to be opened, if this pool and the shared limit allow it"""
+        if self._size >= self.max_size:
+            return False
+        if self.limit is not None and not self.limit.try_acquire():
+            return False
+        self._size += 1
+        return True
+
+    def _drop_slots(self, count: int = 1):
+        """Forget closed connections and give their slots back to the shared limit"""
+        self._size -= count
+        if self.limit is not None and count:
+            self.limit.release(count)
+
+    def _wait_timeout(self, remaining: Optional[float]) -> Optional[float]:
+        """How long to wait for a slot; poll while only the shared limit is full"""
+        if self.limit is None or self._size >= self.max_size:
+            return remaining
+        if remaining is None:
+            return SHARED_LIMIT_POLL_SECONDS
+        return min(remaining, SHARED_LIMIT_POLL_SECONDS)
+
+    def _wait_on_limit(self, waiting: bool) -> bool:
+        """Register (once) a request blocked only by the shared limit; returns whether it is registered"""
+        if waiting or self.limit is None or self._size >= self.max_size:
+            return waiting
+        self.limit.add_waiter()
+        self._limit_waiters += 1
+        return True
+
+    def _stop_waiting_on_limit(self, waiting: bool):
+        if waiting:
+            self.limit.remove_waiter()
+            self._limit_waiters -= 1
+
+    def _record_wait(self, waited_from: float):
+        waited_ms = (time.monotonic() - waited_from) * 1000
+        self.stats.wait_time_ms += waited_ms
+        self.stats.max_wait_ms = max(self.stats.max_wait_ms, waited_ms)
+        WAIT_SECONDS.observe(waited_ms / 1000, self.name)
+
+    def _record_checkout(self):
+        self.stats.peak_in_use = max(self.stats.peak_in_use, self._size - len(self._idle))
+
+    def _take_stale_idle(self) -> List[_PooledConnection]:
+        """
+        Detach connections idle longer than max_idle_seconds, keeping min_size open
+        Call with the pool's lock held; close the returned connections outside it
+        """
+        # Another pool waiting on the shared limit gets our idle connections' slots
+        handover = self.limit is not None and self.limit.waiting > self._limit_waiters
+        if self.max_idle_seconds is None and not handover:
+            return []
+
+        # Released connections are appended and reused from the right, so the
+        # longest-idle connection is always on the left
+        stale = []
+        cutoff = time.monotonic() - (self.max_idle_seconds or 0)
+        while self._idle and self._size > self.min_size and (handover or self._idle[0].last_used_at <= cutoff):
+            stale.append(self._idle.popleft())
+            self._drop_slots()
+        self.stats.reaped += len(stale)
+        return stale
+
+    def _deadline(self, timeout: Optional[float]) -> Optional[float]:
+        if timeout is None:
+            timeout = self.acquire_timeout_seconds
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _timeout_error(self) -> PoolTimeout:
+        self.stats.timeouts += 1
+        return PoolTimeout(
+            f"{self.name}: no connection available "
+            f"({self._size}/{self.max_size} in use)"
+        )
+
+    def _needs_check(self, entry: _PooledConnection) -> bool:
+        if self._check is None or self.check_idle_seconds is None:
+            return False
+        return time.monotonic() - entry.last_used_at >= self.check_idle_seconds
+
+    def _is_expired(self, entry: _PooledConnection) -> bool:
+        if self.max_lifetime_seconds is None:
+            return False
+        return time.monotonic() - entry.created_at >= self.max_lifetime_seconds
+
+    @staticmethod
+    def _is_broken(conn: Any) -> bool:
+        return bool(getattr(conn, "closed", False) or getattr(conn, "broken", False))
+
+
+class ConnectionPool(_BasePool):
+    """
+    Thread-safe bounded pool of database connections
+
+    open() pre-opens min_size connections; above that, connections idle for
+    max_idle_seconds are closed when a connection is returned (or by reap()).
+
+    connect: Opens a new physical connection
+    configure: Run once per physical connection right after it is opened
+    check: Health check for connections idle longer than check_idle_seconds
+    reset: Run when a connection is returned (e.g. to end the transaction)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+
+    def open(self):
+        """Pre-open min_size connections"""
+        opened = []
+        try:
+            while True:
+                with self._cond:
+                    if self._closed:
+                        raise PoolClosed(f"{self.name} is closed")
+                    if self._size >= self.min_size or not self._claim_slot():
+                        break
+                opened.append(self._open())
+        finally:
+            # Connections opened before a failure are kept
+            for entry in opened:
+                self._release(entry)
+
+    def reap(self) -> int:
+        """Close connections that sat idle too long; returns how many were closed"""
+        with self._cond:
+            stale = self._take_stale_idle()
+        for entry in stale:
+            self._close_quietly(entry)
+        return len(stale)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Generator[Any, None, None]:
+        """Borrow a connection (context manager)"""
+        entry = self._acquire(timeout)
+        try:
+            yield entry.conn
+        except BaseException:
+            self._release(entry)
+            raise
+        self._release(entry)
+
+    def close(self):
+        """Close idle connections and refuse new requests"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._drop_slots(len(idle))
+            self._cond.notify_all()
+
+        for entry in idle:
+            self._close_quietly(entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool counters and current occupancy"""
+        with self._cond:
+            return self._snapshot_stats()
+
+    def _acquire(self, timeout: Optional[float]) -> _PooledConnection:
+        deadline = self._deadline(timeout)
+
+        while True:
+            entry = self._reserve(deadline)
+
+            if entry is None:
+                return self._open()
+
+            if self._is_expired(entry):
+                self.stats.recycled += 1
+                self._discard(entry)
+                continue
+
+            if not self._passes_check(entry):
+                self.stats.health_check_failures += 1
+                self._discard(entry)
+                continue
+
+            self.stats.hits += 1
+            return entry
+
+    def _reserve(self, deadline: Optional[float]) -> Optional[_PooledConnection]:
+        """
+        Take an idle connection, or claim a slot to open a new one
+        Returns None when the caller should open a connection
+        """
+        with self._cond:
+            self.stats.requests += 1
+            waited_from = None
+            limit_waiting = False
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolClosed(f"{self.name} is closed")
+
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._record_checkout()
+                        return entry
+
+                    if self._claim_slot():
+                        self._record_checkout()
+                        return None
+
+                    if waited_from is None:
+                        waited_from = time.monotonic()
+                        self.stats.waits += 1
+                    limit_waiting = self._wait_on_limit(limit_waiting)
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise self._timeout_error()
+                    self._cond.wait(self._wait_timeout(remaining))
+            finally:
+                self._stop_waiting_on_limit(limit_waiting)
+                if waited_from is not None:
+                    self._record_wait(waited_from)
+
+    def _open(self) -> _PooledConnection:
+        """Open and configure a connection for a slot claimed in _reserve"""
+        conn = None
+        started = time.monotonic()
+        try:
+            conn = self._connect()
+            if self._configure:
+                self._configure(conn)
+        except BaseException:
+            CONNECT_FAILURES.inc(self.name)
+            if conn is not None:
+                self._close_quietly(_PooledConnection(conn))
+            self._free_slot()
+            raise
+
+        CONNECT_SECONDS.observe(time.monotonic() - started, self.name)
+        self.stats.connections_created += 1
+        return _PooledConnection(conn)
+
+    def _release(self, entry: _PooledConnection):
+        """Return a connection to the pool, or close it if it is unusable"""
+        if self._is_broken(entry.conn):
+            self.stats.discarded += 1
+            self._discard(entry)
+            return
+
+        if self._reset:
+            try:
+                self._reset(entry.conn)
+            except Exception as e:
+                logger.warning(f"{self.name}: discarding connection after failed reset: {e}")
+                self.stats.discarded += 1
+                self._discard(entry)
+                return
+
+        if self._is_expired(entry):
+            self.stats.recycled += 1
+            self._discard(entry)
+            return
+
+        entry.last_used_at = time.monotonic()
+        with self._cond:
+            if self._closed:
+                self._drop_slots()
+                closing = [entry]
+            else:
+                self._idle.append(entry)
+                closing = self._take_stale_idle()
+            self._cond.notify()
+
+        for stale in closing:
+            self._close_quietly(stale)
+
+    def _passes_check(self, entry: _PooledConnection) -> bool:
+        if not self._needs_check(entry):
+            return True
+        try:
+            self._check(entry.conn)
+            return True
+        except Exception as e:
+            logger.info(f"{self.name}: idle connection failed health check: {e}")
+            return False
+
+    def _discard(self, entry: _PooledConnection):
+        self._close_quietly(entry)
+        self._free_slot()
+
+    def _free_slot(self):
+        with self._cond:
+            self._drop_slots()
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(entry: _PooledConnection):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+
+class AsyncConnectionPool(_BasePool):
+    """
+    asyncio-native bounded pool of database connections
+
+    Same contract as ConnectionPool, but connect/configure/check/reset
+    are coroutine functions and waiting never blocks the event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cond = asyncio.Condition()
+
+    async def open(self):
+        """Pre-open min_size connections"""
+        opened = []
+        try:
+            while True:
+                async with self._cond:
+                    if self._closed:
+                        raise PoolClosed(f"{self.name} is closed")
+                    if self._size >= self.min_size or not self._claim_slot():
+                        break
+                opened.append(await self._open())
+        finally:
+            # Connections opened before a failure are kept
+            for entry in opened:
+                await self._release(entry)
+
+    async def reap(self) -> int:
+        """Close connections that sat idle too long; returns how many were closed"""
+        async with self._cond:
+            stale = self._take_stale_idle()
+        for entry in stale:
+            await self._close_quietly(entry)
+        return len(stale)
+
+    @asynccontextmanager
+    async def connection(self, timeout: Optional[float] = None) -> AsyncGenerator[Any, None]:
+        """Borrow a connection (async context manager)"""
+        entry = await self._acquire(timeout)
+        try:
+            yield entry.conn
+        except BaseException:
+            await self._release(entry)
+            raise
+        await self._release(entry)
+
+    async def close(self):
+        """Close idle connections and refuse new requests"""
+        async with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._drop_slots(len(idle))
+            self._cond.notify_all()
+
+        for entry in idle:
+            await self._close_quietly(entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool counters and current occupancy"""
+        return self._snapshot_stats()
+
+    async def _acquire(self, timeout: Optional[float]) -> _PooledConnection:
+        deadline = self._deadline(timeout)
+
+        while True:
+            entry = await self._reserve(deadline)
+
+            if entry is None:
+                return await self._open()
+
+            if self._is_expired(entry):
+                self.stats.recycled += 1
+                await self._discard(entry)
+                continue
+
+            if not await self._passes_check(entry):
+                self.stats.health_check_failures += 1
+                await self._discard(entry)
+                continue
+
+            self.stats.hits += 1
+            return entry
+
+    async def _reserve(self, deadline: Optional[float]) -> Optional[_PooledConnection]:
+        """
+        Take an idle connection, or claim a slot to open a new one
+        Returns None when the caller should open a connection
+        """
+        async with self._cond:
+            self.stats.requests += 1
+            waited_from = None
+            limit_waiting = False
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolClosed(f"{self.name} is closed")
+
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._record_checkout()
+                        return entry
+
+                    if self._claim_slot():
+                        self._record_checkout()
+                        return None
+
+                    if waited_from is None:
+                        waited_from = time.monotonic()
+                        self.stats.waits += 1
+                    limit_waiting = self._wait_on_limit(limit_waiting)
+
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise self._timeout_error()
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), self._wait_timeout(remaining))
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._stop_waiting_on_limit(limit_waiting)
+                if waited_from is not None:
+                    self._record_wait(waited_from)
+
+    async def _open(self) -> _PooledConnection:
+        """Open and configure a connection for a slot claimed in _reserve"""
+        conn = None
+        started = time.monotonic()
+        try:
+            conn = await self._connect()
+            if self._configure:
+                await self._configure(conn)
+        except BaseException:
+            CONNECT_FAILURES.inc(self.name)
+            if conn is not None:
+                await self._close_quietly(_PooledConnection(conn))
+            await self._free_slot()
+            raise
+
+        CONNECT_SECONDS.observe(time.monotonic() - started, self.name)
+        self.stats.connections_created += 1
+        return _PooledConnection(conn)
+
+    async def _release(self, entry: _PooledConnection):
+        """Return a connection to the pool, or close it if it is unusable"""
+        if self._is_broken(entry.conn):
+            self.stats.discarded += 1
+            await self._discard(entry)
+            return
+
+        if self._reset:
+            try:
+                await self._reset(entry.conn)
+            except Exception as e:
+                logger.warning(f"{self.name}: discarding connection after failed reset: {e}")
+                self.stats.discarded += 1
+                await self._discard(entry)
+                return
+
+        if self._is_expired(entry):
+            self.stats.recycled += 1
+            await self._discard(entry)
+            return
+
+        entry.last_used_at = time.monotonic()
+        async with self._cond:
+            if self._closed:
+                self._drop_slots()
+                closing = [entry]
+            else:
+                self._idle.append(entry)
+                closing = self._take_stale_idle()
+            self._cond.notify()
+
+        for stale in closing:
+            await self._close_quietly(stale)
+
+    async def _passes_check(self, entry: _PooledConnection) -> bool:
+        if not self._needs_check(entry):
+            return True
+        try:
+            await self._check(entry.conn)
+            return True
+        except Exception as e:
+            logger.info(f"{self.name}: idle connection failed health check: {e}")
+            return False
+
+    async def _discard(self, entry: _PooledConnection):
+        await self._close_quietly(entry)
+        await self._free_slot()
+
+    async def _free_slot(self):
+        async with self._cond:
+            self._drop_slots()
+            self._cond.notify()
+
+    @staticmethod
+    async def _close_quietly(entry: _PooledConnection):
+        try:
+            result = entry.conn.close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            pass
@@ -2,41 +2,166 @@
 Connection to Pulse internal Postgres database
 """
 
+import asyncio
+import logging
+import threading
 import psycopg
-from contextlib import contextmanager
-from typing import Generator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
 from app.config import settings
+from app.db.pool import AsyncConnectionPool, ConnectionPool
 
-logger = None  # Will be set up in utils.logging
+logger = logging.getLogger(__name__)
 
 
 class PulseDB:
-    """Connection manager for Pulse internal database"""
+    """
+    Connection manager for Pulse internal database
+
+    Connections come from bounded pools (sync for stores run in worker
+    threads, asyncio for code on the event loop). open() pre-opens
+    PULSE_DB_POOL_MIN_SIZE connections at startup; pools used before that
+    are created lazily, so scripts and tests need no setup.
+    """
     
     def __init__(self, connection_string: str = None):
         self.connection_string = connection_string or settings.PULSE_DATABASE_URL
+        self._pool: Optional[ConnectionPool] = None
+        self._async_pool: Optional[AsyncConnectionPool] = None
+        self._pool_lock = threading.Lock()
+    
+    @property
+    def pool(self) -> ConnectionPool:
+        """Thread-safe pool behind get_connection"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        connect=self._connect,
+                        check=self._health_check,
+                        reset=self._reset,
+                        name="pulse_db",
+                        **self._pool_options()
+                    )
+        return self._pool
+    
+    @property
+    def async_pool(self) -> AsyncConnectionPool:
+        """asyncio pool behind get_connection_async"""
+        if self._async_pool is None:
+            self._async_pool = AsyncConnectionPool(
+                connect=self._connect_async,
+                check=self._health_check_async,
+                reset=self._reset_async,
+                name="pulse_db_async",
+                **self._pool_options()
+            )
+        return self._async_pool
+    
+    @staticmethod
+    def _pool_options() -> Dict[str, Any]:
+        return {
+            "min_size": settings.PULSE_DB_POOL_MIN_SIZE,
+            "max_size": settings.PULSE_DB_POOL_MAX_SIZE,
+            "max_idle_seconds": settings.PULSE_DB_POOL_MAX_IDLE_SECONDS,
+            "max_lifetime_seconds": settings.PULSE_DB_POOL_MAX_LIFETIME_SECONDS,
+            "check_idle_seconds": settings.PULSE_DB_POOL_CHECK_IDLE_SECONDS,
+            "acquire_timeout_seconds": settings.PULSE_DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+        }
     
     @contextmanager
     def get_connection(self) -> Generator[psycopg.Connection, None, None]:
-        """Get a database connection (context manager)"""
-        conn = None
-        try:
-            conn = psycopg.connect(self.connection_string)
-            yield conn
-            conn.commit()
-        except Exception as e:
-            if conn:
+        """Get a pooled database connection (context manager); commits on success"""
+        with self.pool.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
                 conn.rollback()
-            raise
-        finally:
-            if conn:
-                conn.close()
-    
-    def get_cursor(self):
-        """Get a cursor (for use with context manager)"""
-        return self.get_connection()
+                raise
+    
+    @asynccontextmanager
+    async def get_connection_async(self) -> AsyncGenerator[psycopg.AsyncConnection, None]:
+        """Async variant of get_connection"""
+        async with self.async_pool.connection() as conn:
+            try:
+                yield conn
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+    
+    @contextmanager
+    def get_cursor(self) -> Generator[psycopg.Cursor, None, None]:
+        """Get a cursor on a pooled connection (context manager); commits on success"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                yield cur
+    
+    async def open(self):
+        """Open both pools with their minimum connections (called on startup)"""
+        await asyncio.to_thread(self.pool.open)
+        await self.async_pool.open()
+    
+    async def close(self):
+        """Close both pools (called on shutdown)"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        async_pool, self._async_pool = self._async_pool, None
+        if pool:
+            pool.close()
+        if async_pool:
+            await async_pool.close()
+    
+    async def reap_idle(self) -> int:
+        """
+        Close connections idle longer than PULSE_DB_POOL_MAX_IDLE_SECONDS
+        Busy pools reap on return; this covers pools that went quiet
+        """
+        reaped = 0
+        if self._pool is not None:
+            reaped += await asyncio.to_thread(self._pool.reap)
+        if self._async_pool is not None:
+            reaped += await self._async_pool.reap()
+        return reaped
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get pool utilization and wait-time metrics"""
+        stats = {}
+        if self._pool is not None:
+            stats["sync"] = self._pool.get_stats()
+        if self._async_pool is not None:
+            stats["async"] = self._async_pool.get_stats()
+        return stats
+    
+    def _connect(self) -> psycopg.Connection:
+        return psycopg.connect(self.connection_string)
+    
+    async def _connect_async(self) -> psycopg.AsyncConnection:
+        return await psycopg.AsyncConnection.connect(self.connection_string)
+    
+    @staticmethod
+    def _health_check(conn: psycopg.Connection):
+        """Cheap liveness probe for connections that sat idle"""
+        conn.execute("SELECT 1")
+        conn.rollback()
+    
+    @staticmethod
+    def _reset(conn: psycopg.Connection):
+        """Never hand out a connection mid-transaction"""
+        conn.rollback()
+    
+    @staticmethod
+    async def _health_check_async(conn: psycopg.AsyncConnection):
+        """Async variant of _health_check"""
+        await conn.execute("SELECT 1")
+        await conn.rollback()
+    
+    @staticmethod
+    async def _reset_async(conn: psycopg.AsyncConnection):
+        """Async variant of _reset"""
+        await conn.rollback()
 
 
 # Singleton instance
 pulse_db = PulseDB()
-
@@ -2,15 +2,152 @@
 Safe, parameterized SQL queries for monitoring checks
 """
 
-from typing import Optional, Dict, Any
+import hashlib
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from datetime import datetime
 import psycopg
 from psycopg import sql
+from app.models.core import CheckSpec, MonitorType, VolumeStrategy
+
+
+def is_batchable(spec: CheckSpec) -> bool:
+    """Whether a check can be combined into a batched UNION ALL probe"""
+    if spec.monitor_type == MonitorType.FRESHNESS:
+        return True
+    if spec.monitor_type == MonitorType.VOLUME:
+        # Estimates come from one catalog query instead
+        return spec.volume_strategy != VolumeStrategy.ESTIMATE
+    return False
 
 
 class SafeQueries:
-    """Collection of safe, parameterized queries for data health checks"""
-    
+    """
+    Collection of safe, parameterized queries for data health checks
+    Each check has a sync variant and an *_async variant for psycopg.AsyncCursor
+    """
+
+    @staticmethod
+    def _freshness_query(schema: str, table: str, time_column: str) -> sql.Composed:
+        return sql.SQL("""
+            SELECT MAX({time_column})
+            FROM {schema}.{table}
+        """).format(
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table),
+            time_column=sql.Identifier(time_column)
+        )
+
+    @staticmethod
+    def _volume_query(schema: str, table: str) -> sql.Composed:
+        return sql.SQL("""
+            SELECT COUNT(*)
+            FROM {schema}.{table}
+        """).format(
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table)
+        )
+
+    @staticmethod
+    def _windowed_volume_query(
+        schema: str,
+        table: str,
+        time_column: str,
+        window_minutes: int
+    ) -> sql.Composed:
+        return sql.SQL("""
+            SELECT COUNT(*)
+            FROM {schema}.{table}
+            WHERE {time_column} >= NOW() - make_interval(mins => {window_minutes})
+        """).format(
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table),
+            time_column=sql.Identifier(time_column),
+            window_minutes=sql.Literal(window_minutes)
+        )
+
+    # pg_class.reltuples is maintained by VACUUM/ANALYZE and replicated with the
+    # catalog; pg_stat_user_tables counters are per-instance and only populated
+    # when the monitored server itself takes the writes (i.e. not on a standby)
+    _TABLE_STATS_QUERY = """
+        SELECT
+            t.schema_name,
+            t.table_name,
+            c.reltuples::bigint,
+            s.n_live_tup,
+            s.n_tup_ins,
+            s.n_tup_del
+        FROM unnest(%s::text[], %s::text[]) AS t(schema_name, table_name)
+        JOIN pg_namespace n ON n.nspname = t.schema_name
+        JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = t.table_name
+        LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    """
+
+    # Reads pg_catalog directly: information_schema.columns is a stack of views
+    # that gets slow on databases with thousands of relations
+    _SCHEMAS_QUERY = """
+        SELECT
+            t.schema_name,
+            t.table_name,
+            a.attname,
+            format_type(a.atttypid, a.atttypmod),
+            NOT a.attnotnull,
+            pg_get_expr(d.adbin, d.adrelid)
+        FROM unnest(%s::text[], %s::text[]) AS t(schema_name, table_name)
+        JOIN pg_namespace n ON n.nspname = t.schema_name
+        JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = t.table_name
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+        LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+        ORDER BY t.schema_name, t.table_name, a.attnum
+    """
+
+    _REPLICA_LAG_QUERY = """
+        SELECT
+            EXTRACT(EPOCH FROM (NOW() - pg_last_xact_replay_timestamp())) AS lag_seconds
+        WHERE pg_is_in_recovery() = true
+    """
+
+    @staticmethod
+    def _zero_rows_query(schema: str, table: str) -> sql.Composed:
+        return sql.SQL("""
+            SELECT EXISTS(
+                SELECT 1
+                FROM {schema}.{table}
+                LIMIT 1
+            )
+        """).format(
+            schema=sql.Identifier(schema),
+            table=sql.Identifier(table)
+        )
+
+    @staticmethod
+    def _parse_schemas(rows: List[Tuple]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Group catalog rows into per-table column lists
+        Each table also gets a fingerprint of its catalog rows so callers can
+        skip column-by-column diffing when nothing changed
+        """
+        grouped: Dict[Tuple[str, str], List[Tuple]] = {}
+        for schema, table, *column in rows:
+            grouped.setdefault((schema, table), []).append(tuple(column))
+
+        schemas = {}
+        for key, columns in grouped.items():
+            schemas[key] = {
+                "columns": [
+                    {
+                        "name": name,
+                        "type": data_type,
+                        "nullable": nullable,
+                        "default": default
+                    }
+                    for name, data_type, nullable, default in columns
+                ],
+                "fingerprint": hashlib.blake2b(
+                    repr(columns).encode(), digest_size=16
+                ).hexdigest()
+            }
+        return schemas
+
     @staticmethod
     def check_freshness(
         cursor: psycopg.Cursor,
@@ -22,91 +159,173 @@ class SafeQueries:
         Check table freshness using max timestamp
         Returns the max timestamp or None if no rows
         """
-        query = sql.SQL("""
-            SELECT MAX({time_column})
-            FROM {schema}.{table}
-        """).format(
-            schema=sql.Identifier(schema),
-            table=sql.Identifier(table),
-            time_column=sql.Identifier(time_column)
-        )
-        
-        cursor.execute(query)
+        cursor.execute(SafeQueries._freshness_query(schema, table, time_column))
         result = cursor.fetchone()
         return result[0] if result and result[0] else None
-    
+
+    @staticmethod
+    async def check_freshness_async(
+        cursor: psycopg.AsyncCursor,
+        schema: str,
+        table: str,
+        time_column: str
+    ) -> Optional[datetime]:
+        """Async variant of check_freshness"""
+        await cursor.execute(SafeQueries._freshness_query(schema, table, time_column))
+        result = await cursor.fetchone()
+        return result[0] if result and result[0] else None
+
     @staticmethod
     def check_volume(cursor: psycopg.Cursor, schema: str, table: str) -> int:
         """
         Get row count for volume monitoring
         Uses count(*) - safe for indexed tables
         """
-        query = sql.SQL("""
-            SELECT COUNT(*)
-            FROM {schema}.{table}
-        """).format(
-            schema=sql.Identifier(schema),
-            table=sql.Identifier(table)
+        cursor.execute(SafeQueries._volume_query(schema, table))
+        result = cursor.fetchone()
+        return result[0] if result else 0
+
+    @staticmethod
+    async def check_volume_async(cursor: psycopg.AsyncCursor, schema: str, table: str) -> int:
+        """Async variant of check_volume"""
+        await cursor.execute(SafeQueries._volume_query(schema, table))
+        result = await cursor.fetchone()
+        return result[0] if result else 0
+
+    @staticmethod
+    def check_volume_windowed(
+        cursor: psycopg.Cursor,
+        schema: str,
+        table: str,
+        time_column: str,
+        window_minutes: int
+    ) -> int:
+        """
+        Count rows whose time_column falls in the last window_minutes
+        Bounded by an index on time_column instead of scanning the whole table
+        """
+        cursor.execute(
+            SafeQueries._windowed_volume_query(schema, table, time_column, window_minutes)
         )
-        
-        cursor.execute(query)
         result = cursor.fetchone()
         return result[0] if result else 0
-    
+
+    @staticmethod
+    async def check_volume_windowed_async(
+        cursor: psycopg.AsyncCursor,
+        schema: str,
+        table: str,
+        time_column: str,
+        window_minutes: int
+    ) -> int:
+        """Async variant of check_volume_windowed"""
+        await cursor.execute(
+            SafeQueries._windowed_volume_query(schema, table, time_column, window_minutes)
+        )
+        result = await cursor.fetchone()
+        return result[0] if result else 0
+
+    @staticmethod
+    def _table_list_params(tables: Sequence[Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+        return [t[0] for t in tables], [t[1] for t in tables]
+
+    @staticmethod
+    def _parse_table_stats(rows: List[Tuple]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        stats = {}
+        for schema, table, reltuples, n_live_tup, n_tup_ins, n_tup_del in rows:
+            # reltuples is -1 for never-analyzed tables (PG14+)
+            estimate = n_live_tup if n_live_tup else max(reltuples or 0, 0)
+            stats[(schema, table)] = {
+                "row_count": estimate,
+                "n_tup_ins": n_tup_ins,
+                "n_tup_del": n_tup_del,
+            }
+        return stats
+
+    @staticmethod
+    def fetch_table_stats(
+        cursor: psycopg.Cursor,
+        tables: Sequence[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Get estimated row counts for many tables in one catalog query
+        Returns {(schema, table): {"row_count", "n_tup_ins", "n_tup_del"}};
+        tables that don't exist are missing from the result
+        """
+        cursor.execute(SafeQueries._TABLE_STATS_QUERY, SafeQueries._table_list_params(tables))
+        return SafeQueries._parse_table_stats(cursor.fetchall())
+
+    @staticmethod
+    async def fetch_table_stats_async(
+        cursor: psycopg.AsyncCursor,
+        tables: Sequence[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Async variant of fetch_table_stats"""
+        await cursor.execute(SafeQueries._TABLE_STATS_QUERY, SafeQueries._table_list_params(tables))
+        return SafeQueries._parse_table_stats(await cursor.fetchall())
+
     @staticmethod
     def check_schema(
         cursor: psycopg.Cursor,
         schema: str,
         table: str
-    ) -> Dict[str, Any]:
+    ) -> Optional[Dict[str, Any]]:
         """
         Get schema information for a table
-        Returns column definitions
-        """
-        query = """
-            SELECT 
-                column_name,
-                data_type,
-                is_nullable,
-                column_default
-            FROM information_schema.columns
-            WHERE table_schema = %s
-              AND table_name = %s
-            ORDER BY ordinal_position
-        """
-        
-        cursor.execute(query, (schema, table))
-        columns = cursor.fetchall()
-        
-        return {
-            "columns": [
-                {
-                    "name": col[0],
-                    "type": col[1],
-                    "nullable": col[2] == "YES",
-                    "default": col[3]
-                }
-                for col in columns
-            ]
-        }
-    
+        Returns column definitions, or None if the table doesn't exist
+        """
+        schemas = SafeQueries.fetch_schemas(cursor, [(schema, table)])
+        return schemas.get((schema, table))
+
+    @staticmethod
+    async def check_schema_async(
+        cursor: psycopg.AsyncCursor,
+        schema: str,
+        table: str
+    ) -> Optional[Dict[str, Any]]:
+        """Async variant of check_schema"""
+        schemas = await SafeQueries.fetch_schemas_async(cursor, [(schema, table)])
+        return schemas.get((schema, table))
+
+    @staticmethod
+    def fetch_schemas(
+        cursor: psycopg.Cursor,
+        tables: Sequence[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Get column definitions for many tables in one catalog query
+        Returns {(schema, table): {"columns": [...], "fingerprint": str}};
+        tables that don't exist are missing from the result
+        """
+        cursor.execute(SafeQueries._SCHEMAS_QUERY, SafeQueries._table_list_params(tables))
+        return SafeQueries._parse_schemas(cursor.fetchall())
+
+    @staticmethod
+    async def fetch_schemas_async(
+        cursor: psycopg.AsyncCursor,
+        tables: Sequence[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Async variant of fetch_schemas"""
+        await cursor.execute(SafeQueries._SCHEMAS_QUERY, SafeQueries._table_list_params(tables))
+        return SafeQueries._parse_schemas(await cursor.fetchall())
+
     @staticmethod
     def check_replica_lag(cursor: psycopg.Cursor) -> Optional[float]:
         """
         Check replica lag in seconds
         Returns None if not a replica or lag cannot be determined
         """
-        # For Postgres replicas, check pg_stat_replication or replication lag
-        query = """
-            SELECT 
-                EXTRACT(EPOCH FROM (NOW() - pg_last_xact_replay_timestamp())) AS lag_seconds
-            WHERE pg_is_in_recovery() = true
-        """
-        
-        cursor.execute(query)
+        cursor.execute(SafeQueries._REPLICA_LAG_QUERY)
         result = cursor.fetchone()
         return result[0] if result else None
-    
+
+    @staticmethod
+    async def check_replica_lag_async(cursor: psycopg.AsyncCursor) -> Optional[float]:
+        """Async variant of check_replica_lag"""
+        await cursor.execute(SafeQueries._REPLICA_LAG_QUERY)
+        result = await cursor.fetchone()
+        return result[0] if result else None
+
     @staticmethod
     def check_zero_rows(
         cursor: psycopg.Cursor,
@@ -117,18 +336,102 @@ class SafeQueries:
         Check if table has zero rows
         Uses EXISTS for efficiency
         """
-        query = sql.SQL("""
-            SELECT EXISTS(
-                SELECT 1
-                FROM {schema}.{table}
-                LIMIT 1
-            )
-        """).format(
-            schema=sql.Identifier(schema),
-            table=sql.Identifier(table)
-        )
-        
-        cursor.execute(query)
+        cursor.execute(SafeQueries._zero_rows_query(schema, table))
         result = cursor.fetchone()
         return not (result[0] if result else False)
 
+    @staticmethod
+    async def check_zero_rows_async(
+        cursor: psycopg.AsyncCursor,
+        schema: str,
+        table: str
+    ) -> bool:
+        """Async variant of check_zero_rows"""
+        await cursor.execute(SafeQueries._zero_rows_query(schema, table))
+        result = await cursor.fetchone()
+        return not (result[0] if result else False)
+
+    # Batched probes: many freshness/volume checks in one round trip
+
+    @staticmethod
+    def chunk_probes(items: Sequence[Any], max_per_statement: int) -> List[List[Any]]:
+        """Split probes into groups that are each sent as one statement"""
+        return [
+            list(items[i:i + max_per_statement])
+            for i in range(0, len(items), max_per_statement)
+        ]
+
+    @staticmethod
+    def _probe_batch_query(specs: Sequence[CheckSpec]) -> sql.Composed:
+        """
+        Combine per-table aggregates with UNION ALL
+        Each row is (probe index, max timestamp, row count); freshness values are
+        cast to timestamp so differently-typed time columns share one result column
+        (sessions run in UTC, see ReplicaConnection)
+        """
+        parts = []
+        for idx, spec in enumerate(specs):
+            target = sql.SQL("{schema}.{table}").format(
+                schema=sql.Identifier(spec.schema_name),
+                table=sql.Identifier(spec.table_name)
+            )
+            if spec.monitor_type == MonitorType.FRESHNESS:
+                if not spec.time_column:
+                    raise ValueError("time_column required for freshness check")
+                part = sql.SQL(
+                    "SELECT {idx}, (SELECT MAX({time_column}) FROM {target})::timestamp, NULL::bigint"
+                ).format(
+                    idx=sql.Literal(idx),
+                    time_column=sql.Identifier(spec.time_column),
+                    target=target
+                )
+            elif spec.monitor_type == MonitorType.VOLUME and spec.volume_strategy == VolumeStrategy.WINDOWED:
+                if not spec.time_column or not spec.volume_window_minutes:
+                    raise ValueError("time_column and window required for windowed volume check")
+                part = sql.SQL(
+                    "SELECT {idx}, NULL::timestamp, (SELECT COUNT(*) FROM {target} "
+                    "WHERE {time_column} >= NOW() - make_interval(mins => {window_minutes}))"
+                ).format(
+                    idx=sql.Literal(idx),
+                    target=target,
+                    time_column=sql.Identifier(spec.time_column),
+                    window_minutes=sql.Literal(spec.volume_window_minutes)
+                )
+            elif spec.monitor_type == MonitorType.VOLUME and spec.volume_strategy == VolumeStrategy.EXACT:
+                part = sql.SQL(
+                    "SELECT {idx}, NULL::timestamp, (SELECT COUNT(*) FROM {target})"
+                ).format(idx=sql.Literal(idx), target=target)
+            else:
+                raise ValueError(f"Monitor type {spec.monitor_type} cannot be batched")
+            parts.append(part)
+
+        return sql.SQL("\nUNION ALL\n").join(parts)
+
+    @staticmethod
+    def _split_probe_rows(specs: Sequence[CheckSpec], rows: List[Tuple]) -> List[Any]:
+        """Map result rows back to the specs, in spec order"""
+        values: List[Any] = [None] * len(specs)
+        for idx, max_timestamp, row_count in rows:
+            if specs[idx].monitor_type == MonitorType.FRESHNESS:
+                values[idx] = max_timestamp
+            else:
+                values[idx] = row_count or 0
+        return values
+
+    @staticmethod
+    def run_probe_batch(cursor: psycopg.Cursor, specs: Sequence[CheckSpec]) -> List[Any]:
+        """
+        Run freshness/volume probes for many tables in one statement
+        Returns max timestamp (freshness) or row count (volume) per spec, in order
+        """
+        cursor.execute(SafeQueries._probe_batch_query(specs))
+        return SafeQueries._split_probe_rows(specs, cursor.fetchall())
+
+    @staticmethod
+    async def run_probe_batch_async(
+        cursor: psycopg.AsyncCursor,
+        specs: Sequence[CheckSpec]
+    ) -> List[Any]:
+        """Async variant of run_probe_batch"""
+        await cursor.execute(SafeQueries._probe_batch_query(specs))
+        return SafeQueries._split_probe_rows(specs, await cursor.fetchall())
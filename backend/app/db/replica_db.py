@@ -2,14 +2,42 @@
 Read-only connections to customer replicas
 """
 
+import asyncio
+import threading
+import time
 import psycopg
-from contextlib import contextmanager
-from typing import Generator, Optional, Dict
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Awaitable, Generator, Optional, Dict, Any, Tuple
 from app.config import settings
-from app.services.safety import SafetyGuardrails
+from app.db.pool import AsyncConnectionPool, ConnectionPool, SharedLimit
+from app.services.admission import AdmissionController
+from app.services.safety import ReplicaLagTracker, SafetyGuardrails
+from app.utils.metrics import metrics
 
 logger = None  # Will be set up in utils.logging
 
+# Sessions are read-only and run in UTC so timestamps compare consistently
+READONLY_SESSION_OPTIONS = "-c default_transaction_read_only=on -c TimeZone=UTC"
+
+QUERY_SECONDS = metrics.histogram(
+    "pulse_replica_query_duration_seconds",
+    "Round-trip time of replica queries, including timed-out ones",
+    ("connection_id", "query")
+)
+QUERIES = metrics.counter(
+    "pulse_replica_queries_total",
+    "Replica queries by outcome (ok, timeout, error)",
+    ("connection_id", "query", "outcome")
+)
+
+
+class QueryTimeout(TimeoutError):
+    """A replica query hit statement_timeout/lock_timeout or the client-side deadline"""
+
+    def __init__(self, message: str, elapsed_ms: float):
+        super().__init__(message)
+        self.elapsed_ms = elapsed_ms
+
 
 class ReplicaConnection:
     """Represents a connection to a customer's read replica"""
@@ -18,41 +46,242 @@ class ReplicaConnection:
         self,
         connection_string: str,
         connection_id: int,
-        guardrails: Optional[SafetyGuardrails] = None
+        guardrails: Optional[SafetyGuardrails] = None,
+        max_lifetime_seconds: Optional[int] = None
     ):
         self.connection_string = connection_string
         self.connection_id = connection_id
         self.guardrails = guardrails or SafetyGuardrails()
+        self.admission = AdmissionController(self.guardrails, connection_id)
+        self.lag = ReplicaLagTracker(connection_id)
+        self.max_lifetime_seconds = max_lifetime_seconds or settings.REPLICA_POOL_MAX_LIFETIME_SECONDS
+
+        # Pools are created lazily so registering a connection never dials the replica;
+        # together they stay within the concurrency guardrail
+        self.limit = SharedLimit(self.guardrails.max_concurrent_queries)
+        self._pool: Optional[ConnectionPool] = None
+        self._async_pool: Optional[AsyncConnectionPool] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """Bounded pool sharing the connection's concurrency guardrail with the async pool"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(
+                        connect=self._connect,
+                        max_size=self.guardrails.max_concurrent_queries,
+                        max_idle_seconds=settings.REPLICA_POOL_MAX_IDLE_SECONDS,
+                        max_lifetime_seconds=self.max_lifetime_seconds,
+                        check_idle_seconds=settings.REPLICA_POOL_CHECK_IDLE_SECONDS,
+                        acquire_timeout_seconds=settings.REPLICA_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                        configure=self._verify_readonly,
+                        check=self._health_check,
+                        reset=self._reset,
+                        name=f"replica-{self.connection_id}",
+                        limit=self.limit
+                    )
+        return self._pool
+
+    @property
+    def async_pool(self) -> AsyncConnectionPool:
+        """asyncio pool used by the checker, sharing the sync pool's limit"""
+        if self._async_pool is None:
+            self._async_pool = AsyncConnectionPool(
+                connect=self._connect_async,
+                max_size=self.guardrails.max_concurrent_queries,
+                max_idle_seconds=settings.REPLICA_POOL_MAX_IDLE_SECONDS,
+                max_lifetime_seconds=self.max_lifetime_seconds,
+                check_idle_seconds=settings.REPLICA_POOL_CHECK_IDLE_SECONDS,
+                acquire_timeout_seconds=settings.REPLICA_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                configure=self._verify_readonly_async,
+                check=self._health_check_async,
+                reset=self._reset_async,
+                name=f"replica-async-{self.connection_id}",
+                limit=self.limit
+            )
+        return self._async_pool
     
     @contextmanager
     def get_readonly_connection(self) -> Generator[psycopg.Connection, None, None]:
         """
         Get a read-only connection to the replica
-        Ensures connection is read-only and respects safety guardrails
+        Borrowed from the pool; read-only mode is verified once per physical connection
         """
-        conn = None
-        try:
-            # Connect with read-only mode
-            conn = psycopg.connect(
-                self.connection_string,
-                options="-c default_transaction_read_only=on"
-            )
-            
-            # Verify read-only
-            with conn.cursor() as cur:
-                cur.execute("SHOW transaction_read_only")
-                result = cur.fetchone()
-                if result[0] != "on":
-                    raise RuntimeError("Connection is not read-only")
-            
+        with self.pool.connection() as conn:
             yield conn
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            raise
+
+    @asynccontextmanager
+    async def get_readonly_connection_async(self) -> AsyncGenerator[psycopg.AsyncConnection, None]:
+        """
+        Get a read-only async connection to the replica
+        Waiting for a pooled connection never blocks the event loop
+        """
+        async with self.async_pool.connection() as conn:
+            yield conn
+
+    @property
+    def session_options(self) -> str:
+        """
+        libpq options for every session: read-only, UTC, and the guardrail timeout
+        enforced server-side (lock waits get half of it)
+        """
+        timeout_ms = int(self.guardrails.query_timeout_seconds * 1000)
+        return (
+            f"{READONLY_SESSION_OPTIONS}"
+            f" -c statement_timeout={timeout_ms}"
+            f" -c lock_timeout={max(timeout_ms // 2, 1)}"
+        )
+
+    async def run_with_deadline(
+        self,
+        conn: psycopg.AsyncConnection,
+        query: Awaitable[Any],
+        name: str = "query"
+    ) -> Tuple[Any, float]:
+        """
+        Await a query on conn, backing statement_timeout with a client-side deadline
+        If the server hasn't given up QUERY_CANCEL_GRACE_SECONDS after the
+        timeout, a cancel request is sent so the backend stops working.
+        name labels the query's metrics.
+        Returns (result, elapsed_ms); raises QueryTimeout
+        """
+        deadline = self.guardrails.query_timeout_seconds + settings.QUERY_CANCEL_GRACE_SECONDS
+        started = time.monotonic()
+        outcome = "error"
+        task = asyncio.ensure_future(query)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=deadline)
+            if not done:
+                outcome = "timeout"
+                await asyncio.to_thread(conn.cancel)
+                await asyncio.wait({task}, timeout=settings.QUERY_CANCEL_GRACE_SECONDS)
+                elapsed_ms = (time.monotonic() - started) * 1000
+                raise QueryTimeout(
+                    f"Query cancelled after {elapsed_ms:.0f}ms (deadline {deadline:.1f}s)",
+                    elapsed_ms
+                )
+            result = task.result()
+            outcome = "ok"
+            return result, (time.monotonic() - started) * 1000
+        except (psycopg.errors.QueryCanceled, psycopg.errors.LockNotAvailable) as e:
+            outcome = "timeout"
+            elapsed_ms = (time.monotonic() - started) * 1000
+            raise QueryTimeout(f"Query timed out after {elapsed_ms:.0f}ms: {e}", elapsed_ms) from e
         finally:
-            if conn:
-                conn.close()
+            QUERY_SECONDS.observe(time.monotonic() - started, self.connection_id, name)
+            QUERIES.inc(self.connection_id, name, outcome)
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Retrieved so an abandoned failure isn't logged as unhandled
+
+    async def reap_idle(self) -> int:
+        """Close idle pooled connections so their slots go back to the shared limit"""
+        reaped = 0
+        if self._pool is not None:
+            reaped += await asyncio.to_thread(self._pool.reap)
+        if self._async_pool is not None:
+            reaped += await self._async_pool.reap()
+        return reaped
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get pool usage (hits, waits, creations, occupancy)"""
+        stats = {}
+        if self._pool is not None:
+            stats["sync"] = self._pool.get_stats()
+        if self._async_pool is not None:
+            stats["async"] = self._async_pool.get_stats()
+        return stats
+
+    def get_admission_stats(self) -> Dict[str, Any]:
+        """Get admission queue depth and wait times"""
+        return self.admission.get_stats()
+
+    def get_guardrail_stats(self) -> Dict[str, Any]:
+        """Get in-flight, peak and rejected query counts"""
+        return self.guardrails.get_stats(self.connection_id)
+
+    def close(self):
+        """
+        Close all pooled connections
+        The async pool is closed in the background when called from the event loop
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.close()
+
+        async_pool, self._async_pool = self._async_pool, None
+        if async_pool:
+            try:
+                asyncio.get_running_loop().create_task(async_pool.close())
+            except RuntimeError:
+                pass  # No loop: its connections cannot be in use either
+
+    async def aclose(self):
+        """Close all pooled connections, waiting for the async pool"""
+        async_pool, self._async_pool = self._async_pool, None
+        self.close()
+        if async_pool:
+            await async_pool.close()
+
+    def _connect(self) -> psycopg.Connection:
+        """Open a physical connection in read-only mode with server-side timeouts"""
+        return psycopg.connect(
+            self.connection_string,
+            options=self.session_options
+        )
+
+    @staticmethod
+    def _verify_readonly(conn: psycopg.Connection):
+        """Verify the session is read-only (run once per physical connection)"""
+        with conn.cursor() as cur:
+            cur.execute("SHOW transaction_read_only")
+            result = cur.fetchone()
+        conn.rollback()
+        if result[0] != "on":
+            raise RuntimeError("Connection is not read-only")
+
+    @staticmethod
+    def _health_check(conn: psycopg.Connection):
+        """Cheap liveness probe for connections that sat idle"""
+        conn.execute("SELECT 1")
+        conn.rollback()
+
+    @staticmethod
+    def _reset(conn: psycopg.Connection):
+        """End the read transaction before the connection goes back to the pool"""
+        conn.rollback()
+
+    async def _connect_async(self) -> psycopg.AsyncConnection:
+        """Open a physical async connection in read-only mode"""
+        return await psycopg.AsyncConnection.connect(
+            self.connection_string,
+            options=self.session_options
+        )
+
+    @staticmethod
+    async def _verify_readonly_async(conn: psycopg.AsyncConnection):
+        """Async variant of _verify_readonly"""
+        async with conn.cursor() as cur:
+            await cur.execute("SHOW transaction_read_only")
+            result = await cur.fetchone()
+        await conn.rollback()
+        if result[0] != "on":
+            raise RuntimeError("Connection is not read-only")
+
+    @staticmethod
+    async def _health_check_async(conn: psycopg.AsyncConnection):
+        """Async variant of _health_check"""
+        await conn.execute("SELECT 1")
+        await conn.rollback()
+
+    @staticmethod
+    async def _reset_async(conn: psycopg.AsyncConnection):
+        """Async variant of _reset"""
+        await conn.rollback()
 
 
 class ReplicaDBManager:
@@ -68,8 +297,11 @@ class ReplicaDBManager:
         guardrails: Optional[SafetyGuardrails] = None
     ) -> ReplicaConnection:
         """Register a new replica connection"""
+        previous = self._connections.get(connection_id)
         conn = ReplicaConnection(connection_string, connection_id, guardrails)
         self._connections[connection_id] = conn
+        if previous:
+            previous.close()
         return conn
     
     def get_connection(self, connection_id: int) -> Optional[ReplicaConnection]:
@@ -79,9 +311,48 @@ class ReplicaDBManager:
     def remove_connection(self, connection_id: int):
         """Remove a connection"""
         if connection_id in self._connections:
-            del self._connections[connection_id]
+            self._connections.pop(connection_id).close()
+
+    def get_pool_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Get pool stats for every registered connection"""
+        return {
+            connection_id: conn.get_pool_stats()
+            for connection_id, conn in self._connections.items()
+        }
+
+    def get_admission_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Get admission stats for every registered connection"""
+        return {
+            connection_id: conn.get_admission_stats()
+            for connection_id, conn in self._connections.items()
+        }
+
+    def get_guardrail_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Get guardrail stats for every registered connection"""
+        return {
+            connection_id: conn.get_guardrail_stats()
+            for connection_id, conn in self._connections.items()
+        }
+
+    def get_lag_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Get the cached replica lag reading for every registered connection"""
+        return {
+            connection_id: conn.lag.get_stats()
+            for connection_id, conn in self._connections.items()
+        }
+
+    async def reap_idle(self) -> int:
+        """Close idle connections to every registered replica"""
+        reaped = 0
+        for conn in list(self._connections.values()):
+            reaped += await conn.reap_idle()
+        return reaped
+
+    async def close_all(self):
+        """Close pools for all registered connections"""
+        for conn in list(self._connections.values()):
+            await conn.aclose()
 
 
 # Singleton instance
 replica_db_manager = ReplicaDBManager()
-
@@ -0,0 +1,74 @@
+"""
+Per-table status projection in the Pulse DB
+"""
+
+from typing import Any, Dict, Iterable, List
+from psycopg.types.json import Jsonb
+from app.db.pulse_db import PulseDB, pulse_db
+
+# Merge each table's newest per-monitor results into its row; monitors not in
+# the update keep their previous result. The active alert count is read from
+# alerts (shared by all workers) in the same statement. status is a generated column.
+_APPLY_UPDATES = """
+    INSERT INTO table_status AS ts (table_id, last_checks, last_check_at, active_alert_count, updated_at)
+    SELECT u.table_id, u.last_checks, u.last_check_at,
+           (SELECT COUNT(*) FROM alerts a WHERE a.table_id = u.table_id AND a.status = 'active'),
+           NOW()
+    FROM jsonb_to_recordset(%(updates)s)
+        AS u(table_id integer, last_checks jsonb, last_check_at timestamptz)
+    ON CONFLICT (table_id) DO UPDATE SET
+        last_checks = ts.last_checks || EXCLUDED.last_checks,
+        last_check_at = GREATEST(ts.last_check_at, EXCLUDED.last_check_at),
+        active_alert_count = EXCLUDED.active_alert_count,
+        updated_at = NOW()
+"""
+
+
+class TableStatusStore:
+    """Reads and incrementally updates the table_status projection"""
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def apply(self, updates: List[Dict[str, Any]]):
+        """
+        Upsert status rows in one statement
+        updates: dicts with table_id, last_checks, last_check_at (ISO string)
+        """
+        if not updates:
+            return
+        
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_APPLY_UPDATES, {"updates": Jsonb(updates)})
+    
+    def load(self, table_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get status rows keyed by table_id
+        Tables without results yet are reported as unknown; missing tables are left out
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT t.id, t.schema_name, t.table_name,
+                           COALESCE(ts.status, 'unknown'), ts.last_check_at,
+                           COALESCE(ts.last_checks, '{}'::jsonb), COALESCE(ts.active_alert_count, 0)
+                    FROM tables t
+                    LEFT JOIN table_status ts ON ts.table_id = t.id
+                    WHERE t.id = ANY(%s)
+                    """,
+                    (list(table_ids),)
+                )
+                return {
+                    row[0]: {
+                        "id": row[0],
+                        "schema_name": row[1],
+                        "table_name": row[2],
+                        "status": row[3],
+                        "last_check_at": row[4],
+                        "last_checks": row[5],
+                        "active_alert_count": row[6]
+                    }
+                    for row in cur.fetchall()
+                }
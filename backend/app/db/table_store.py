@@ -0,0 +1,84 @@
+"""
+Monitored table configuration from the Pulse DB
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.db.keyset import Cursor, fetch_page
+from app.db.pulse_db import PulseDB, pulse_db
+from app.models.core import CheckSpec, MonitorType, VolumeStrategy
+
+logger = logging.getLogger(__name__)
+
+_SELECT_TABLES = """
+    SELECT id, connection_id, schema_name, table_name, monitor_types, time_column,
+           check_interval_minutes, volume_strategy, volume_window_minutes,
+           created_at, updated_at
+    FROM tables
+"""
+
+
+class TableStore:
+    """Loads check configuration for many tables in one query"""
+    
+    def __init__(self, db: PulseDB = None):
+        self.db = db or pulse_db
+    
+    def load_check_specs(self, table_ids: Iterable[int]) -> List[Tuple[int, CheckSpec]]:
+        """
+        Get (connection_id, spec) for every monitor of the given tables
+        Tables that no longer exist are left out
+        """
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT id, connection_id, schema_name, table_name, monitor_types,
+                           time_column, volume_strategy, volume_window_minutes
+                    FROM tables
+                    WHERE id = ANY(%s)
+                    """,
+                    (list(table_ids),)
+                )
+                return self._parse_specs(cur.fetchall())
+    
+    def list_schedules(self) -> List[Tuple[int, int, int]]:
+        """Get (table_id, connection_id, check_interval_minutes) for every monitored table"""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, connection_id, check_interval_minutes FROM tables")
+                return cur.fetchall()
+    
+    def list_tables(
+        self,
+        connection_id: Optional[int] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Get monitored tables' configuration newest first (limit + 1 rows; see fetch_page)"""
+        return fetch_page(self.db, _SELECT_TABLES, {"connection_id": connection_id}, after, limit)
+    
+    @staticmethod
+    def _parse_specs(rows) -> List[Tuple[int, CheckSpec]]:
+        specs = []
+        for (
+            table_id, connection_id, schema_name, table_name, monitor_types,
+            time_column, volume_strategy, volume_window_minutes
+        ) in rows:
+            for monitor_type in monitor_types:
+                try:
+                    monitor = MonitorType(monitor_type)
+                except ValueError:
+                    logger.warning(f"Unknown monitor type {monitor_type!r} for table {table_id}")
+                    continue
+                
+                specs.append((connection_id, CheckSpec(
+                    table_id,
+                    schema_name,
+                    table_name,
+                    monitor,
+                    time_column,
+                    VolumeStrategy(volume_strategy or VolumeStrategy.EXACT),
+                    volume_window_minutes
+                )))
+        return specs
@@ -3,9 +3,9 @@ Pydantic request/response models for API
 """
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, Field
-from app.models.core import MonitorType, CheckStatus, AlertStatus
+from app.models.core import MonitorType, CheckStatus, AlertStatus, VolumeStrategy
 
 
 # Request Models
@@ -26,6 +26,8 @@ class TableCreate(BaseModel):
     monitor_types: List[MonitorType]
     time_column: Optional[str] = None
     check_interval_minutes: int = Field(default=5, ge=1, le=60)
+    volume_strategy: VolumeStrategy = VolumeStrategy.EXACT
+    volume_window_minutes: Optional[int] = Field(None, ge=1, le=24 * 60)  # For windowed volume
 
 
 class TableUpdate(BaseModel):
@@ -33,6 +35,8 @@ class TableUpdate(BaseModel):
     monitor_types: Optional[List[MonitorType]] = None
     time_column: Optional[str] = None
     check_interval_minutes: Optional[int] = Field(None, ge=1, le=60)
+    volume_strategy: Optional[VolumeStrategy] = None
+    volume_window_minutes: Optional[int] = Field(None, ge=1, le=24 * 60)
 
 
 # Response Models
@@ -60,6 +64,8 @@ class TableResponse(BaseModel):
     monitor_types: List[MonitorType]
     time_column: Optional[str]
     check_interval_minutes: int
+    volume_strategy: VolumeStrategy = VolumeStrategy.EXACT
+    volume_window_minutes: Optional[int] = None
     last_check_at: Optional[datetime] = None
     status: str = "unknown"  # green, yellow, red
     created_at: datetime
@@ -83,6 +89,21 @@ class CheckResponse(BaseModel):
         from_attributes = True
 
 
+class CheckRollupResponse(BaseModel):
+    """Check results aggregated per hour or day"""
+    monitor_type: MonitorType
+    bucket_start: datetime
+    check_count: int
+    success_count: int
+    failure_count: int
+    error_count: int
+    skipped_count: int
+    success_rate: Optional[float]  # Excludes skipped checks; None if all were skipped
+    row_count_min: Optional[int]
+    row_count_max: Optional[int]
+    row_count_avg: Optional[float]
+
+
 class AlertResponse(BaseModel):
     """Alert response"""
     id: int
@@ -90,7 +111,22 @@ class AlertResponse(BaseModel):
     monitor_type: MonitorType
     message: str
     status: AlertStatus
+    incident_id: Optional[int] = None
+    created_at: datetime
+    resolved_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+
+class IncidentResponse(BaseModel):
+    """Alerts opened together on one connection"""
+    id: int
+    connection_id: int
+    status: str  # active or resolved
+    alert_count: int
     created_at: datetime
+    last_alert_at: datetime
     resolved_at: Optional[datetime]
     
     class Config:
@@ -102,8 +138,10 @@ class TableStatusResponse(BaseModel):
     id: int
     schema_name: str
     table_name: str
-    status: str  # green, yellow, red
+    status: str  # green, yellow, red (unknown before the first check)
     last_check_at: Optional[datetime]
+    last_checks: Dict[str, dict] = {}  # Latest result per monitor type
+    active_alert_count: int = 0
     recent_alerts: List[AlertResponse]
     
     class Config:
@@ -4,7 +4,7 @@ These represent the schema of Pulse's internal database
 """
 
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, NamedTuple
 from enum import Enum
 
 
@@ -30,6 +30,24 @@ class AlertStatus(str, Enum):
     SUPPRESSED = "suppressed"
 
 
+class VolumeStrategy(str, Enum):
+    """How volume monitors measure row counts"""
+    EXACT = "exact"  # COUNT(*) over the whole table
+    ESTIMATE = "estimate"  # Catalog statistics (pg_class / pg_stat_user_tables)
+    WINDOWED = "windowed"  # COUNT(*) of rows with time_column in the last N minutes
+
+
+class CheckSpec(NamedTuple):
+    """One monitor to run against one table"""
+    table_id: int
+    schema_name: str
+    table_name: str
+    monitor_type: MonitorType
+    time_column: Optional[str] = None
+    volume_strategy: VolumeStrategy = VolumeStrategy.EXACT
+    volume_window_minutes: Optional[int] = None
+
+
 # These are conceptual models - actual DB schema will be in migrations
 class Table:
     """A monitored table"""
@@ -42,6 +60,8 @@ class Table:
         monitor_types: list[MonitorType],
         time_column: Optional[str] = None,
         check_interval_minutes: int = 5,
+        volume_strategy: VolumeStrategy = VolumeStrategy.EXACT,
+        volume_window_minutes: Optional[int] = None,
         created_at: Optional[datetime] = None,
         updated_at: Optional[datetime] = None
     ):
@@ -52,6 +72,8 @@ class Table:
         self.monitor_types = monitor_types
         self.time_column = time_column
         self.check_interval_minutes = check_interval_minutes
+        self.volume_strategy = volume_strategy
+        self.volume_window_minutes = volume_window_minutes
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
 
@@ -0,0 +1,134 @@
+"""
+Admission control: checks wait for query budget instead of being skipped
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from app.config import settings
+from app.services.safety import SafetyGuardrails
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionTimeout(TimeoutError):
+    """The query budget did not free up before the caller's deadline"""
+
+
+class AdmissionController:
+    """
+    Per-connection queue in front of the guardrails
+
+    A query is admitted once SafetyGuardrails.try_reserve succeeds, i.e. both
+    a concurrency slot and rate budget are free; the slot is released when
+    the admitted block exits. Callers that cannot be admitted immediately
+    wait in priority order (higher first, FIFO within a priority) until
+    capacity frees up or their deadline passes. Callers hold their pooled
+    replica connection before asking for admission, never the other way round.
+    """
+    
+    def __init__(self, guardrails: SafetyGuardrails, connection_id: int):
+        self.guardrails = guardrails
+        self.connection_id = connection_id
+        
+        # Heap of [-priority, sequence, wakeup future]
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        
+        self.admitted = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.wait_time_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.peak_queue_depth = 0
+    
+    @asynccontextmanager
+    async def admit(self, priority: int = 0, deadline: Optional[float] = None) -> AsyncGenerator[None, None]:
+        """
+        Hold one query's worth of budget for the duration of the block
+        deadline: event-loop time (loop.time()) after which AdmissionTimeout is raised;
+        defaults to ADMISSION_TIMEOUT_SECONDS from now
+        """
+        await self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+    
+    async def acquire(self, priority: int = 0, deadline: Optional[float] = None):
+        """Wait for admission; pair with release()"""
+        loop = asyncio.get_running_loop()
+        if deadline is None:
+            deadline = loop.time() + settings.ADMISSION_TIMEOUT_SECONDS
+        
+        if not self._waiters and self.guardrails.try_reserve(self.connection_id, record_rejection=False):
+            self.admitted += 1
+            return
+        
+        started = loop.time()
+        entry = [-priority, next(self._sequence), loop.create_future()]
+        heapq.heappush(self._waiters, entry)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiters))
+        try:
+            while True:
+                if self._waiters[0] is entry and self.guardrails.try_reserve(
+                    self.connection_id, record_rejection=False
+                ):
+                    heapq.heappop(self._waiters)
+                    break
+                
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.guardrails.record_rejection(self.connection_id, "deadline")
+                    raise AdmissionTimeout(
+                        f"Query budget for connection {self.connection_id} "
+                        f"not available within {loop.time() - started:.1f}s"
+                    )
+                
+                # Slots free up on release, which wakes the head waiter; rate
+                # budget frees up with time, so then the head waits on a timer
+                timeout = remaining
+                if self._waiters[0] is entry and not self.guardrails.at_concurrency_limit(self.connection_id):
+                    timeout = min(remaining, max(self.guardrails.retry_after(self.connection_id), 0.01))
+                try:
+                    await asyncio.wait_for(asyncio.shield(entry[2]), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                entry[2] = loop.create_future()
+        finally:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            self._wake_head()
+        
+        waited_ms = (loop.time() - started) * 1000
+        self.admitted += 1
+        self.waited += 1
+        self.wait_time_ms += waited_ms
+        self.max_wait_ms = max(self.max_wait_ms, waited_ms)
+    
+    def release(self):
+        """Return a slot taken by acquire()"""
+        self.guardrails.release_query(self.connection_id)
+        self._wake_head()
+    
+    def _wake_head(self):
+        if self._waiters and not self._waiters[0][2].done():
+            self._waiters[0][2].set_result(None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait statistics"""
+        return {
+            "queue_depth": len(self._waiters),
+            "peak_queue_depth": self.peak_queue_depth,
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "wait_time_ms": round(self.wait_time_ms, 3),
+            "avg_wait_ms": round(self.wait_time_ms / self.waited, 3) if self.waited else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 3)
+        }
@@ -2,105 +2,179 @@
 Alert creation & suppression logic
 """
 
+import asyncio
 import logging
-from datetime import datetime
-from typing import Optional, List
-from app.models.core import MonitorType, CheckStatus, AlertStatus
-from app.db.pulse_db import pulse_db
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.config import settings
+from app.models.core import MonitorType, AlertStatus
+from app.db.alert_store import AlertStore
+from app.services.notifications import Notification, NotificationQueue, notification_queue
 
 logger = logging.getLogger(__name__)
 
 
+class AlertCheck(NamedTuple):
+    """Outcome of one check, as seen by alerting"""
+    table_id: int
+    monitor_type: MonitorType
+    failed: bool
+    message: str = ""
+    connection_id: Optional[int] = None
+
+
 class AlertService:
-    """Service for managing alerts"""
+    """
+    Service for managing alerts
     
-    def __init__(self):
-        # Track consecutive failures per table+monitor
-        self._failure_counts: dict = {}  # {f"{table_id}_{monitor_type}": count}
-        self._active_alerts: dict = {}  # {f"{table_id}_{monitor_type}": alert_id}
+    Consecutive-failure counters and active alerts live in the Pulse DB, so
+    every worker process sees the same state. evaluate() applies a whole
+    batch of check outcomes with one statement (see AlertStore.evaluate);
+    a unique index on active alerts per (table_id, monitor_type) rules out
+    duplicates across workers. The dicts below only mirror the last known
+    state for cheap, synchronous reads (dispatch priorities).
     
-    def should_alert(
+    Suppression windows are kept in the store as well. Failures on a
+    suppressed connection or table still bump their counters but do not open
+    alerts, so an unstable replica stays quiet while a failure that outlasts
+    the window alerts on its first check after it. Alerts that do open are
+    grouped per connection into incidents by the store, as long as they come
+    within INCIDENT_GROUPING_WINDOW_SECONDS of the incident's last alert.
+    """
+    
+    def __init__(
         self,
-        table_id: int,
-        monitor_type: MonitorType,
-        check_status: CheckStatus,
-        threshold: int = 2
-    ) -> bool:
-        """
-        Determine if an alert should be created
-        Requires threshold consecutive failures
-        """
-        key = f"{table_id}_{monitor_type}"
-        
-        if check_status == CheckStatus.SUCCESS:
-            # Reset failure count on success
-            self._failure_counts[key] = 0
-            return False
-        
-        # Increment failure count
-        self._failure_counts[key] = self._failure_counts.get(key, 0) + 1
+        store: Optional[AlertStore] = None,
+        notifier: Optional[NotificationQueue] = None
+    ):
+        self.store = store or AlertStore()
+        self.notifier = notifier
         
-        # Alert if we've hit the threshold
-        return self._failure_counts[key] >= threshold
+        # Mirror of the shared state for tables this process evaluated
+        self._failure_counts: Dict[Tuple[int, str], int] = {}  # {(table_id, monitor_type): count}
+        self._active_alerts: Dict[Tuple[int, str], int] = {}  # {(table_id, monitor_type): alert_id}
+        self.suppressed_failures = 0  # Failures this process evaluated inside a suppression window
     
-    def create_alert(
-        self,
-        table_id: int,
-        monitor_type: MonitorType,
-        message: str
-    ) -> int:
+    async def evaluate(self, checks: List[AlertCheck], threshold: int = 2) -> List[Dict[str, Any]]:
         """
-        Create a new alert
-        Returns alert ID
-        TODO: Store in database
+        Count failures, open alerts after threshold consecutive failures, resolve on success
+        Returns the store's per-check transitions; on a DB error, logs and returns []
         """
-        key = f"{table_id}_{monitor_type}"
-        
-        # Check if alert already exists
-        if key in self._active_alerts:
-            logger.info(f"Alert already exists for {key}, not creating duplicate")
-            return self._active_alerts[key]
+        checks_by_key = {(check.table_id, check.monitor_type.value): check for check in checks}
+        batch = {
+            key: {
+                "table_id": check.table_id,
+                "connection_id": check.connection_id,
+                "monitor_type": check.monitor_type.value,
+                "failed": check.failed,
+                "message": check.message
+            }
+            for key, check in checks_by_key.items()
+        }
+        if not batch:
+            return []
         
-        # Create new alert
-        alert_id = len(self._active_alerts) + 1  # TODO: Use DB sequence
-        self._active_alerts[key] = alert_id
+        try:
+            transitions = await asyncio.to_thread(
+                self.store.evaluate,
+                [batch[key] for key in sorted(batch)],
+                threshold,
+                settings.INCIDENT_GROUPING_WINDOW_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Failed to evaluate alerts for {len(batch)} checks: {e}")
+            return []
         
-        logger.warning(f"Alert created: {alert_id} - {message}")
-        
-        # TODO: Store in database
-        # TODO: Send email notification
-        
-        return alert_id
-    
-    def resolve_alert(
-        self,
-        table_id: int,
-        monitor_type: MonitorType
-    ):
-        """Resolve an active alert"""
-        key = f"{table_id}_{monitor_type}"
-        
-        if key in self._active_alerts:
-            alert_id = self._active_alerts[key]
-            del self._active_alerts[key]
-            logger.info(f"Alert {alert_id} resolved for {key}")
+        for transition in transitions:
+            key = (transition["table_id"], transition["monitor_type"])
+            self.suppressed_failures += transition["suppressed"]
+            self._failure_counts[key] = transition["consecutive_failures"]
+            if transition["active_id"] is not None:
+                self._active_alerts[key] = transition["active_id"]
+            else:
+                self._active_alerts.pop(key, None)
             
-            # TODO: Update in database
+            if transition["opened_id"] is not None:
+                logger.warning(
+                    f"Alert created: {transition['opened_id']} "
+                    f"(incident {transition.get('incident_id')}) - {batch[key]['message']}"
+                )
+                self._notify(transition["opened_id"], "opened", checks_by_key[key])
+            if transition["resolved_id"] is not None:
+                logger.info(f"Alert {transition['resolved_id']} resolved for {key}")
+                self._notify(transition["resolved_id"], "resolved", checks_by_key[key])
+        return transitions
     
-    def get_active_alerts(self, table_id: Optional[int] = None) -> List[dict]:
-        """
-        Get active alerts
-        TODO: Fetch from database
-        """
-        # Placeholder - will be replaced with DB query
-        return []
+    def _notify(self, alert_id: int, kind: str, check: AlertCheck):
+        """Hand the transition to the notification queue (never blocks)"""
+        if self.notifier is None:
+            return
+        self.notifier.enqueue(Notification(
+            alert_id,
+            kind,
+            check.table_id,
+            check.connection_id,
+            check.monitor_type.value,
+            check.message,
+            datetime.now(timezone.utc).isoformat()
+        ))
+    
+    def is_failing(self, table_id: int) -> bool:
+        """Whether any monitor on the table has an active alert or recent failures"""
+        for monitor_type in MonitorType:
+            key = (table_id, monitor_type.value)
+            if key in self._active_alerts or self._failure_counts.get(key, 0) > 0:
+                return True
+        return False
     
-    def suppress_alerts(self, table_id: int, reason: str):
+    def get_active_alerts(self, table_id: Optional[int] = None, limit: int = 100) -> List[dict]:
+        """Get the newest active alerts (first page only; see AlertStore.list_alerts)"""
+        return self.store.list_alerts(table_id=table_id, status=AlertStatus.ACTIVE.value, limit=limit)[:limit]
+    
+    def suppress_alerts(self, table_id: int, reason: str, seconds: Optional[float] = None):
         """Suppress alerts for a table (e.g., during replica instability)"""
-        logger.info(f"Alerts suppressed for table {table_id}: {reason}")
-        # TODO: Implement suppression logic
+        self._suppress("table", table_id, reason, seconds)
+    
+    def suppress_connection(self, connection_id: int, reason: str, seconds: Optional[float] = None):
+        """Suppress alerts for every table on a connection; extends a window that is already open"""
+        self._suppress("connection", connection_id, reason, seconds)
+    
+    def _suppress(self, scope: str, key: int, reason: str, seconds: Optional[float]):
+        seconds = settings.ALERT_SUPPRESSION_SECONDS if seconds is None else seconds
+        try:
+            opened = self.store.suppress(scope, key, reason, seconds)
+        except Exception as e:
+            logger.error(f"Failed to suppress alerts for {scope} {key}: {e}")
+            return
+        if opened:
+            logger.warning(f"Alerts suppressed for {scope} {key}: {reason}")
+    
+    def unsuppress(self, table_id: Optional[int] = None, connection_id: Optional[int] = None):
+        """End suppression windows early"""
+        if table_id is not None:
+            self.store.unsuppress("table", table_id)
+        if connection_id is not None:
+            self.store.unsuppress("connection", connection_id)
+    
+    def is_suppressed(self, table_id: int, connection_id: Optional[int] = None) -> bool:
+        """Whether alerts on the table are currently suppressed"""
+        return self.store.is_suppressed(table_id, connection_id)
+    
+    def get_suppressions(self) -> Dict[str, Any]:
+        """Get open suppression windows and how many failures this process evaluated inside them"""
+        suppressions: Dict[str, Dict[int, Dict[str, Any]]] = {"connection": {}, "table": {}}
+        for window in self.store.list_suppressions():
+            suppressions[window["scope"]][window["target_id"]] = {
+                "seconds_left": round(float(window["seconds_left"]), 1),
+                "reason": window["reason"]
+            }
+        return {
+            "connections": suppressions["connection"],
+            "tables": suppressions["table"],
+            "suppressed_failures": self.suppressed_failures
+        }
 
 
 # Singleton instance
-alert_service = AlertService()
+alert_service = AlertService(notifier=notification_queue)
 
@@ -0,0 +1,183 @@
+"""
+Seasonality-aware volume anomaly detection
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+# Per-table layout of persisted models: hour-of-week buckets, then hour-of-day
+BUCKETS_PER_TABLE = HOURS_PER_WEEK + 24
+# Sample counts only gate warm-up (min_samples), so they saturate here
+MAX_BUCKET_COUNT = np.iinfo(np.uint16).max
+
+
+class SeasonalDetector:
+    """
+    EWMA model per table and seasonal bucket, scored with NumPy across tables
+
+    Each table keeps an EWMA of its value and of the absolute deviation for
+    every hour-of-week bucket (168) and, as a faster-warming fallback, every
+    hour-of-day bucket (24). A value is anomalous when it is more than
+    `threshold` smoothed deviations away from its bucket's mean. State lives in
+    dense (tables x buckets) arrays so a whole batch is scored in one pass;
+    float32 means/deviations and uint16 counts keep that at 10 bytes per
+    table and bucket (about 100MB for 50k tables).
+    """
+    
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        threshold: float = 4.0,
+        min_samples: int = 3,
+        relative_floor: float = 0.05,
+        initial_capacity: int = 1024
+    ):
+        """
+        alpha: EWMA smoothing factor for new samples
+        threshold: Deviations from the seasonal mean that count as an anomaly
+        min_samples: Samples a bucket needs before it is trusted
+        relative_floor: Minimum deviation as a fraction of the mean, so
+            near-constant tables don't alert on tiny changes
+        """
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.relative_floor = relative_floor
+        
+        self._rows: Dict[Hashable, int] = {}  # {table key: array row}
+        self._models = {
+            buckets: self._empty(initial_capacity, buckets)
+            for buckets in (HOURS_PER_WEEK, 24)
+        }
+    
+    @staticmethod
+    def _empty(capacity: int, buckets: int) -> Dict[str, np.ndarray]:
+        return {
+            "mean": np.zeros((capacity, buckets), dtype=np.float32),
+            "dev": np.zeros((capacity, buckets), dtype=np.float32),
+            "count": np.zeros((capacity, buckets), dtype=np.uint16),
+        }
+    
+    def _row_indices(self, keys: Sequence[Hashable]) -> np.ndarray:
+        """Map table keys to array rows, growing the arrays as needed"""
+        rows = self._rows
+        for key in keys:
+            if key not in rows:
+                rows[key] = len(rows)
+        
+        capacity = self._models[24]["mean"].shape[0]
+        if len(rows) > capacity:
+            new_capacity = max(len(rows), capacity * 2)
+            for buckets, model in self._models.items():
+                grown = self._empty(new_capacity, buckets)
+                for name, values in model.items():
+                    grown[name][:capacity] = values
+                self._models[buckets] = grown
+        
+        return np.fromiter((rows[key] for key in keys), dtype=np.int64, count=len(keys))
+    
+    @staticmethod
+    def _buckets(at: datetime):
+        hour_of_week = at.weekday() * 24 + at.hour
+        return {HOURS_PER_WEEK: hour_of_week, 24: at.hour}
+    
+    def score(self, keys: Sequence[Hashable], values: Sequence[float], at: datetime) -> np.ndarray:
+        """
+        Get anomaly scores (deviations from the seasonal mean) for a batch
+        NaN where no bucket has enough history yet
+        """
+        rows = self._row_indices(keys)
+        current = np.asarray(values, dtype=np.float64)
+        scores = np.full(len(rows), np.nan)
+        bucket_of = self._buckets(at)
+        
+        # Prefer hour-of-week; fall back to hour-of-day while a week is warming up
+        for buckets in (24, HOURS_PER_WEEK):
+            model = self._models[buckets]
+            bucket = bucket_of[buckets]
+            mean = model["mean"][rows, bucket]
+            dev = model["dev"][rows, bucket]
+            ready = model["count"][rows, bucket] >= self.min_samples
+            
+            floor = np.maximum(self.relative_floor * np.abs(mean), 1.0)
+            bucket_scores = np.abs(current - mean) / np.maximum(dev, floor)
+            scores = np.where(ready, bucket_scores, scores)
+        
+        return scores
+    
+    def is_anomaly(self, keys: Sequence[Hashable], values: Sequence[float], at: datetime) -> np.ndarray:
+        """Vectorized anomaly flags for a batch (False while warming up)"""
+        scores = self.score(keys, values, at)
+        return np.nan_to_num(scores, nan=0.0) > self.threshold
+    
+    def update(self, keys: Sequence[Hashable], values: Sequence[float], at: datetime):
+        """Fold a batch of measurements into the seasonal models"""
+        rows = self._row_indices(keys)
+        current = np.asarray(values, dtype=np.float64)
+        
+        for buckets, bucket in self._buckets(at).items():
+            model = self._models[buckets]
+            count = model["count"][rows, bucket]
+            mean = model["mean"][rows, bucket]
+            dev = model["dev"][rows, bucket]
+            
+            first = count == 0
+            new_mean = np.where(first, current, mean + self.alpha * (current - mean))
+            new_dev = np.where(
+                first,
+                0.0,
+                dev + self.alpha * (np.abs(current - mean) - dev)
+            )
+            
+            model["mean"][rows, bucket] = new_mean
+            model["dev"][rows, bucket] = new_dev
+            model["count"][rows, bucket] = count + (count < MAX_BUCKET_COUNT)
+    
+    def export(self, keys: Iterable[Hashable]) -> Dict[Hashable, Dict[str, Any]]:
+        """Model state per known table, for BaselineStore.save_seasonal"""
+        keys = [key for key in keys if key in self._rows]
+        if not keys:
+            return {}
+        
+        rows = self._row_indices(keys)
+        models = (self._models[HOURS_PER_WEEK], self._models[24])
+        state = {
+            name: np.hstack([model[name][rows] for model in models])
+            for name in ("mean", "dev", "count")
+        }
+        return {
+            key: {name: values[i].tolist() for name, values in state.items()}
+            for i, key in enumerate(keys)
+        }
+    
+    def load(self, stored: Dict[Hashable, Dict[str, Any]]):
+        """
+        Restore models saved with export()
+        Buckets this process already has samples for keep their in-memory state
+        """
+        keys = [key for key, model in stored.items() if len(model["count"]) == BUCKETS_PER_TABLE]
+        if len(keys) < len(stored):
+            logger.warning(f"Ignoring {len(stored) - len(keys)} seasonal models with an unexpected bucket layout")
+        if not keys:
+            return
+        
+        rows = self._row_indices(keys)
+        state = {
+            name: np.asarray([stored[key][name] for key in keys], dtype=dtype)
+            for name, dtype in (("mean", np.float32), ("dev", np.float32), ("count", np.uint16))
+        }
+        
+        offset = 0
+        for buckets in (HOURS_PER_WEEK, 24):
+            model = self._models[buckets]
+            columns = slice(offset, offset + buckets)
+            unseen = model["count"][rows] == 0
+            for name, values in state.items():
+                model[name][rows] = np.where(unseen, values[:, columns], model[name][rows])
+            offset += buckets
@@ -2,73 +2,366 @@
 Rolling averages / baselines for anomaly detection
 """
 
+import asyncio
 import logging
-from typing import Dict, Optional, List
+from array import array
+from typing import Dict, Optional, List, Iterable, Set, Tuple
 from collections import deque
-from datetime import datetime, timedelta
+from datetime import datetime
+import numpy as np
+from app.config import settings
+from app.db.baseline_store import BaselineStore
+from app.services.anomaly import SeasonalDetector
 
 logger = logging.getLogger(__name__)
 
 
+class RollingStats:
+    """
+    Fixed-size sliding window of row counts with O(1) statistics
+    
+    Values live in an array('q') ring buffer. Mean and variance are kept with
+    Welford's update (including the sliding remove step), and min/max with
+    monotonic deques of sequence numbers, so appending and reading stats are
+    both constant time and no per-sample Python objects are retained.
+    """
+    
+    __slots__ = ("window_size", "_buffer", "_seq", "total", "_mean", "_m2", "_min_seq", "_max_seq")
+    
+    def __init__(self, window_size: int, values: Optional[List[int]] = None):
+        self.window_size = window_size
+        self._buffer = array("q", bytes(8 * window_size))
+        self._seq = 0  # Number of values ever appended
+        self.total = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        # Sequence numbers whose values are increasing (min) / decreasing (max)
+        self._min_seq: deque = deque()
+        self._max_seq: deque = deque()
+        for value in (values or [])[-window_size:]:
+            self.append(value)
+    
+    def __len__(self) -> int:
+        return min(self._seq, self.window_size)
+    
+    def _at(self, seq: int) -> int:
+        return self._buffer[seq % self.window_size]
+    
+    def append(self, value: int):
+        count = len(self)
+        slot = self._seq % self.window_size
+        
+        if count == self.window_size:
+            evicted = self._buffer[slot]
+            old_mean = self._mean
+            self._mean += (value - evicted) / count
+            self._m2 += (value - evicted) * (value - self._mean + evicted - old_mean)
+            self.total += value - evicted
+        else:
+            count += 1
+            delta = value - self._mean
+            self._mean += delta / count
+            self._m2 += delta * (value - self._mean)
+            self.total += value
+        
+        self._buffer[slot] = value
+        seq = self._seq
+        self._seq += 1
+        
+        # Drop sequence numbers that left the window, then values the new one dominates
+        oldest = self._seq - self.window_size
+        min_seq, max_seq = self._min_seq, self._max_seq
+        while min_seq and min_seq[0] < oldest:
+            min_seq.popleft()
+        while max_seq and max_seq[0] < oldest:
+            max_seq.popleft()
+        while min_seq and self._at(min_seq[-1]) >= value:
+            min_seq.pop()
+        while max_seq and self._at(max_seq[-1]) <= value:
+            max_seq.pop()
+        min_seq.append(seq)
+        max_seq.append(seq)
+    
+    @property
+    def min(self) -> Optional[int]:
+        return self._at(self._min_seq[0]) if self._min_seq else None
+    
+    @property
+    def max(self) -> Optional[int]:
+        return self._at(self._max_seq[0]) if self._max_seq else None
+    
+    def values(self) -> List[int]:
+        """Window contents, oldest first"""
+        return [self._at(seq) for seq in range(self._seq - len(self), self._seq)]
+    
+    def stats(self) -> Optional[Dict]:
+        count = len(self)
+        if count == 0:
+            return None
+        
+        return {
+            "average": self._mean,
+            "min": self.min,
+            "max": self.max,
+            "stddev": (max(self._m2, 0.0) / count) ** 0.5,
+            "count": count
+        }
+    
+    def to_row(self, table_id: int) -> Dict:
+        """Serialize for BaselineStore.save_volume"""
+        values = self.values()
+        return {
+            "table_id": table_id,
+            "values": values,
+            "count": len(values),
+            "sum": self.total,
+            "sum_sq": sum(v * v for v in values),
+            "min": self.min,
+            "max": self.max
+        }
+
+
 class BaselineService:
-    """Manages rolling baselines for anomaly detection"""
+    """
+    Manages rolling baselines for anomaly detection
     
-    def __init__(self, window_size: int = 10):
+    With a store, baselines are loaded lazily from the Pulse DB (ensure_loaded)
+    and written back in batches (flush); reads and updates stay in memory.
+    Everything is keyed by table_id, so same-named tables on different
+    connections keep separate baselines.
+    """
+    
+    def __init__(
+        self,
+        window_size: int = 10,
+        store: Optional[BaselineStore] = None,
+        detector_mode: Optional[str] = None
+    ):
         """
         window_size: Number of recent values to keep for baseline
+        store: Optional persistence; without it baselines live in memory only
+        detector_mode: "threshold" (fixed deviation from the rolling mean) or
+            "seasonal" (hour-of-day/day-of-week model, see SeasonalDetector)
         """
         self.window_size = window_size
-        # Store recent values per table: {f"{schema}.{table}": deque([values])}
-        self._volume_baselines: Dict[str, deque] = {}
-        # Store schema snapshots: {f"{schema}.{table}": schema_dict}
-        self._schema_snapshots: Dict[str, dict] = {}
+        self.store = store
+        self.detector_mode = detector_mode or settings.ANOMALY_DETECTOR
+        if self.detector_mode not in ("threshold", "seasonal"):
+            raise ValueError(f"Unknown anomaly detector: {self.detector_mode}")
+        self.seasonal = SeasonalDetector(
+            threshold=settings.SEASONAL_ANOMALY_THRESHOLD
+        ) if self.detector_mode == "seasonal" else None
+        # Recent values per table: {table_id: RollingStats}
+        self._volume_baselines: Dict[int, RollingStats] = {}
+        # Store schema snapshots: {table_id: schema_dict}
+        self._schema_snapshots: Dict[int, dict] = {}
+        # Last cumulative (n_tup_ins, n_tup_del) per table, for estimate checks
+        self._counters: Dict[int, Tuple[int, int]] = {}
+        
+        # Write-behind state; tables are only written once their stored state
+        # was loaded, so a failed load never overwrites history with a short window
+        self._loaded: Set[int] = set()
+        self._dirty_volume: Set[int] = set()
+        self._dirty_schema: Set[int] = set()
+        self._dirty_counters: Set[int] = set()
+        self._dirty_seasonal: Set[int] = set()
     
-    def record_volume(self, schema: str, table: str, row_count: int):
-        """Record a volume measurement"""
-        key = f"{schema}.{table}"
-        if key not in self._volume_baselines:
-            self._volume_baselines[key] = deque(maxlen=self.window_size)
-        
-        self._volume_baselines[key].append({
-            "row_count": row_count,
-            "timestamp": datetime.utcnow()
-        })
-    
-    def get_baseline(self, schema: str, table: str) -> Optional[Dict]:
-        """Get baseline statistics for a table"""
-        key = f"{schema}.{table}"
-        if key not in self._volume_baselines or len(self._volume_baselines[key]) == 0:
-            return None
+    @property
+    def pending_writes(self) -> int:
+        """Number of baselines changed since the last flush"""
+        return (
+            len(self._dirty_volume) + len(self._dirty_schema)
+            + len(self._dirty_counters) + len(self._dirty_seasonal)
+        )
+    
+    async def ensure_loaded(self, table_ids: Iterable[int]):
+        """
+        Load persisted baselines for tables not seen yet in this process
+        One query per kind, however many tables are requested
+        """
+        if self.store is None:
+            return
         
-        values = list(self._volume_baselines[key])
-        row_counts = [v["row_count"] for v in values]
+        missing = [table_id for table_id in dict.fromkeys(table_ids) if table_id not in self._loaded]
+        if not missing:
+            return
         
-        if not row_counts:
-            return None
+        try:
+            volume = await asyncio.to_thread(self.store.load_volume, missing)
+            schemas = await asyncio.to_thread(self.store.load_schemas, missing)
+            counters = await asyncio.to_thread(self.store.load_counters, missing)
+            seasonal = {}
+            if self.seasonal is not None:
+                seasonal = await asyncio.to_thread(self.store.load_seasonal, missing)
+        except Exception as e:
+            # The tables stay unloaded: retried on the next check and not flushed until then
+            logger.error(f"Failed to load baselines, not saving them until a load succeeds: {e}")
+            return
         
-        avg = sum(row_counts) / len(row_counts)
-        min_val = min(row_counts)
-        max_val = max(row_counts)
+        for table_id in missing:
+            if table_id in self._loaded:
+                continue  # A concurrent load got there first
+            # Measurements recorded before the load (or while it ran) follow the stored history
+            if table_id in volume:
+                recorded = self._volume_baselines.get(table_id)
+                values = volume[table_id] + (recorded.values() if recorded is not None else [])
+                self._volume_baselines[table_id] = RollingStats(self.window_size, values)
+            if table_id in schemas and table_id not in self._schema_snapshots:
+                self._schema_snapshots[table_id] = schemas[table_id]
+            if table_id in counters and table_id not in self._counters:
+                self._counters[table_id] = counters[table_id]
+            self._loaded.add(table_id)
         
-        return {
-            "average": avg,
-            "min": min_val,
-            "max": max_val,
-            "count": len(row_counts)
+        if seasonal:
+            self.seasonal.load(seasonal)
+    
+    async def flush(self):
+        """Write changed baselines to the store (write-behind)"""
+        if self.store is None or self.pending_writes == 0:
+            return
+        
+        volume_keys, self._dirty_volume = self._split_unloaded(self._dirty_volume)
+        schema_keys, self._dirty_schema = self._split_unloaded(self._dirty_schema)
+        counter_keys, self._dirty_counters = self._split_unloaded(self._dirty_counters)
+        seasonal_keys, self._dirty_seasonal = self._split_unloaded(self._dirty_seasonal)
+        volume_rows = [
+            self._volume_baselines[key].to_row(key)
+            for key in volume_keys if key in self._volume_baselines
+        ]
+        snapshots = {
+            key: self._schema_snapshots[key]
+            for key in schema_keys if key in self._schema_snapshots
         }
+        counters = {key: self._counters[key] for key in counter_keys if key in self._counters}
+        seasonal = self.seasonal.export(seasonal_keys) if self.seasonal is not None else {}
+        
+        try:
+            if volume_rows:
+                await asyncio.to_thread(self.store.save_volume, volume_rows)
+            if snapshots:
+                await asyncio.to_thread(self.store.save_schemas, snapshots)
+            if counters:
+                await asyncio.to_thread(self.store.save_counters, counters)
+            if seasonal:
+                await asyncio.to_thread(self.store.save_seasonal, seasonal)
+        except Exception as e:
+            logger.error(f"Failed to flush baselines, will retry: {e}")
+            self._dirty_volume |= volume_keys
+            self._dirty_schema |= schema_keys
+            self._dirty_counters |= counter_keys
+            self._dirty_seasonal |= seasonal_keys
+            return
+        
+        logger.debug(f"Flushed {len(volume_rows)} volume baselines and {len(snapshots)} schema snapshots")
+    
+    def _split_unloaded(self, keys: Set[int]) -> Tuple[Set[int], Set[int]]:
+        """Split dirty table ids into (writable now, kept dirty until their load succeeds)"""
+        return keys & self._loaded, keys - self._loaded
+    
+    def record_volume(self, table_id: int, row_count: int):
+        """Record a volume measurement"""
+        self.record_volumes([table_id], [row_count])
+    
+    def record_volumes(
+        self,
+        table_ids: List[int],
+        row_counts: List[int],
+        at: Optional[datetime] = None
+    ):
+        """Record a batch of volume measurements taken at the same time"""
+        for table_id, row_count in zip(table_ids, row_counts):
+            if table_id not in self._volume_baselines:
+                self._volume_baselines[table_id] = RollingStats(self.window_size)
+            
+            self._volume_baselines[table_id].append(row_count)
+            self._dirty_volume.add(table_id)
+        
+        if self.seasonal is not None and table_ids:
+            self.seasonal.update(table_ids, row_counts, at or datetime.utcnow())
+            self._dirty_seasonal.update(table_ids)
+    
+    def record_counters(
+        self,
+        table_id: int,
+        n_tup_ins: int,
+        n_tup_del: int
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Turn cumulative pg_stat insert/delete counters into changes since the last reading
+        (None, None) on the first reading. A counter that went down means the
+        stats were reset, so the new reading is the change since the reset.
+        """
+        previous = self._counters.get(table_id)
+        self._counters[table_id] = (n_tup_ins, n_tup_del)
+        self._dirty_counters.add(table_id)
+        if previous is None:
+            return None, None
+        
+        if n_tup_ins < previous[0] or n_tup_del < previous[1]:
+            logger.info(f"Statistics counters for table {table_id} were reset")
+            return n_tup_ins, n_tup_del
+        return n_tup_ins - previous[0], n_tup_del - previous[1]
+    
+    def get_baseline(self, table_id: int) -> Optional[Dict]:
+        """Get baseline statistics for a table (O(1), from running aggregates)"""
+        window = self._volume_baselines.get(table_id)
+        if window is None:
+            return None
+        return window.stats()
     
     def is_anomaly(
         self,
-        schema: str,
-        table: str,
+        table_id: int,
         current_value: int,
-        threshold_percent: float = 0.3
+        threshold_percent: float = 0.3,
+        baseline: Optional[Dict] = None
     ) -> bool:
         """
         Check if current value is an anomaly
         threshold_percent: 0.3 = 30% deviation triggers anomaly
+        baseline: Result of get_baseline, if the caller already has it
         """
-        baseline = self.get_baseline(schema, table)
+        if baseline is None:
+            baseline = self.get_baseline(table_id)
+        if self.seasonal is not None:
+            return self.detect_volume_anomalies(
+                [table_id], [current_value], [baseline], threshold_percent
+            )[0]
+        return self._exceeds_threshold(current_value, baseline, threshold_percent)
+    
+    def detect_volume_anomalies(
+        self,
+        table_ids: List[int],
+        values: List[int],
+        baselines: Optional[List[Optional[Dict]]] = None,
+        threshold_percent: float = 0.3,
+        at: Optional[datetime] = None
+    ) -> List[bool]:
+        """
+        Flag anomalies for a batch of measurements
+        In seasonal mode the batch is scored in one vectorized pass; tables whose
+        seasonal buckets are still warming up fall back to the threshold rule
+        """
+        if baselines is None:
+            baselines = [self.get_baseline(table_id) for table_id in table_ids]
+        
+        if self.seasonal is None or not table_ids:
+            return [
+                self._exceeds_threshold(value, baseline, threshold_percent)
+                for value, baseline in zip(values, baselines)
+            ]
+        
+        scores = self.seasonal.score(table_ids, values, at or datetime.utcnow())
+        flags = scores > self.seasonal.threshold
+        warming_up = np.isnan(scores)
+        
+        return [
+            self._exceeds_threshold(value, baseline, threshold_percent) if cold else bool(flag)
+            for value, baseline, flag, cold in zip(values, baselines, flags, warming_up)
+        ]
+    
+    @staticmethod
+    def _exceeds_threshold(current_value: int, baseline: Optional[Dict], threshold_percent: float) -> bool:
         if not baseline:
             # No baseline yet, not an anomaly
             return False
@@ -80,21 +373,22 @@ class BaselineService:
         deviation = abs(current_value - avg) / avg
         return deviation > threshold_percent
     
-    def check_schema_change(
-        self,
-        schema: str,
-        table: str,
-        current_schema: dict
-    ) -> bool:
-        """Check if schema has changed"""
-        key = f"{schema}.{table}"
-        
-        if key not in self._schema_snapshots:
+    def check_schema_change(self, table_id: int, current_schema: dict) -> bool:
+        """
+        Check if schema has changed
+        Snapshots carrying a catalog fingerprint (see SafeQueries.fetch_schemas)
+        skip the column diff entirely when the fingerprint is unchanged
+        """
+        if table_id not in self._schema_snapshots:
             # First time seeing this schema, store it
-            self._schema_snapshots[key] = current_schema
+            self._set_schema_snapshot(table_id, current_schema)
             return False
         
-        previous_schema = self._schema_snapshots[key]
+        previous_schema = self._schema_snapshots[table_id]
+        
+        fingerprint = current_schema.get("fingerprint")
+        if fingerprint and fingerprint == previous_schema.get("fingerprint"):
+            return False
         
         # Compare schemas
         prev_columns = {col["name"]: col for col in previous_schema.get("columns", [])}
@@ -102,22 +396,29 @@ class BaselineService:
         
         # Check for added/removed columns
         if set(prev_columns.keys()) != set(curr_columns.keys()):
-            self._schema_snapshots[key] = current_schema
+            self._set_schema_snapshot(table_id, current_schema)
             return True
         
         # Check for type changes
         for col_name, prev_col in prev_columns.items():
             curr_col = curr_columns[col_name]
             if prev_col["type"] != curr_col["type"]:
-                self._schema_snapshots[key] = current_schema
+                self._set_schema_snapshot(table_id, current_schema)
                 return True
             if prev_col["nullable"] != curr_col["nullable"]:
-                self._schema_snapshots[key] = current_schema
+                self._set_schema_snapshot(table_id, current_schema)
                 return True
         
+        # Catalog changed in a way we don't alert on (e.g. a default); keep the
+        # new fingerprint so the next check takes the fast path again
+        self._set_schema_snapshot(table_id, current_schema)
         return False
+    
+    def _set_schema_snapshot(self, table_id: int, snapshot: dict):
+        self._schema_snapshots[table_id] = snapshot
+        self._dirty_schema.add(table_id)
 
 
 # Singleton instance
-baseline_service = BaselineService()
+baseline_service = BaselineService(store=BaselineStore())
 
@@ -0,0 +1,111 @@
+"""
+Partition management and rollups for the checks table
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+from app.db.check_store import CheckPartitionStore, partition_day, partition_name
+
+logger = logging.getLogger(__name__)
+
+
+def plan_partitions(
+    existing: List[str],
+    today: date,
+    days_ahead: int,
+    retention_days: int
+) -> Dict[str, List]:
+    """
+    Decide which daily partitions to create and which to drop
+    Keeps today - retention_days .. today + days_ahead; yesterday is always kept
+    """
+    existing_days = {}
+    for name in existing:
+        try:
+            existing_days[partition_day(name)] = name
+        except ValueError:
+            logger.warning(f"Ignoring unexpected checks partition {name}")
+    
+    wanted = [today + timedelta(days=offset) for offset in range(-1, days_ahead + 1)]
+    oldest_kept = today - timedelta(days=max(retention_days, 1))
+    return {
+        "create": [day for day in wanted if day not in existing_days],
+        "drop": sorted(name for day, name in existing_days.items() if day < oldest_kept),
+    }
+
+
+class CheckMaintenanceService:
+    """
+    Keeps the partitioned checks table bounded and its rollups current
+
+    Every run (a scheduler job) creates partitions CHECKS_PARTITION_DAYS_AHEAD
+    days ahead, drops those older than CHECKS_RETENTION_DAYS, and recomputes
+    the hourly and daily rollups for the last CHECK_ROLLUP_LOOKBACK_HOURS, which
+    covers results that reached the database late through write-behind.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[CheckPartitionStore] = None,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)
+    ):
+        self.store = store or CheckPartitionStore()
+        self.clock = clock
+        
+        self.runs = 0
+        self.failures = 0
+        self.partitions_created = 0
+        self.partitions_dropped = 0
+        self.last_rollup_at: Optional[datetime] = None
+    
+    async def run(self):
+        """Run one maintenance pass off the event loop; failures are logged, not raised"""
+        try:
+            await asyncio.to_thread(self.maintain)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Checks table maintenance failed: {e}")
+    
+    def maintain(self):
+        """Create and drop partitions, then refresh rollups"""
+        now = self.clock()
+        plan = plan_partitions(
+            self.store.list_partitions(),
+            now.date(),
+            settings.CHECKS_PARTITION_DAYS_AHEAD,
+            settings.CHECKS_RETENTION_DAYS
+        )
+        
+        self.store.create_partitions(plan["create"])
+        self.partitions_created += len(plan["create"])
+        if plan["create"]:
+            logger.info(f"Created checks partitions {[partition_name(day) for day in plan['create']]}")
+        
+        # Roll up before dropping, so no partition leaves without its rollups
+        end = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        self.store.rollup(end - timedelta(hours=settings.CHECK_ROLLUP_LOOKBACK_HOURS + 1), end)
+        self.last_rollup_at = now
+        
+        self.store.drop_partitions(plan["drop"])
+        self.partitions_dropped += len(plan["drop"])
+        if plan["drop"]:
+            logger.info(f"Dropped checks partitions past retention: {plan['drop']}")
+        
+        self.runs += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get maintenance counters"""
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "partitions_created": self.partitions_created,
+            "partitions_dropped": self.partitions_dropped,
+            "last_rollup_at": self.last_rollup_at.isoformat() if self.last_rollup_at else None
+        }
+
+
+# Singleton instance
+check_maintenance_service = CheckMaintenanceService()
@@ -0,0 +1,171 @@
+"""
+Write-behind buffering of check results
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from app.config import settings
+from app.db.check_store import CheckResultStore
+
+logger = logging.getLogger(__name__)
+
+
+class CheckResultWriter:
+    """
+    Buffers check results and writes them to the Pulse DB in bulk
+
+    Results are flushed with one COPY when CHECK_RESULT_FLUSH_SIZE rows are
+    buffered, every CHECK_RESULT_FLUSH_INTERVAL_SECONDS (scheduler job), and
+    on shutdown. The buffer is bounded: producers wait for a flush to make
+    room, and only if none does within the enqueue timeout (e.g. the Pulse DB
+    is down) are the oldest results dropped.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[CheckResultStore] = None,
+        flush_size: Optional[int] = None,
+        max_buffered: Optional[int] = None,
+        enqueue_timeout: Optional[float] = None
+    ):
+        self.store = store
+        self.flush_size = flush_size or settings.CHECK_RESULT_FLUSH_SIZE
+        self.max_buffered = max_buffered or settings.CHECK_RESULT_BUFFER_MAX
+        self.enqueue_timeout = (
+            settings.CHECK_RESULT_ENQUEUE_TIMEOUT_SECONDS if enqueue_timeout is None else enqueue_timeout
+        )
+        
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._in_flight = 0  # Rows taken by a flush that is still writing
+        self._space_waiters: Deque[asyncio.Future] = deque()
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.producer_waits = 0
+        self.last_flush_ms = 0.0
+    
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+    
+    async def add(self, rows: List[Dict[str, Any]]):
+        """
+        Buffer results for the next flush
+        Waits while the buffer is full; never raises
+        """
+        if not rows or self.store is None:
+            return
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.enqueue_timeout
+        if self._held() + len(rows) > self.max_buffered:
+            self.producer_waits += 1
+        while self._held() + len(rows) > self.max_buffered:
+            self._start_flush()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                overflow = min(self._held() + len(rows) - self.max_buffered, len(self._buffer))
+                for _ in range(overflow):
+                    self._buffer.popleft()
+                self.dropped += overflow
+                logger.error(f"Check result buffer full, dropped {overflow} oldest results")
+                break
+            
+            waiter = loop.create_future()
+            self._space_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in self._space_waiters:
+                    self._space_waiters.remove(waiter)
+        
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.flush_size:
+            self._start_flush()
+    
+    def _held(self) -> int:
+        return len(self._buffer) + self._in_flight
+    
+    def _start_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+    
+    async def flush(self) -> int:
+        """
+        Write everything buffered so far (write-behind)
+        Returns the number of rows written; failed rows are kept for the next flush
+        """
+        written = 0
+        while self._buffer and self.store is not None:
+            rows = list(self._buffer)
+            self._buffer.clear()
+            
+            started = time.monotonic()
+            self._in_flight += len(rows)
+            try:
+                await asyncio.to_thread(self.store.save, rows)
+            except asyncio.CancelledError:
+                self._requeue(rows)  # Shutdown mid-write: at-least-once, never lost
+                raise
+            except Exception as e:
+                self.failed_flushes += 1
+                self._requeue(rows)
+                logger.error(f"Failed to flush {len(rows)} check results, will retry: {e}")
+                break
+            finally:
+                self._in_flight -= len(rows)
+            
+            self.last_flush_ms = (time.monotonic() - started) * 1000
+            self.flushes += 1
+            self.written += len(rows)
+            written += len(rows)
+            self._wake_producers()
+        
+        if written:
+            logger.debug(f"Flushed {written} check results")
+        return written
+    
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """Put unwritten rows back in front of anything added meanwhile, within the bound"""
+        room = max(self.max_buffered - len(self._buffer), 0)
+        kept = rows[-room:] if room else []
+        self._buffer.extendleft(reversed(kept))
+        self.dropped += len(rows) - len(kept)
+    
+    async def close(self):
+        """Finish any in-flight flush, then write what is left (called on shutdown)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self.flush()
+    
+    def _wake_producers(self):
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffer occupancy and flush statistics"""
+        return {
+            "pending": len(self._buffer),
+            "in_flight": self._in_flight,
+            "max_buffered": self.max_buffered,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "producer_waits": self.producer_waits,
+            "last_flush_ms": round(self.last_flush_ms, 3)
+        }
+
+
+# Singleton instance
+check_result_writer = CheckResultWriter(store=CheckResultStore())
@@ -2,23 +2,38 @@
 Runs data checks against replicas
 """
 
+import asyncio
 import logging
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, Optional
-from app.db.replica_db import replica_db_manager
-from app.db.queries import SafeQueries
-from app.models.core import MonitorType, CheckStatus
-from app.services.safety import SafetyGuardrails
-from app.services.baselines import BaselineService
+from typing import Dict, Any, List, Optional
+from app.config import settings
+from app.db.replica_db import QueryTimeout, replica_db_manager
+from app.db.queries import SafeQueries, is_batchable
+from app.models.core import MonitorType, CheckStatus, CheckSpec, VolumeStrategy
+from app.services.admission import AdmissionTimeout
+from app.services.baselines import BaselineService, baseline_service as default_baseline_service
+from app.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+CHECKS = metrics.counter(
+    "pulse_checks_total",
+    "Checks run, by result (skipped = no query budget within ADMISSION_TIMEOUT_SECONDS)",
+    ("monitor_type", "connection_id", "status")
+)
+CHECK_SECONDS = metrics.histogram(
+    "pulse_check_duration_seconds",
+    "Query time per check; checks answered by one batched statement share its time",
+    ("monitor_type", "connection_id")
+)
+
 
 class CheckerService:
     """Service for running health checks on monitored tables"""
     
-    def __init__(self):
-        self.baseline_service = BaselineService()
+    def __init__(self, baseline_service: Optional[BaselineService] = None):
+        self.baseline_service = baseline_service or default_baseline_service
         self.queries = SafeQueries()
     
     async def run_check(
@@ -28,10 +43,15 @@ class CheckerService:
         schema_name: str,
         table_name: str,
         monitor_type: MonitorType,
-        time_column: Optional[str] = None
+        time_column: Optional[str] = None,
+        volume_strategy: VolumeStrategy = VolumeStrategy.EXACT,
+        volume_window_minutes: Optional[int] = None,
+        priority: int = 0
     ) -> Dict[str, Any]:
         """
         Run a single health check
+        Waits (in priority order) for query budget; skipped only if none frees
+        up within ADMISSION_TIMEOUT_SECONDS
         Returns check result with status and data
         """
         replica_conn = replica_db_manager.get_connection(connection_id)
@@ -42,103 +62,483 @@ class CheckerService:
                 "result_data": {}
             }
         
+        spec = CheckSpec(
+            table_id, schema_name, table_name, monitor_type, time_column,
+            volume_strategy, volume_window_minutes
+        )
         try:
-            # Check safety guardrails
-            if not replica_conn.guardrails.can_run_query(connection_id):
-                return {
-                    "status": CheckStatus.SKIPPED,
-                    "error_message": "Query budget exceeded",
-                    "result_data": {}
-                }
+            await self.baseline_service.ensure_loaded([table_id])
             
-            # Run the appropriate check
-            with replica_conn.get_readonly_connection() as conn:
-                with conn.cursor() as cursor:
-                    result = await self._execute_check(
-                        cursor,
-                        monitor_type,
-                        schema_name,
-                        table_name,
-                        time_column
-                    )
-                    
-                    # Record query usage
-                    replica_conn.guardrails.record_query(connection_id)
-                    
-                    return result
-                    
+            # Run the appropriate check on a pooled async connection so
+            # replica I/O never blocks the event loop. Like run_checks_batch,
+            # take the pooled connection first and then wait for admission.
+            async with replica_conn.get_readonly_connection_async() as conn:
+                async with conn.cursor() as cursor:
+                    await self._refresh_lag_if_due(replica_conn, conn, cursor)
+                    async with replica_conn.admission.admit(priority):
+                        result, elapsed_ms = await replica_conn.run_with_deadline(
+                            conn, self._execute_check(cursor, spec), name=monitor_type.value
+                        )
+                    result["result_data"]["elapsed_ms"] = elapsed_ms
+            
+            self._apply_volume_baselines([spec], [result])
+        
+        except AdmissionTimeout:
+            result = self._skipped_result()
+        
+        except QueryTimeout as e:
+            logger.warning(f"Check timed out for table {table_id}: {e}")
+            result = self._timeout_result(e)
+        
         except Exception as e:
             logger.error(f"Error running check for table {table_id}: {e}", exc_info=True)
-            return {
+            result = {
                 "status": CheckStatus.ERROR,
                 "error_message": str(e),
                 "result_data": {}
             }
+        
+        self._record_metrics(connection_id, [spec], [result])
+        return result
     
-    async def _execute_check(
-        self,
-        cursor,
-        monitor_type: MonitorType,
-        schema_name: str,
-        table_name: str,
-        time_column: Optional[str] = None
-    ) -> Dict[str, Any]:
+    async def _execute_check(self, cursor, spec: CheckSpec) -> Dict[str, Any]:
         """Execute the actual check query"""
+        schema_name, table_name, time_column = spec.schema_name, spec.table_name, spec.time_column
         
-        if monitor_type == MonitorType.FRESHNESS:
+        if spec.monitor_type == MonitorType.FRESHNESS:
             if not time_column:
                 raise ValueError("time_column required for freshness check")
             
-            max_timestamp = self.queries.check_freshness(
+            max_timestamp = await self.queries.check_freshness_async(
                 cursor, schema_name, table_name, time_column
             )
             
-            return {
-                "status": CheckStatus.SUCCESS,
-                "result_data": {
-                    "max_timestamp": max_timestamp.isoformat() if max_timestamp else None,
-                    "is_stale": max_timestamp is None or self._is_stale(max_timestamp)
-                }
-            }
+            return self._freshness_result(max_timestamp)
         
-        elif monitor_type == MonitorType.VOLUME:
-            row_count = self.queries.check_volume(cursor, schema_name, table_name)
-            has_zero_rows = row_count == 0
+        elif spec.monitor_type == MonitorType.VOLUME:
+            if spec.volume_strategy == VolumeStrategy.ESTIMATE:
+                stats = await self.queries.fetch_table_stats_async(
+                    cursor, [(schema_name, table_name)]
+                )
+                if (schema_name, table_name) not in stats:
+                    raise ValueError(f"Table {schema_name}.{table_name} not found")
+                return self._estimate_result(
+                    spec.table_id, schema_name, table_name, stats[(schema_name, table_name)]
+                )
             
-            # Check against baseline
-            baseline = self.baseline_service.get_baseline(schema_name, table_name)
-            is_anomaly = self.baseline_service.is_anomaly(
-                schema_name, table_name, row_count
-            )
+            if spec.volume_strategy == VolumeStrategy.WINDOWED:
+                if not time_column:
+                    raise ValueError("time_column required for windowed volume check")
+                row_count = await self.queries.check_volume_windowed_async(
+                    cursor,
+                    schema_name,
+                    table_name,
+                    time_column,
+                    spec.volume_window_minutes or settings.DEFAULT_VOLUME_WINDOW_MINUTES
+                )
+            else:
+                row_count = await self.queries.check_volume_async(cursor, schema_name, table_name)
             
-            return {
-                "status": CheckStatus.SUCCESS,
-                "result_data": {
-                    "row_count": row_count,
-                    "has_zero_rows": has_zero_rows,
-                    "baseline": baseline,
-                    "is_anomaly": is_anomaly
-                }
-            }
+            return self._volume_result(schema_name, table_name, row_count, spec.volume_strategy)
         
-        elif monitor_type == MonitorType.SCHEMA:
-            schema_info = self.queries.check_schema(cursor, schema_name, table_name)
+        elif spec.monitor_type == MonitorType.SCHEMA:
+            schema_info = await self.queries.check_schema_async(cursor, schema_name, table_name)
+            if schema_info is None:
+                # Same error as the batched catalog path, not an empty schema
+                raise ValueError(f"Table {schema_name}.{table_name} not found")
             
-            # Compare with previous schema (stored in baseline)
-            schema_changed = self.baseline_service.check_schema_change(
-                schema_name, table_name, schema_info
+            return self._schema_result(spec.table_id, schema_info)
+        
+        else:
+            raise ValueError(f"Unknown monitor type: {spec.monitor_type}")
+    
+    async def run_checks_batch(
+        self,
+        connection_id: int,
+        specs: List[CheckSpec],
+        priority: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Run many checks for one connection over a single pooled connection
+        Freshness/volume probes are combined into UNION ALL statements; each
+        statement counts as one query against the budget and waits for
+        admission. Statements still waiting after ADMISSION_TIMEOUT_SECONDS
+        (for the whole batch) are skipped. A statement that times out is
+        split in half and retried until BATCH_PROBE_SPLIT_BUDGET_SECONDS is
+        used up; what is left is reported as timed out. Returns results in
+        spec order.
+        """
+        replica_conn = replica_db_manager.get_connection(connection_id)
+        if not replica_conn:
+            return [
+                {
+                    "status": CheckStatus.ERROR,
+                    "error_message": f"Connection {connection_id} not found",
+                    "result_data": {}
+                }
+                for _ in specs
+            ]
+        
+        specs = [self._with_volume_window(spec) for spec in specs]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ADMISSION_TIMEOUT_SECONDS
+        split_deadline: Optional[float] = None  # Set by the first timed-out statement
+        results: List[Optional[Dict[str, Any]]] = [None] * len(specs)
+        await self.baseline_service.ensure_loaded(spec.table_id for spec in specs)
+        
+        estimates = [i for i, spec in enumerate(specs) if self._is_estimate(spec)]
+        schemas = [i for i, spec in enumerate(specs) if spec.monitor_type == MonitorType.SCHEMA]
+        batchable = [i for i, spec in enumerate(specs) if is_batchable(spec)]
+        others = [
+            i for i, spec in enumerate(specs)
+            if not is_batchable(spec)
+            and not self._is_estimate(spec)
+            and spec.monitor_type != MonitorType.SCHEMA
+        ]
+        
+        try:
+            async with replica_conn.get_readonly_connection_async() as conn:
+                async with conn.cursor() as cursor:
+                    await self._refresh_lag_if_due(replica_conn, conn, cursor)
+                    
+                    chunks = deque(self.queries.chunk_probes(batchable, settings.BATCH_PROBE_MAX_TABLES))
+                    while chunks:
+                        chunk = chunks.popleft()
+                        chunk_specs = [specs[i] for i in chunk]
+                        
+                        try:
+                            async with replica_conn.admission.admit(priority, deadline):
+                                values, elapsed_ms = await replica_conn.run_with_deadline(
+                                    conn, self.queries.run_probe_batch_async(cursor, chunk_specs), "probe_batch"
+                                )
+                        except AdmissionTimeout:
+                            for i in chunk:
+                                results[i] = self._skipped_result()
+                            continue
+                        except QueryTimeout as e:
+                            # Too much work for one statement_timeout; smaller
+                            # statements may fit, but never rerun table by table
+                            await conn.rollback()
+                            if split_deadline is None:
+                                split_deadline = loop.time() + settings.BATCH_PROBE_SPLIT_BUDGET_SECONDS
+                            if len(chunk) > 1 and loop.time() < split_deadline:
+                                half = len(chunk) // 2
+                                chunks.extendleft([chunk[half:], chunk[:half]])
+                                logger.warning(
+                                    f"Batched probe of {len(chunk)} tables timed out on connection "
+                                    f"{connection_id}, retrying in halves: {e}"
+                                )
+                            else:
+                                logger.warning(f"Batched probe timed out on connection {connection_id}: {e}")
+                                for i in chunk:
+                                    results[i] = self._timeout_result(e)
+                            continue
+                        except Exception as e:
+                            # One bad table (e.g. dropped) fails the whole statement;
+                            # retry the chunk table by table so neighbours still report
+                            logger.warning(
+                                f"Batched probe failed on connection {connection_id}, "
+                                f"falling back to per-table checks: {e}"
+                            )
+                            await conn.rollback()
+                            others.extend(chunk)
+                            continue
+                        
+                        for i, value in zip(chunk, values):
+                            results[i] = self._probe_result(specs[i], value)
+                            results[i]["result_data"]["elapsed_ms"] = elapsed_ms
+                    
+                    if estimates:
+                        await self._run_catalog_batch(
+                            conn, cursor, replica_conn, connection_id, specs, estimates, results,
+                            priority, deadline,
+                            self.queries.fetch_table_stats_async,
+                            lambda spec, stats: self._estimate_result(
+                                spec.table_id, spec.schema_name, spec.table_name, stats
+                            )
+                        )
+                    
+                    if schemas:
+                        await self._run_catalog_batch(
+                            conn, cursor, replica_conn, connection_id, specs, schemas, results,
+                            priority, deadline,
+                            self.queries.fetch_schemas_async,
+                            lambda spec, schema_info: self._schema_result(spec.table_id, schema_info)
+                        )
+                    
+                    for i in others:
+                        results[i] = await self._run_single_on_cursor(
+                            conn, cursor, replica_conn, connection_id, specs[i], priority, deadline
+                        )
+        except Exception as e:
+            logger.error(f"Error running batch checks for connection {connection_id}: {e}", exc_info=True)
+            results = [
+                result or {
+                    "status": CheckStatus.ERROR,
+                    "error_message": str(e),
+                    "result_data": {}
+                }
+                for result in results
+            ]
+        
+        self._apply_volume_baselines(specs, results)
+        self._record_metrics(connection_id, specs, results)
+        return results
+    
+    async def refresh_replica_lag(self, connection_id: int):
+        """Probe replica lag on its own (used while a connection's checks are paused)"""
+        replica_conn = replica_db_manager.get_connection(connection_id)
+        if not replica_conn:
+            return
+        
+        try:
+            async with replica_conn.get_readonly_connection_async() as conn:
+                async with conn.cursor() as cursor:
+                    await self._refresh_lag_if_due(replica_conn, conn, cursor)
+        except Exception as e:
+            logger.warning(f"Could not refresh replica lag for connection {connection_id}: {e}")
+            replica_conn.lag.record_failure()
+    
+    async def _refresh_lag_if_due(self, replica_conn, conn, cursor):
+        """
+        Piggyback a lag probe on an open connection when the cached reading is stale
+        Not counted against the query budget: it is a cheap catalog call made
+        at most once per REPLICA_LAG_REFRESH_SECONDS
+        """
+        if not replica_conn.lag.needs_refresh():
+            return
+        
+        try:
+            lag_seconds, _ = await replica_conn.run_with_deadline(
+                conn, self.queries.check_replica_lag_async(cursor), "replica_lag"
             )
-            
+            replica_conn.lag.update(lag_seconds)
+        except Exception as e:
+            logger.warning(f"Replica lag probe failed for connection {replica_conn.connection_id}: {e}")
+            replica_conn.lag.record_failure()
+            await conn.rollback()
+    
+    async def _run_single_on_cursor(
+        self,
+        conn,
+        cursor,
+        replica_conn,
+        connection_id: int,
+        spec: CheckSpec,
+        priority: int,
+        deadline: float
+    ) -> Dict[str, Any]:
+        """Run one unbatched check on an already-open connection"""
+        try:
+            async with replica_conn.admission.admit(priority, deadline):
+                result, elapsed_ms = await replica_conn.run_with_deadline(
+                    conn, self._execute_check(cursor, spec), name=spec.monitor_type.value
+                )
+            result["result_data"]["elapsed_ms"] = elapsed_ms
+            return result
+        except AdmissionTimeout:
+            return self._skipped_result()
+        except QueryTimeout as e:
+            logger.warning(f"Check timed out for table {spec.table_id}: {e}")
+            await conn.rollback()
+            return self._timeout_result(e)
+        except Exception as e:
+            logger.error(f"Error running check for table {spec.table_id}: {e}")
+            await conn.rollback()
             return {
-                "status": CheckStatus.SUCCESS,
-                "result_data": {
-                    "schema": schema_info,
-                    "schema_changed": schema_changed
+                "status": CheckStatus.ERROR,
+                "error_message": str(e),
+                "result_data": {}
+            }
+    
+    async def _run_catalog_batch(
+        self,
+        conn,
+        cursor,
+        replica_conn,
+        connection_id: int,
+        specs: List[CheckSpec],
+        indices: List[int],
+        results: List[Optional[Dict[str, Any]]],
+        priority: int,
+        deadline: float,
+        fetch,
+        build
+    ):
+        """
+        Answer many checks from one catalog query (one query against the budget)
+        fetch: SafeQueries coroutine taking (cursor, [(schema, table)])
+        build: Builds a check result from (spec, per-table data)
+        """
+        tables = list({(specs[i].schema_name, specs[i].table_name) for i in indices})
+        try:
+            async with replica_conn.admission.admit(priority, deadline):
+                found, elapsed_ms = await replica_conn.run_with_deadline(
+                    conn, fetch(cursor, tables), fetch.__name__.removesuffix("_async")
+                )
+        except AdmissionTimeout:
+            for i in indices:
+                results[i] = self._skipped_result()
+            return
+        except QueryTimeout as e:
+            logger.warning(f"Catalog query timed out for connection {connection_id}: {e}")
+            await conn.rollback()
+            for i in indices:
+                results[i] = self._timeout_result(e)
+            return
+        except Exception as e:
+            logger.error(f"Error running catalog query for connection {connection_id}: {e}")
+            await conn.rollback()
+            for i in indices:
+                results[i] = {
+                    "status": CheckStatus.ERROR,
+                    "error_message": str(e),
+                    "result_data": {}
+                }
+            return
+        
+        for i in indices:
+            spec = specs[i]
+            data = found.get((spec.schema_name, spec.table_name))
+            if data is None:
+                results[i] = {
+                    "status": CheckStatus.ERROR,
+                    "error_message": f"Table {spec.schema_name}.{spec.table_name} not found",
+                    "result_data": {}
                 }
+            else:
+                results[i] = build(spec, data)
+                results[i]["result_data"]["elapsed_ms"] = elapsed_ms
+    
+    @staticmethod
+    def _record_metrics(connection_id: int, specs: List[CheckSpec], results: List[Optional[Dict[str, Any]]]):
+        """Count check outcomes and observe their query time (shared by a batched statement)"""
+        for spec, result in zip(specs, results):
+            if result is None:
+                continue
+            monitor_type = spec.monitor_type.value
+            CHECKS.inc(monitor_type, connection_id, CheckStatus(result["status"]).value)
+            elapsed_ms = result["result_data"].get("elapsed_ms")
+            if elapsed_ms is not None:
+                CHECK_SECONDS.observe(elapsed_ms / 1000, monitor_type, connection_id)
+    
+    @staticmethod
+    def _is_estimate(spec: CheckSpec) -> bool:
+        return spec.monitor_type == MonitorType.VOLUME and spec.volume_strategy == VolumeStrategy.ESTIMATE
+    
+    @staticmethod
+    def _with_volume_window(spec: CheckSpec) -> CheckSpec:
+        """Fill in the default window for windowed volume checks"""
+        if spec.volume_strategy == VolumeStrategy.WINDOWED and not spec.volume_window_minutes:
+            return spec._replace(volume_window_minutes=settings.DEFAULT_VOLUME_WINDOW_MINUTES)
+        return spec
+    
+    def _probe_result(self, spec: CheckSpec, value: Any) -> Dict[str, Any]:
+        """Build a check result from a batched probe value"""
+        if spec.monitor_type == MonitorType.FRESHNESS:
+            return self._freshness_result(value)
+        return self._volume_result(spec.schema_name, spec.table_name, value, spec.volume_strategy)
+    
+    def _freshness_result(self, max_timestamp: Optional[datetime]) -> Dict[str, Any]:
+        return {
+            "status": CheckStatus.SUCCESS,
+            "result_data": {
+                "max_timestamp": max_timestamp.isoformat() if max_timestamp else None,
+                "is_stale": max_timestamp is None or self._is_stale(max_timestamp)
+            }
+        }
+    
+    def _estimate_result(
+        self,
+        table_id: int,
+        schema_name: str,
+        table_name: str,
+        stats: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        result = self._volume_result(
+            schema_name, table_name, stats["row_count"], VolumeStrategy.ESTIMATE
+        )
+        # pg_stat counters are cumulative; report changes since the previous check
+        inserted, deleted = self.baseline_service.record_counters(
+            table_id, stats["n_tup_ins"], stats["n_tup_del"]
+        )
+        result["result_data"]["rows_inserted"] = inserted
+        result["result_data"]["rows_deleted"] = deleted
+        return result
+    
+    def _volume_result(
+        self,
+        schema_name: str,
+        table_name: str,
+        row_count: int,
+        volume_strategy: VolumeStrategy = VolumeStrategy.EXACT
+    ) -> Dict[str, Any]:
+        """Volume result; baseline and is_anomaly are filled in by _apply_volume_baselines"""
+        return {
+            "status": CheckStatus.SUCCESS,
+            "result_data": {
+                "row_count": row_count,
+                "volume_strategy": volume_strategy.value,
+                "has_zero_rows": row_count == 0,
+                "baseline": None,
+                "is_anomaly": False
             }
+        }
+    
+    def _apply_volume_baselines(self, specs: List[CheckSpec], results: List[Optional[Dict[str, Any]]]):
+        """
+        Compare successful volume results with their baselines, then record them
+        The whole batch is scored at once so seasonal detection stays vectorized
+        """
+        indices = [
+            i for i, (spec, result) in enumerate(zip(specs, results))
+            if spec.monitor_type == MonitorType.VOLUME
+            and result is not None
+            and result["status"] == CheckStatus.SUCCESS
+        ]
+        if not indices:
+            return
         
-        else:
-            raise ValueError(f"Unknown monitor type: {monitor_type}")
+        table_ids = [specs[i].table_id for i in indices]
+        row_counts = [results[i]["result_data"]["row_count"] for i in indices]
+        baselines = [self.baseline_service.get_baseline(table_id) for table_id in table_ids]
+        anomalies = self.baseline_service.detect_volume_anomalies(table_ids, row_counts, baselines)
+        self.baseline_service.record_volumes(table_ids, row_counts)
+        
+        for i, baseline, is_anomaly in zip(indices, baselines, anomalies):
+            results[i]["result_data"]["baseline"] = baseline
+            results[i]["result_data"]["is_anomaly"] = is_anomaly
+    
+    def _schema_result(self, table_id: int, schema_info: Dict[str, Any]) -> Dict[str, Any]:
+        # Compare with previous schema (stored in baseline)
+        schema_changed = self.baseline_service.check_schema_change(table_id, schema_info)
+        
+        return {
+            "status": CheckStatus.SUCCESS,
+            "result_data": {
+                "schema": schema_info,
+                "schema_changed": schema_changed
+            }
+        }
+    
+    @staticmethod
+    def _timeout_result(error: QueryTimeout) -> Dict[str, Any]:
+        return {
+            "status": CheckStatus.ERROR,
+            "error_message": str(error),
+            "result_data": {
+                "timed_out": True,
+                "elapsed_ms": error.elapsed_ms
+            }
+        }
+    
+    @staticmethod
+    def _skipped_result() -> Dict[str, Any]:
+        return {
+            "status": CheckStatus.SKIPPED,
+            "error_message": "Query budget exceeded",
+            "result_data": {}
+        }
     
     def _is_stale(self, max_timestamp: datetime, threshold_minutes: int = 10) -> bool:
         """Check if timestamp is stale"""
@@ -0,0 +1,110 @@
+"""
+Delivery channels for alert notification digests
+"""
+
+import asyncio
+import smtplib
+import sys
+import urllib.request
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Optional
+import orjson
+from app.config import settings
+
+
+class NotificationSink(ABC):
+    """Delivers one digest to one address; raise to have the send retried"""
+    
+    name = "sink"
+    
+    @abstractmethod
+    async def send(self, address: str, digest) -> None:
+        """Deliver the digest"""
+
+
+class SMTPSink(NotificationSink):
+    """Plain-text email through an SMTP relay (smtplib, run off the event loop)"""
+    
+    name = "smtp"
+    
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        sender: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: Optional[bool] = None,
+        timeout: float = 30.0
+    ):
+        self.host = host or settings.SMTP_HOST
+        self.port = port or settings.SMTP_PORT
+        self.sender = sender or settings.NOTIFICATION_EMAIL_FROM
+        self.username = username or settings.SMTP_USERNAME
+        self.password = password or settings.SMTP_PASSWORD
+        self.starttls = settings.SMTP_STARTTLS if starttls is None else starttls
+        self.timeout = timeout
+    
+    async def send(self, address: str, digest) -> None:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = address
+        message["Subject"] = digest.subject
+        message.set_content(digest.body)
+        await asyncio.to_thread(self._deliver, message)
+    
+    def _deliver(self, message: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(message)
+
+
+class WebhookSink(NotificationSink):
+    """JSON POST of the digest to a URL"""
+    
+    name = "webhook"
+    
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+    
+    async def send(self, address: str, digest) -> None:
+        payload = orjson.dumps({
+            "subject": digest.subject,
+            "text": digest.body,
+            "connections": {
+                str(connection_id): [notification._asdict() for notification in notifications]
+                for connection_id, notifications in digest.by_connection.items()
+            }
+        })
+        await asyncio.to_thread(self._post, address, payload)
+    
+    def _post(self, url: str, payload: bytes):
+        request = urllib.request.Request(
+            url, data=payload, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        # Non-2xx responses raise HTTPError, which makes the send retry
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink(NotificationSink):
+    """Appends digests as JSON lines to a file, or stdout for address "-" (local runs and tests)"""
+    
+    name = "file"
+    
+    async def send(self, address: str, digest) -> None:
+        line = orjson.dumps({"subject": digest.subject, "text": digest.body}).decode() + "\n"
+        if address == "-":
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            return
+        await asyncio.to_thread(self._append, address, line)
+    
+    @staticmethod
+    def _append(path: str, line: str):
+        with open(path, "a") as f:
+            f.write(line)
@@ -0,0 +1,227 @@
+"""
+Alert notification queue: windowed, per-recipient digests grouped by connection
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from app.config import settings
+from app.services.notification_sinks import FileSink, NotificationSink, SMTPSink, WebhookSink
+from app.utils.retry import retry_async
+
+logger = logging.getLogger(__name__)
+
+
+class Notification(NamedTuple):
+    """An alert that opened or resolved"""
+    alert_id: int
+    kind: str  # "opened" or "resolved"
+    table_id: int
+    connection_id: Optional[int]
+    monitor_type: str
+    message: str
+    at: str  # ISO timestamp
+
+
+class Recipient(NamedTuple):
+    """Where digests go; connection_ids limits what it receives (None = everything)"""
+    sink: NotificationSink
+    address: str
+    connection_ids: Optional[frozenset] = None
+
+
+class Digest(NamedTuple):
+    """One message for one recipient"""
+    subject: str
+    body: str
+    by_connection: Dict[Optional[int], List[Notification]]
+
+
+def build_digest(notifications: List[Notification], max_lines: int) -> Digest:
+    """Summarize a window's notifications into one message, one section per connection"""
+    by_connection: Dict[Optional[int], List[Notification]] = defaultdict(list)
+    for notification in notifications:
+        by_connection[notification.connection_id].append(notification)
+    
+    opened = sum(n.kind == "opened" for n in notifications)
+    resolved = len(notifications) - opened
+    counts = []
+    if opened:
+        counts.append(f"{opened} opened")
+    if resolved:
+        counts.append(f"{resolved} resolved")
+    subject = f"[Pulse] Alerts {', '.join(counts)} on {len(by_connection)} connection(s)"
+    
+    lines = []
+    for connection_id, group in sorted(by_connection.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+        label = f"Connection {connection_id}" if connection_id is not None else "Unknown connection"
+        tables = len({n.table_id for n in group})
+        lines.append(f"{label}: {len(group)} changes on {tables} tables")
+        for notification in group[:max_lines]:
+            lines.append(f"  [{notification.kind}] {notification.message}")
+        if len(group) > max_lines:
+            lines.append(f"  ... and {len(group) - max_lines} more")
+        lines.append("")
+    return Digest(subject, "\n".join(lines), dict(by_connection))
+
+
+class NotificationQueue:
+    """
+    Collects alert notifications and sends them as digests
+
+    enqueue() never blocks or fails, so alerting on the check path is not
+    slowed down by delivery. A window opens with the first notification and
+    closes once no new notification arrived for quiet_seconds, or at the
+    latest max_window_seconds after it opened, so an outage whose alerts
+    trickle in over a check interval still yields one message per
+    recipient. Sends run with bounded concurrency and are retried with
+    backoff; a digest that still fails is logged and dropped.
+    """
+    
+    def __init__(
+        self,
+        recipients: Optional[List[Recipient]] = None,
+        quiet_seconds: Optional[float] = None,
+        max_window_seconds: Optional[float] = None,
+        max_concurrent_sends: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        retry_attempts: Optional[int] = None,
+        retry_delay_seconds: Optional[float] = None
+    ):
+        self.recipients = recipients if recipients is not None else []
+        self.quiet_seconds = settings.NOTIFICATION_QUIET_SECONDS if quiet_seconds is None else quiet_seconds
+        self.max_window_seconds = (
+            settings.NOTIFICATION_MAX_WINDOW_SECONDS if max_window_seconds is None else max_window_seconds
+        )
+        self.max_pending = max_pending or settings.NOTIFICATION_MAX_PENDING
+        self.retry_attempts = retry_attempts or settings.NOTIFICATION_RETRY_ATTEMPTS
+        self.retry_delay_seconds = (
+            settings.NOTIFICATION_RETRY_DELAY_SECONDS if retry_delay_seconds is None else retry_delay_seconds
+        )
+        self._send_slots = asyncio.Semaphore(max_concurrent_sends or settings.NOTIFICATION_MAX_CONCURRENT_SENDS)
+        
+        self._pending: List[Notification] = []
+        self._seen: Set[Tuple[int, str]] = set()  # (alert_id, kind) in the current window
+        self._window_opened_at: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        
+        self.enqueued = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.digests_sent = 0
+        self.failed_sends = 0
+    
+    def enqueue(self, notification: Notification):
+        """Add a notification to the current window (call from the event loop)"""
+        if not self.recipients:
+            return
+        
+        key = (notification.alert_id, notification.kind)
+        if key in self._seen:
+            self.duplicates += 1
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            logger.error(f"Notification queue full, dropping alert {notification.alert_id}")
+            return
+        
+        self._seen.add(key)
+        self._pending.append(notification)
+        self.enqueued += 1
+        self._schedule_flush()
+    
+    def _schedule_flush(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._window_opened_at is None:
+            self._window_opened_at = now
+        flush_at = min(now + self.quiet_seconds, self._window_opened_at + self.max_window_seconds)
+        
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(flush_at, self._start_flush)
+    
+    def _start_flush(self):
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def flush(self) -> int:
+        """Close the current window and send its digests; returns how many were delivered"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        notifications, self._pending = self._pending, []
+        self._seen.clear()
+        self._window_opened_at = None
+        if not notifications:
+            return 0
+        
+        sends = []
+        for recipient in self.recipients:
+            routed = [
+                n for n in notifications
+                if recipient.connection_ids is None or n.connection_id in recipient.connection_ids
+            ]
+            if routed:
+                digest = build_digest(routed, settings.NOTIFICATION_DIGEST_MAX_LINES)
+                sends.append(self._send(recipient, digest))
+        
+        delivered = sum(await asyncio.gather(*sends))
+        logger.info(
+            f"Sent {delivered}/{len(sends)} notification digests covering {len(notifications)} alert changes"
+        )
+        return delivered
+    
+    async def _send(self, recipient: Recipient, digest: Digest) -> bool:
+        async with self._send_slots:
+            try:
+                await retry_async(
+                    lambda: recipient.sink.send(recipient.address, digest),
+                    max_attempts=self.retry_attempts,
+                    delay_seconds=self.retry_delay_seconds
+                )
+            except Exception as e:
+                self.failed_sends += 1
+                logger.error(f"Dropping digest for {recipient.sink.name}:{recipient.address}: {e}")
+                return False
+        self.digests_sent += 1
+        return True
+    
+    async def close(self):
+        """Send whatever is pending and wait for in-flight sends (called on shutdown)"""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue and delivery counters"""
+        return {
+            "pending": len(self._pending),
+            "recipients": len(self.recipients),
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "digests_sent": self.digests_sent,
+            "failed_sends": self.failed_sends
+        }
+
+
+def recipients_from_settings() -> List[Recipient]:
+    """Recipients configured through NOTIFICATION_* settings"""
+    recipients = []
+    if settings.NOTIFICATION_EMAIL_RECIPIENTS:
+        smtp = SMTPSink()
+        recipients.extend(Recipient(smtp, address) for address in settings.NOTIFICATION_EMAIL_RECIPIENTS)
+    if settings.NOTIFICATION_WEBHOOK_URLS:
+        webhook = WebhookSink()
+        recipients.extend(Recipient(webhook, url) for url in settings.NOTIFICATION_WEBHOOK_URLS)
+    if settings.NOTIFICATION_FILE_PATH:
+        recipients.append(Recipient(FileSink(), settings.NOTIFICATION_FILE_PATH))
+    return recipients
+
+
+# Singleton instance
+notification_queue = NotificationQueue(recipients=recipients_from_settings())
@@ -0,0 +1,134 @@
+"""
+Phase placement: spreads table checks evenly across their intervals
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Offsets are measured from the Unix epoch, so every process (and the durable
+# schedule in the Pulse DB) agrees on when a given offset fires
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class PhasePlanner:
+    """
+    Assigns each table a phase offset within its check interval
+
+    Tables on the same connection with the same interval are spaced evenly
+    (interval / n apart); groups with different intervals are shifted by a
+    fraction of that spacing so they interleave instead of firing together.
+    Adding or removing a table rebalances only its connection.
+
+    With slot_seconds, offsets are snapped down to a grid of that size so
+    tables placed closer together than a slot fire at the same instant and
+    are dispatched as one per-connection batch.
+    """
+    
+    def __init__(self, slot_seconds: float = 0):
+        self.slot_seconds = slot_seconds
+        # {table_id: (connection_id, interval_seconds)}
+        self._tables: Dict[int, Tuple[Optional[int], int]] = {}
+        # {table_id: offset_seconds}
+        self._offsets: Dict[int, float] = {}
+    
+    def add(self, table_id: int, connection_id: Optional[int], interval_seconds: int) -> Dict[int, float]:
+        """
+        Place a table (or move it after an interval change)
+        Returns {table_id: offset} for every table whose offset changed
+        """
+        previous = self._tables.get(table_id)
+        self._tables[table_id] = (connection_id, interval_seconds)
+        changed = self._rebalance(connection_id)
+        if previous and previous[0] != connection_id:
+            changed.update(self._rebalance(previous[0]))
+        return changed
+    
+    def add_many(self, tables: Iterable[Tuple[int, Optional[int], int]]) -> Dict[int, float]:
+        """
+        Place many tables, rebalancing each affected connection once
+        tables: (table_id, connection_id, interval_seconds)
+        """
+        connections = set()
+        for table_id, connection_id, interval_seconds in tables:
+            previous = self._tables.get(table_id)
+            if previous:
+                connections.add(previous[0])
+            self._tables[table_id] = (connection_id, interval_seconds)
+            connections.add(connection_id)
+        
+        changed = {}
+        for connection_id in connections:
+            changed.update(self._rebalance(connection_id))
+        return changed
+    
+    def remove(self, table_id: int) -> Dict[int, float]:
+        """Forget a table; returns the offsets that changed on its connection"""
+        if table_id not in self._tables:
+            return {}
+        connection_id, _ = self._tables.pop(table_id)
+        self._offsets.pop(table_id, None)
+        return self._rebalance(connection_id)
+    
+    def placement(self, table_id: int) -> Tuple[int, float]:
+        """(interval_seconds, offset_seconds) for a placed table"""
+        return self._tables[table_id][1], self._offsets[table_id]
+    
+    def placements(self, connection_id: Optional[int]) -> List[Tuple[int, float]]:
+        """(interval_seconds, offset_seconds) for every table on a connection"""
+        return [
+            (interval, self._offsets[table_id])
+            for table_id, (conn_id, interval) in self._tables.items()
+            if conn_id == connection_id
+        ]
+    
+    def _rebalance(self, connection_id: Optional[int]) -> Dict[int, float]:
+        groups: Dict[int, List[int]] = {}
+        for table_id, (conn_id, interval) in self._tables.items():
+            if conn_id == connection_id:
+                groups.setdefault(interval, []).append(table_id)
+        
+        changed = {}
+        for group_index, interval in enumerate(sorted(groups)):
+            table_ids = sorted(groups[interval])
+            spacing = interval / len(table_ids)
+            for position, table_id in enumerate(table_ids):
+                offset = self._snap(spacing * (position + group_index / len(groups)))
+                if self._offsets.get(table_id) != offset:
+                    self._offsets[table_id] = offset
+                    changed[table_id] = offset
+        return changed
+    
+    def _snap(self, offset: float) -> float:
+        if not self.slot_seconds:
+            return offset
+        return (offset // self.slot_seconds) * self.slot_seconds
+
+
+def anchored_start(offset_seconds: float) -> datetime:
+    """Start date whose interval grid is offset from the epoch by offset_seconds"""
+    return EPOCH + timedelta(seconds=offset_seconds)
+
+
+def expected_qps_histogram(
+    placements: List[Tuple[int, float]],
+    bucket_seconds: int = 10,
+    cycle_seconds: int = 3600
+) -> Dict:
+    """
+    Expected check starts per second, bucketed over one cycle
+    placements: (interval_seconds, offset_seconds) per table
+    """
+    buckets = [0] * (cycle_seconds // bucket_seconds)
+    for interval, offset in placements:
+        fire = offset % interval
+        while fire < cycle_seconds:
+            buckets[int(fire // bucket_seconds)] += 1
+            fire += interval
+    
+    qps = [count / bucket_seconds for count in buckets]
+    return {
+        "bucket_seconds": bucket_seconds,
+        "qps": qps,
+        "peak_qps": max(qps, default=0.0),
+        "mean_qps": sum(qps) / len(qps) if qps else 0.0
+    }
@@ -2,17 +2,164 @@
 Timeouts, query budgets, guardrails
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
 from collections import defaultdict
-from typing import Dict
+from contextlib import asynccontextmanager, contextmanager
+from enum import Enum
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class _SlotWindow:
+    """
+    Sliding-window counter over fixed time slots
+    
+    The window is split into `slots` buckets on the monotonic clock, with a
+    running total, so checking or consuming capacity is O(1) (expiring slots
+    costs at most one step per slot that elapsed). Counts are accurate to one
+    slot width. Not synchronized; see SlidingWindowLimiter and
+    AsyncSlidingWindowLimiter.
+    """
+    
+    def __init__(
+        self,
+        limit: int,
+        window_seconds: float = 60.0,
+        slots: int = 60,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._slot_seconds = window_seconds / slots
+        self._counts = [0] * slots
+        self._total = 0
+        self._clock = clock
+        self._head = int(clock() // self._slot_seconds)  # Absolute index of the current slot
+    
+    def _advance(self) -> int:
+        """Expire slots that fell out of the window; returns the current slot"""
+        current = int(self._clock() // self._slot_seconds)
+        slots = len(self._counts)
+        if current - self._head >= slots:
+            self._counts = [0] * slots
+            self._total = 0
+        else:
+            for index in range(self._head + 1, current + 1):
+                self._total -= self._counts[index % slots]
+                self._counts[index % slots] = 0
+        self._head = max(self._head, current)
+        return self._head
+    
+    def _try_acquire(self, n: int) -> bool:
+        head = self._advance()
+        if self._total + n > self.limit:
+            return False
+        self._counts[head % len(self._counts)] += n
+        self._total += n
+        return True
+    
+    def _record(self, n: int):
+        head = self._advance()
+        self._counts[head % len(self._counts)] += n
+        self._total += n
+    
+    def _count(self) -> int:
+        self._advance()
+        return self._total
+    
+    def _retry_after(self, n: int) -> float:
+        """Seconds until n units fit in the window (0 if they fit now)"""
+        head = self._advance()
+        excess = self._total + n - self.limit
+        if excess <= 0:
+            return 0.0
+        
+        # Walk the oldest slots until enough capacity expires
+        slots = len(self._counts)
+        for age in range(slots - 1, -1, -1):
+            excess -= self._counts[(head - age) % slots]
+            if excess <= 0:
+                expires_at = (head - age + slots) * self._slot_seconds
+                return max(expires_at - self._clock(), 0.0)
+        return self.window_seconds
+
+
+class SlidingWindowLimiter(_SlotWindow):
+    """Thread-safe sliding-window rate limiter (check-and-reserve is atomic)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+    
+    def try_acquire(self, n: int = 1) -> bool:
+        """Reserve n units if they fit in the window"""
+        with self._lock:
+            return self._try_acquire(n)
+    
+    def record(self, n: int = 1):
+        """Count n units even if the window is full"""
+        with self._lock:
+            self._record(n)
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._count()
+    
+    def retry_after(self, n: int = 1) -> float:
+        with self._lock:
+            return self._retry_after(n)
+
+
+class AsyncSlidingWindowLimiter(_SlotWindow):
+    """
+    Sliding-window rate limiter for use on one event loop
+    Reservations never await, so they are atomic without a lock
+    """
+    
+    def try_acquire(self, n: int = 1) -> bool:
+        """Reserve n units if they fit in the window"""
+        return self._try_acquire(n)
+    
+    def record(self, n: int = 1):
+        """Count n units even if the window is full"""
+        self._record(n)
+    
+    def count(self) -> int:
+        return self._count()
+    
+    def retry_after(self, n: int = 1) -> float:
+        return self._retry_after(n)
+    
+    async def acquire(self, n: int = 1, timeout: Optional[float] = None) -> bool:
+        """Wait until n units fit, up to timeout seconds; False if they never did"""
+        deadline = None if timeout is None else self._clock() + timeout
+        while not self._try_acquire(n):
+            delay = self._retry_after(n)
+            if deadline is not None:
+                remaining = deadline - self._clock()
+                if remaining <= 0 or delay > remaining:
+                    return False
+            await asyncio.sleep(max(delay, self._slot_seconds / 10))
+        return True
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A query slot was requested while a guardrail limit was reached"""
+
+
 class SafetyGuardrails:
-    """Enforces safety guardrails per connection"""
+    """
+    Enforces safety guardrails per connection
+    
+    Queries hold a slot for their whole duration: use query_slot /
+    query_slot_async (or AdmissionController, which waits for one) so the
+    slot is always released, even when the query fails.
+    """
     
     def __init__(
         self,
@@ -25,48 +172,148 @@ class SafetyGuardrails:
         self.query_timeout_seconds = query_timeout_seconds or settings.QUERY_TIMEOUT_SECONDS
         
         # Track query counts per connection
-        self._query_timestamps: Dict[int, list] = defaultdict(list)
-        self._concurrent_queries: Dict[int, int] = defaultdict(int)
+        self._rate_limiters: Dict[int, SlidingWindowLimiter] = {}
+        self._concurrent_queries: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        
+        # Metrics per connection
+        self._peak_concurrent: Dict[int, int] = defaultdict(int)
+        self._reserved: Dict[int, int] = defaultdict(int)
+        self._rejected: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    
+    def _rate_limiter(self, connection_id: int) -> SlidingWindowLimiter:
+        limiter = self._rate_limiters.get(connection_id)
+        if limiter is None:
+            with self._lock:
+                limiter = self._rate_limiters.setdefault(
+                    connection_id, SlidingWindowLimiter(self.max_queries_per_minute)
+                )
+        return limiter
     
     def can_run_query(self, connection_id: int) -> bool:
-        """Check if a query can be run (respects rate limits)"""
-        now = datetime.utcnow()
-        minute_ago = now - timedelta(minutes=1)
-        
-        # Clean old timestamps
-        timestamps = self._query_timestamps[connection_id]
-        self._query_timestamps[connection_id] = [
-            ts for ts in timestamps if ts > minute_ago
-        ]
-        
-        # Check rate limit
-        if len(self._query_timestamps[connection_id]) >= self.max_queries_per_minute:
+        """
+        Check if a query can be run (respects rate limits)
+        Advisory only: use query_slot or try_reserve to check and record atomically
+        """
+        queries = self._rate_limiter(connection_id).count()
+        if queries >= self.max_queries_per_minute:
             logger.warning(
                 f"Rate limit exceeded for connection {connection_id}: "
-                f"{len(self._query_timestamps[connection_id])}/{self.max_queries_per_minute}"
+                f"{queries}/{self.max_queries_per_minute}"
             )
             return False
         
-        # Check concurrent queries
-        if self._concurrent_queries[connection_id] >= self.max_concurrent_queries:
+        concurrent = self._concurrent_queries.get(connection_id, 0)
+        if concurrent >= self.max_concurrent_queries:
             logger.warning(
                 f"Concurrent query limit exceeded for connection {connection_id}: "
-                f"{self._concurrent_queries[connection_id]}/{self.max_concurrent_queries}"
+                f"{concurrent}/{self.max_concurrent_queries}"
             )
             return False
         
         return True
     
+    def try_reserve(self, connection_id: int, record_rejection: bool = True) -> bool:
+        """
+        Atomically check the limits and take a query slot
+        Returns False (taking nothing) if either limit is reached. Every
+        successful reservation must be paired with release_query.
+        record_rejection: Log and count a refusal; callers that retry pass False
+        """
+        limiter = self._rate_limiter(connection_id)
+        with self._lock:
+            concurrent = self._concurrent_queries.get(connection_id, 0)
+            if concurrent >= self.max_concurrent_queries:
+                if record_rejection:
+                    self._rejected[connection_id]["concurrency"] += 1
+                    logger.warning(
+                        f"Concurrent query limit exceeded for connection {connection_id}: "
+                        f"{concurrent}/{self.max_concurrent_queries}"
+                    )
+                return False
+            
+            if not limiter.try_acquire():
+                if record_rejection:
+                    self._rejected[connection_id]["rate"] += 1
+                    logger.warning(
+                        f"Rate limit exceeded for connection {connection_id}: "
+                        f"{self.max_queries_per_minute}/{self.max_queries_per_minute}"
+                    )
+                return False
+            
+            concurrent += 1
+            self._concurrent_queries[connection_id] = concurrent
+            self._reserved[connection_id] += 1
+            if concurrent > self._peak_concurrent[connection_id]:
+                self._peak_concurrent[connection_id] = concurrent
+            return True
+    
+    def record_rejection(self, connection_id: int, reason: str):
+        """Count a query turned away outside try_reserve (e.g. an admission deadline)"""
+        with self._lock:
+            self._rejected[connection_id][reason] += 1
+    
+    @contextmanager
+    def query_slot(self, connection_id: int) -> Generator[None, None, None]:
+        """
+        Hold a query slot for the duration of the block
+        Raises QueryBudgetExceeded if the limits are reached
+        """
+        if not self.try_reserve(connection_id):
+            raise QueryBudgetExceeded(f"Query budget exceeded for connection {connection_id}")
+        try:
+            yield
+        finally:
+            self.release_query(connection_id)
+    
+    @asynccontextmanager
+    async def query_slot_async(self, connection_id: int) -> AsyncGenerator[None, None]:
+        """Async variant of query_slot (does not wait; see AdmissionController)"""
+        if not self.try_reserve(connection_id):
+            raise QueryBudgetExceeded(f"Query budget exceeded for connection {connection_id}")
+        try:
+            yield
+        finally:
+            self.release_query(connection_id)
+    
+    def at_concurrency_limit(self, connection_id: int) -> bool:
+        """Whether every concurrent query slot is taken"""
+        return self._concurrent_queries.get(connection_id, 0) >= self.max_concurrent_queries
+    
+    def retry_after(self, connection_id: int) -> float:
+        """Seconds until the rate limit admits another query (0 if it would now)"""
+        return self._rate_limiter(connection_id).retry_after()
+    
     def record_query(self, connection_id: int):
-        """Record that a query was executed"""
-        now = datetime.utcnow()
-        self._query_timestamps[connection_id].append(now)
-        self._concurrent_queries[connection_id] += 1
+        """
+        Record that a query was executed (rate budget only)
+        Concurrency is tracked by slots, which are released when the query ends
+        """
+        self._rate_limiter(connection_id).record()
     
     def release_query(self, connection_id: int):
         """Release a concurrent query slot"""
-        if self._concurrent_queries[connection_id] > 0:
-            self._concurrent_queries[connection_id] -= 1
+        with self._lock:
+            if self._concurrent_queries.get(connection_id, 0) > 0:
+                self._concurrent_queries[connection_id] -= 1
+            else:
+                logger.warning(f"Query slot released twice for connection {connection_id}")
+    
+    def get_stats(self, connection_id: int) -> Dict[str, Any]:
+        """Get rate usage, in-flight/peak queries and rejections for a connection"""
+        queries = self._rate_limiter(connection_id).count()
+        with self._lock:
+            rejected = dict(self._rejected.get(connection_id, {}))
+            return {
+                "queries_last_minute": queries,
+                "max_queries_per_minute": self.max_queries_per_minute,
+                "in_flight": self._concurrent_queries.get(connection_id, 0),
+                "peak_in_flight": self._peak_concurrent.get(connection_id, 0),
+                "max_concurrent_queries": self.max_concurrent_queries,
+                "reserved": self._reserved.get(connection_id, 0),
+                "rejected": sum(rejected.values()),
+                "rejected_by_reason": rejected
+            }
 
 
 class ReplicaSafety:
@@ -96,3 +343,72 @@ class ReplicaSafety:
         # Suppress if lag is very high (2x threshold)
         return lag_seconds > (settings.REPLICA_LAG_THRESHOLD_SECONDS * 2)
 
+
+class BackpressureState(str, Enum):
+    """How checks are throttled for a connection"""
+    NORMAL = "normal"
+    SLOW = "slow"  # Lag above threshold: run checks less often
+    PAUSED = "paused"  # Lag above 2x threshold: only probe lag until it recovers
+
+
+class ReplicaLagTracker:
+    """
+    Cached replica lag reading and the backpressure state derived from it
+    
+    The reading is refreshed at most every REPLICA_LAG_REFRESH_SECONDS, on a
+    connection the caller already has open, so checks never pay for a lag
+    query of their own. A paused connection resumes only once lag is back
+    under the threshold, so it doesn't flap around the pause level.
+    """
+    
+    def __init__(
+        self,
+        connection_id: int,
+        refresh_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.connection_id = connection_id
+        self.refresh_seconds = (
+            settings.REPLICA_LAG_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        )
+        self.lag_seconds: Optional[float] = None
+        self.state = BackpressureState.NORMAL
+        self._clock = clock
+        self._measured_at: Optional[float] = None
+    
+    def needs_refresh(self) -> bool:
+        return self._measured_at is None or self._clock() - self._measured_at >= self.refresh_seconds
+    
+    def update(self, lag_seconds: Optional[float]) -> BackpressureState:
+        """Record a lag reading and move to the matching state"""
+        self.lag_seconds = None if lag_seconds is None else float(lag_seconds)
+        self._measured_at = self._clock()
+        
+        if ReplicaSafety.should_suppress_checks(self.lag_seconds):
+            state = BackpressureState.PAUSED
+        elif not settings.BACKPRESSURE_ENABLED or ReplicaSafety.check_replica_lag(self.lag_seconds):
+            state = BackpressureState.NORMAL
+        elif self.state == BackpressureState.PAUSED:
+            state = BackpressureState.PAUSED  # Hold until lag is back under the threshold
+        else:
+            state = BackpressureState.SLOW
+        
+        if state != self.state:
+            logger.warning(
+                f"Replica lag {self.lag_seconds}s on connection {self.connection_id}: "
+                f"checks {self.state.value} -> {state.value}"
+            )
+            self.state = state
+        return state
+    
+    def record_failure(self):
+        """A lag probe failed: keep the current state and retry after the refresh interval"""
+        self._measured_at = self._clock()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        age = None if self._measured_at is None else round(self._clock() - self._measured_at, 3)
+        return {
+            "lag_seconds": self.lag_seconds,
+            "state": self.state.value,
+            "reading_age_seconds": age
+        }
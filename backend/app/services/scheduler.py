@@ -2,25 +2,77 @@
 Job scheduling logic using APScheduler
 """
 
+import asyncio
 import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
-from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.executors.asyncio import AsyncIOExecutor
 
-from app.workers.run_checks import run_scheduled_checks
+from app.config import settings
+from app.db.job_store import CheckScheduleStore, default_worker_id
+from app.db.pulse_db import pulse_db
+from app.db.replica_db import replica_db_manager
+from app.db.table_store import TableStore
+from app.services.baselines import baseline_service
+from app.services.check_maintenance import check_maintenance_service
+from app.services.check_results import check_result_writer
+from app.services.placement import PhasePlanner, anchored_start, expected_qps_histogram
+from app.utils.metrics import metrics
+from app.workers.run_checks import check_dispatcher, run_scheduled_checks
 
 logger = logging.getLogger(__name__)
 
+LATENESS_SECONDS = metrics.histogram(
+    "pulse_scheduler_lateness_seconds",
+    "Delay between a run's scheduled time and its start (durable mode: a table's due time and its claim)",
+    ("job",)
+)
+MISFIRES = metrics.counter(
+    "pulse_scheduler_misfires_total",
+    "Runs that did not happen: missed (past the grace time), max_instances (previous run still going) "
+    "or coalesced (folded into a later run)",
+    ("job", "reason")
+)
+
 
 class SchedulerService:
-    """Manages scheduled jobs for health checks"""
+    """
+    Manages scheduled jobs for health checks
+    
+    With SCHEDULER_JOB_STORE=pulse_db, per-table schedules live in the Pulse DB
+    (see CheckScheduleStore) and APScheduler only runs a short dispatch tick
+    that claims due tables, so schedules survive restarts and any number of
+    worker processes can share the load. The default "memory" store keeps one
+    APScheduler interval job per table, rebuilt from the tables table on startup.
+    
+    Either way each table gets a phase offset within its interval (see
+    PhasePlanner), so a connection's tables are spread evenly instead of all
+    firing on the same second and tripping its guardrails.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        job_store: Optional[CheckScheduleStore] = None,
+        table_store: Optional[TableStore] = None
+    ):
+        self.durable = job_store is not None or settings.SCHEDULER_JOB_STORE == "pulse_db"
+        self.job_store = job_store or (CheckScheduleStore() if self.durable else None)
+        self.table_store = table_store or TableStore()
+        self.worker_id = default_worker_id()
+        # Memory-store jobs fire on dispatch-sized slots so a connection's
+        # neighbouring tables still coalesce into one batch
+        self.planner = PhasePlanner(slot_seconds=settings.DISPATCH_COALESCE_SECONDS)
+        
         jobstores = {
             'default': MemoryJobStore()
         }
+        # Checks are coroutines; run them on the app's event loop rather than
+        # a thread pool so replica I/O is awaited instead of blocking threads
         executors = {
-            'default': ThreadPoolExecutor(10)
+            'default': AsyncIOExecutor()
         }
         job_defaults = {
             'coalesce': True,
@@ -32,6 +84,9 @@ class SchedulerService:
             executors=executors,
             job_defaults=job_defaults
         )
+        self.scheduler.add_listener(
+            self._record_job_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+        )
         self.is_running = False
     
     def start(self):
@@ -39,6 +94,62 @@ class SchedulerService:
         if not self.is_running:
             self.scheduler.start()
             self.is_running = True
+            
+            # Write-behind flush of baselines to the Pulse DB
+            self.scheduler.add_job(
+                baseline_service.flush,
+                'interval',
+                seconds=settings.BASELINE_FLUSH_INTERVAL_SECONDS,
+                id="flush_baselines",
+                replace_existing=True
+            )
+            
+            # Write-behind flush of buffered check results
+            self.scheduler.add_job(
+                check_result_writer.flush,
+                'interval',
+                seconds=settings.CHECK_RESULT_FLUSH_INTERVAL_SECONDS,
+                id="flush_check_results",
+                replace_existing=True
+            )
+            
+            # Checks partitions and rollups; first run right away so today's
+            # partition exists before results are flushed
+            self.scheduler.add_job(
+                check_maintenance_service.run,
+                'interval',
+                seconds=settings.CHECK_ROLLUP_INTERVAL_SECONDS,
+                next_run_time=datetime.now(timezone.utc),
+                id="maintain_checks",
+                replace_existing=True
+            )
+            
+            # Close Pulse DB connections that went idle
+            self.scheduler.add_job(
+                pulse_db.reap_idle,
+                'interval',
+                seconds=settings.PULSE_DB_POOL_MAX_IDLE_SECONDS,
+                id="reap_pulse_db_pool",
+                replace_existing=True
+            )
+            
+            # Replica pools share one limit per replica; idle connections hold slots
+            self.scheduler.add_job(
+                replica_db_manager.reap_idle,
+                'interval',
+                seconds=settings.REPLICA_POOL_MAX_IDLE_SECONDS,
+                id="reap_replica_pools",
+                replace_existing=True
+            )
+            
+            if self.durable:
+                self.scheduler.add_job(
+                    self.dispatch_due_checks,
+                    'interval',
+                    seconds=settings.SCHEDULER_TICK_SECONDS,
+                    id="dispatch_due_checks",
+                    replace_existing=True
+                )
             logger.info("Scheduler started")
     
     def shutdown(self):
@@ -48,35 +159,132 @@ class SchedulerService:
             self.is_running = False
             logger.info("Scheduler stopped")
     
-    def schedule_table_check(self, table_id: int, interval_minutes: int):
+    async def restore_schedules(self):
+        """
+        Rebuild schedules from the tables table (one bulk query)
+        The memory store re-places every table and adds its interval job
+        """
+        if self.durable:
+            count = await asyncio.to_thread(self.job_store.rebuild_from_tables)
+            logger.info(f"Restored schedules for {count} tables")
+            return
+        
+        tables = await asyncio.to_thread(self.table_store.list_schedules)
+        self.planner.add_many(
+            (table_id, connection_id, interval_minutes * 60)
+            for table_id, connection_id, interval_minutes in tables
+        )
+        for table_id, _, _ in tables:
+            self._add_check_job(table_id)
+        logger.info(f"Restored schedules for {len(tables)} tables")
+    
+    async def dispatch_due_checks(self):
+        """
+        Claim due tables from the durable store and run their checks
+        The claimed tables run as one dispatch, batched per connection. Leases
+        are released once the runs finish, whether they succeeded or not
+        """
+        claimed = await asyncio.to_thread(
+            self.job_store.claim_due,
+            self.worker_id,
+            settings.SCHEDULER_CLAIM_BATCH_SIZE,
+            settings.SCHEDULER_LEASE_SECONDS
+        )
+        if not claimed:
+            return
+        
+        logger.info(f"Claimed {len(claimed)} due tables")
+        now = datetime.now(timezone.utc)
+        for check in claimed:
+            if check.due_at is not None:
+                LATENESS_SECONDS.observe(max((now - check.due_at).total_seconds(), 0.0), "check_table")
+        try:
+            await check_dispatcher.run(check.table_id for check in claimed)
+        except Exception as e:
+            logger.error(f"Scheduled checks failed for {len(claimed)} tables: {e}")
+        
+        await asyncio.to_thread(
+            self.job_store.complete,
+            self.worker_id,
+            [check.table_id for check in claimed]
+        )
+    
+    @staticmethod
+    def _record_job_event(event):
+        """Scheduler lateness and misfires; per-table jobs share the check_table label"""
+        job = "check_table" if event.job_id.startswith("check_table_") else event.job_id
+        if event.code == EVENT_JOB_SUBMITTED:
+            run_times = event.scheduled_run_times
+            lateness = (datetime.now(timezone.utc) - run_times[-1]).total_seconds()
+            LATENESS_SECONDS.observe(max(lateness, 0.0), job)
+            if len(run_times) > 1:
+                MISFIRES.inc(job, "coalesced", amount=len(run_times) - 1)
+        elif event.code == EVENT_JOB_MISSED:
+            MISFIRES.inc(job, "missed")
+        else:
+            MISFIRES.inc(job, "max_instances")
+    
+    def schedule_table_check(self, table_id: int, interval_minutes: int, connection_id: int):
         """
         Schedule periodic checks for a table
+        Offsets of the other tables on the connection are rebalanced
         """
+        if self.durable:
+            self.job_store.upsert(table_id, interval_minutes)
+            logger.info(f"Scheduled checks for table {table_id} every {interval_minutes} minutes")
+            return
+        
+        changed = self.planner.add(table_id, connection_id, interval_minutes * 60)
+        changed.setdefault(table_id, self.planner.placement(table_id)[1])
+        for placed_id in changed:
+            self._add_check_job(placed_id)
+        logger.info(f"Scheduled checks for table {table_id} every {interval_minutes} minutes")
+    
+    def unschedule_table_check(self, table_id: int):
+        """Remove scheduled checks for a table"""
+        if self.durable:
+            self.job_store.remove(table_id)
+            logger.info(f"Unscheduled checks for table {table_id}")
+            return
+        
+        for placed_id in self.planner.remove(table_id):
+            self._add_check_job(placed_id)
+        
+        job_id = f"check_table_{table_id}"
+        if self.scheduler.get_job(job_id):
+            self.scheduler.remove_job(job_id)
+            logger.info(f"Unscheduled checks for table {table_id}")
+    
+    def _add_check_job(self, table_id: int):
+        """(Re)add a table's interval job on its planned phase"""
+        interval_seconds, offset_seconds = self.planner.placement(table_id)
         job_id = f"check_table_{table_id}"
         
-        # Remove existing job if any
+        # Remove existing job if any (also covers jobs pending until start)
         if self.scheduler.get_job(job_id):
             self.scheduler.remove_job(job_id)
         
-        # Add new job
         self.scheduler.add_job(
             run_scheduled_checks,
             'interval',
-            minutes=interval_minutes,
+            seconds=interval_seconds,
+            start_date=anchored_start(offset_seconds),
             id=job_id,
             args=[table_id],
             replace_existing=True
         )
-        logger.info(f"Scheduled checks for table {table_id} every {interval_minutes} minutes")
     
-    def unschedule_table_check(self, table_id: int):
-        """Remove scheduled checks for a table"""
-        job_id = f"check_table_{table_id}"
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
-            logger.info(f"Unscheduled checks for table {table_id}")
+    def expected_load(self, connection_id: int, bucket_seconds: int = 10) -> Dict[str, Any]:
+        """Expected check starts per second on a connection over one hour"""
+        if self.durable:
+            placements = self.job_store.placements(connection_id)
+        else:
+            placements = self.planner.placements(connection_id)
+        
+        histogram = expected_qps_histogram(placements, bucket_seconds)
+        histogram["tables"] = len(placements)
+        return histogram
 
 
 # Singleton instance
 scheduler_service = SchedulerService()
-
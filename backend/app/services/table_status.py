@@ -0,0 +1,128 @@
+"""
+Dashboard status per table: incremental projection plus read-through cache
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.config import settings
+from app.db.table_status_store import TableStatusStore
+from app.models.core import CheckStatus
+
+logger = logging.getLogger(__name__)
+
+
+class TableStatusService:
+    """
+    Keeps the table_status projection current and serves it from memory
+
+    The dispatcher hands over each tick's check result rows (after alerts were
+    evaluated); the newest result per monitor and the table's active alert
+    count are upserted in one statement and the tables' cache entries are
+    invalidated. Reads are O(1) per cached table; misses are loaded in one
+    query and cached for TABLE_STATUS_CACHE_TTL_SECONDS, which bounds
+    staleness for results written by other processes.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[TableStatusStore] = None,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.store = store or TableStatusStore()
+        self.ttl_seconds = settings.TABLE_STATUS_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.clock = clock
+        
+        self._cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}  # {table_id: (expires_at, status)}
+        # Bumped on invalidation, so a load that raced an update is not cached
+        self._versions: Dict[int, int] = {}
+        
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.failed_updates = 0
+    
+    async def record_results(self, rows: List[Dict[str, Any]]):
+        """
+        Fold check result rows into the projection
+        rows: as buffered for the checks table; skipped checks say nothing about the data
+        """
+        updates: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            if row["status"] == CheckStatus.SKIPPED.value:
+                continue
+            
+            executed_at = row["executed_at"].isoformat()
+            update = updates.setdefault(row["table_id"], {
+                "table_id": row["table_id"],
+                "last_checks": {},
+                "last_check_at": executed_at
+            })
+            update["last_checks"][row["monitor_type"]] = {
+                "status": row["status"],
+                "executed_at": executed_at,
+                "error_message": row["error_message"]
+            }
+            update["last_check_at"] = max(update["last_check_at"], executed_at)
+        
+        if not updates:
+            return
+        
+        try:
+            await asyncio.to_thread(self.store.apply, list(updates.values()))
+            self.updates += len(updates)
+        except Exception as e:
+            self.failed_updates += 1
+            logger.error(f"Failed to update status for {len(updates)} tables: {e}")
+        finally:
+            self.invalidate(updates)
+    
+    def invalidate(self, table_ids: Iterable[int]):
+        """Drop cached status so the next read reloads it"""
+        for table_id in table_ids:
+            self._cache.pop(table_id, None)
+            self._versions[table_id] = self._versions.get(table_id, 0) + 1
+    
+    async def get(self, table_id: int) -> Optional[Dict[str, Any]]:
+        """Get one table's status (None if the table does not exist)"""
+        return (await self.get_many([table_id])).get(table_id)
+    
+    async def get_many(self, table_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Get status for many tables; cache misses are loaded in one query"""
+        now = self.clock()
+        found: Dict[int, Dict[str, Any]] = {}
+        missing = []
+        for table_id in table_ids:
+            entry = self._cache.get(table_id)
+            if entry is not None and entry[0] > now:
+                found[table_id] = entry[1]
+            else:
+                missing.append(table_id)
+        
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            versions = {table_id: self._versions.get(table_id, 0) for table_id in missing}
+            loaded = await asyncio.to_thread(self.store.load, missing)
+            expires_at = self.clock() + self.ttl_seconds
+            for table_id, status in loaded.items():
+                if self._versions.get(table_id, 0) == versions[table_id]:
+                    self._cache[table_id] = (expires_at, status)
+            found.update(loaded)
+        return found
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache and update counters"""
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "updates": self.updates,
+            "failed_updates": self.failed_updates
+        }
+
+
+# Singleton instance
+table_status_service = TableStatusService()
@@ -4,6 +4,11 @@ App startup hooks (scheduler, health checks)
 
 import logging
 from app.config import settings
+from app.db.pulse_db import pulse_db
+from app.db.replica_db import replica_db_manager
+from app.services.baselines import baseline_service
+from app.services.check_results import check_result_writer
+from app.services.notifications import notification_queue
 from app.services.scheduler import scheduler_service
 
 logger = logging.getLogger(__name__)
@@ -13,7 +18,15 @@ async def on_startup():
     """Initialize services on startup"""
     logger.info("Starting Pulse application...")
     
-    # Start the scheduler
+    # Open the Pulse DB pools; if the database is not up yet they fill lazily
+    try:
+        await pulse_db.open()
+        logger.info("Pulse DB connection pools opened")
+    except Exception as e:
+        logger.warning(f"Could not pre-open Pulse DB connections: {e}")
+    
+    # Start the scheduler (restoring table schedules first)
+    await scheduler_service.restore_schedules()
     scheduler_service.start()
     logger.info("Scheduler started")
     
@@ -28,5 +41,25 @@ async def on_shutdown():
     scheduler_service.shutdown()
     logger.info("Scheduler stopped")
     
+    # Send pending alert digests
+    await notification_queue.close()
+    logger.info("Notification queue drained")
+    
+    # Write out buffered check results
+    await check_result_writer.close()
+    logger.info("Check results flushed")
+    
+    # Persist baselines changed since the last write-behind flush
+    await baseline_service.flush()
+    logger.info("Baselines flushed")
+    
+    # Close pooled replica connections
+    await replica_db_manager.close_all()
+    logger.info("Replica connection pools closed")
+    
+    # Close the Pulse DB pools last; the flushes above still need them
+    await pulse_db.close()
+    logger.info("Pulse DB connection pools closed")
+    
     logger.info("Pulse application shut down")
 
@@ -0,0 +1,202 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format
+"""
+
+import bisect
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Text exposition format; the response adds "; charset=utf-8"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Latency buckets in seconds: 1ms up to a minute (replica statement timeouts)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    One metric family; label values are passed positionally in labelnames order
+    Values are kept as given and only turned into strings when rendered, so
+    recording is a dict lookup under a lock.
+    """
+    
+    type = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, Any] = {}
+    
+    def _check_labels(self, labels: Tuple):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+    
+    def clear(self):
+        """Drop all label sets (collectors refill gauges on every scrape)"""
+        with self._lock:
+            self._values.clear()
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+    
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        samples = self._samples()
+        return header + "".join(sample + "\n" for sample in samples)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    
+    type = "counter"
+    
+    def inc(self, *labels: Any, amount: float = 1):
+        self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def set(self, value: float, *labels: Any):
+        """Mirror a counter that is kept elsewhere (e.g. pool stats), from a collector"""
+        self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = value
+    
+    def get(self, *labels: Any) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    """Value that goes up and down; usually set by a collector at scrape time"""
+    
+    type = "gauge"
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, plus their sum and count"""
+    
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, *labels: Any):
+        self._check_labels(labels)
+        index = bisect.bisect_left(self.buckets, value)  # First bucket with value <= upper bound
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, the last one for +Inf, then the sum
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+    
+    def get(self, *labels: Any) -> Tuple[int, float]:
+        """Get (count, sum) for a label set"""
+        with self._lock:
+            state = self._values.get(labels)
+            return (sum(state[0]), state[1]) if state else (0, 0.0)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        
+        names = self.labelnames + ("le",)
+        samples = []
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            samples.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            samples.append(f"{self.name}_count{label_text} {cumulative}")
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Named metrics plus collectors that refresh gauges right before a scrape
+    State that is already tracked elsewhere (pool and guardrail stats) is
+    read by collectors instead of being recorded twice on the hot path.
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if type(existing) is not metric_class:
+                    raise ValueError(f"Metric {name} is already registered as a {existing.type}")
+                return existing
+            metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+    
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a function that updates metrics before each render"""
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        for collector in self._collectors:
+            collector()
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "".join(metric.render() for metric in metrics)
+
+
+# Singleton instance
+metrics = MetricsRegistry()
@@ -2,31 +2,264 @@
 Entry point for scheduled checks
 """
 
+import asyncio
 import logging
-from app.services.checker import checker_service
-from app.services.alerts import alert_service
-from app.models.core import MonitorType, CheckStatus
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app.config import settings
+from app.db.replica_db import replica_db_manager
+from app.db.table_store import TableStore
+from app.services.checker import CheckerService, checker_service
+from app.services.alerts import AlertCheck, AlertService, alert_service
+from app.services.check_results import CheckResultWriter, check_result_writer
+from app.services.safety import BackpressureState
+from app.services.table_status import TableStatusService, table_status_service
+from app.models.core import MonitorType, CheckStatus, CheckSpec
 
 logger = logging.getLogger(__name__)
 
 
-async def run_scheduled_checks(table_id: int):
+class CheckDispatcher:
     """
-    Run scheduled health checks for a table
-    Called by the scheduler
+    Runs due checks grouped by connection
+
+    All tables due in a tick are loaded with one query, grouped by
+    connection_id and handed to CheckerService.run_checks_batch, so each
+    connection's checks share one pooled connection and batched probes.
+    Tables that are failing or alerting form their own higher-priority batch,
+    so they are admitted first when a connection's budget is contended.
+    Results are then fanned back out per table: buffered for a bulk write
+    (see CheckResultWriter), fed to alerting, and folded into the
+    table_status projection.
+    
+    Connections whose replica is lagging are throttled from their cached lag
+    reading: SLOW runs each table on every LAG_SLOWDOWN_FACTOR-th due time,
+    PAUSED runs nothing but the periodic lag probe until the replica recovers,
+    and suppresses the connection's alerts, so the stale reads right after a
+    failover do not open an alert per table.
     """
-    logger.info(f"Running scheduled checks for table {table_id}")
     
-    # TODO: Fetch table configuration from database
-    # For now, this is a placeholder
+    def __init__(
+        self,
+        checker: Optional[CheckerService] = None,
+        table_store: Optional[TableStore] = None,
+        result_writer: Optional[CheckResultWriter] = None,
+        alerts: Optional[AlertService] = None,
+        table_status: Optional[TableStatusService] = None,
+        coalesce_seconds: Optional[float] = None
+    ):
+        self.checker = checker or checker_service
+        self.table_store = table_store or TableStore()
+        self.result_writer = result_writer or check_result_writer
+        self.alerts = alerts or alert_service
+        self.table_status = table_status or table_status_service
+        self.coalesce_seconds = (
+            settings.DISPATCH_COALESCE_SECONDS if coalesce_seconds is None else coalesce_seconds
+        )
+        
+        # Tables submitted since the last tick, and the future their callers await
+        self._pending: Set[int] = set()
+        self._tick: Optional[asyncio.Future] = None
+        
+        # Due times skipped per table while its connection is slowed down
+        self._deferred: Dict[int, int] = defaultdict(int)
+    
+    async def submit(self, table_id: int):
+        """
+        Queue a table for the next tick and wait until its checks have run
+        Tables submitted within coalesce_seconds of each other run together
+        """
+        loop = asyncio.get_running_loop()
+        if self._tick is None:
+            self._tick = loop.create_future()
+            loop.call_later(self.coalesce_seconds, self._start_tick)
+        
+        self._pending.add(table_id)
+        await asyncio.shield(self._tick)
+    
+    def _start_tick(self):
+        table_ids, self._pending = self._pending, set()
+        tick, self._tick = self._tick, None
+        task = asyncio.get_running_loop().create_task(self.run(table_ids))
+        
+        def finish(done: asyncio.Task):
+            if done.cancelled():
+                tick.cancel()
+            elif done.exception():
+                tick.set_exception(done.exception())
+            else:
+                tick.set_result(None)
+        
+        task.add_done_callback(finish)
+    
+    async def run(self, table_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Run every check of the given tables, one batch per connection
+        Returns results per table_id
+        """
+        table_ids = list(table_ids)
+        if not table_ids:
+            return {}
+        
+        targets = await asyncio.to_thread(self.table_store.load_check_specs, table_ids)
+        targets = await self._apply_backpressure(targets)
+        groups: Dict[Tuple[int, int], List[CheckSpec]] = defaultdict(list)
+        for connection_id, spec in targets:
+            groups[(connection_id, self._priority(spec.table_id))].append(spec)
+        if not groups:
+            return {}
+        
+        logger.info(f"Running checks for {len(table_ids)} tables in {len(groups)} connection batches")
+        outcomes = await asyncio.gather(
+            *(
+                self.checker.run_checks_batch(connection_id, specs, priority)
+                for (connection_id, priority), specs in groups.items()
+            ),
+            return_exceptions=True
+        )
+        
+        specs: List[CheckSpec] = []
+        results: List[Dict[str, Any]] = []
+        for ((connection_id, _), group), outcome in zip(groups.items(), outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Checks failed for connection {connection_id}: {outcome}")
+                outcome = [
+                    {
+                        "status": CheckStatus.ERROR,
+                        "error_message": str(outcome),
+                        "result_data": {}
+                    }
+                    for _ in group
+                ]
+            specs.extend(group)
+            results.extend(outcome)
+        
+        await self.handle_results(specs, results, {spec.table_id: cid for cid, spec in targets})
+        
+        by_table: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for spec, result in zip(specs, results):
+            by_table[spec.table_id].append(result)
+        return by_table
+    
+    async def _apply_backpressure(self, targets: List[Tuple[int, CheckSpec]]) -> List[Tuple[int, CheckSpec]]:
+        """Drop checks for paused connections and thin out those that are slowed down"""
+        states: Dict[int, BackpressureState] = {}
+        for connection_id in {connection_id for connection_id, _ in targets}:
+            replica_conn = replica_db_manager.get_connection(connection_id)
+            if not replica_conn:
+                continue
+            if replica_conn.lag.state == BackpressureState.PAUSED:
+                # Nothing else will touch this replica, so probe lag directly
+                await self.checker.refresh_replica_lag(connection_id)
+            if replica_conn.lag.state == BackpressureState.PAUSED:
+                # Keeps the window open until ALERT_SUPPRESSION_SECONDS after the replica recovers
+                await asyncio.to_thread(
+                    self.alerts.suppress_connection,
+                    connection_id,
+                    f"replica lag {replica_conn.lag.lag_seconds}s"
+                )
+            if replica_conn.lag.state != BackpressureState.NORMAL:
+                states[connection_id] = replica_conn.lag.state
+        
+        if not states:
+            return targets
+        
+        kept = []
+        tables_due = set()
+        for connection_id, spec in targets:
+            state = states.get(connection_id, BackpressureState.NORMAL)
+            if state == BackpressureState.NORMAL:
+                kept.append((connection_id, spec))
+            elif state == BackpressureState.SLOW:
+                tables_due.add(spec.table_id)
+                if self._deferred[spec.table_id] + 1 >= settings.LAG_SLOWDOWN_FACTOR:
+                    kept.append((connection_id, spec))
+        
+        for table_id in tables_due:
+            self._deferred[table_id] = (self._deferred[table_id] + 1) % settings.LAG_SLOWDOWN_FACTOR
+        
+        for connection_id, state in states.items():
+            logger.info(f"Connection {connection_id} is {state.value} due to replica lag")
+        return kept
+    
+    def _priority(self, table_id: int) -> int:
+        """Failing tables are checked first"""
+        return 1 if self.alerts.is_failing(table_id) else 0
     
-    # Example check flow:
-    # 1. Get table config (connection_id, schema, table, monitor_types)
-    # 2. For each monitor_type:
-    #    - Run check
-    #    - Store result
-    #    - Check if alert should be created
-    #    - Create/resolve alerts as needed
+    async def handle_results(
+        self,
+        specs: List[CheckSpec],
+        results: List[Dict[str, Any]],
+        connection_ids: Optional[Dict[int, int]] = None
+    ):
+        """
+        Buffer results for the write-behind flush, then update alert state and table status
+        connection_ids: table_id -> connection_id, used to group alert notifications
+        """
+        connection_ids = connection_ids or {}
+        executed_at = datetime.now(timezone.utc)
+        rows = []
+        alert_checks = []
+        for spec, result in zip(specs, results):
+            status = self.evaluate(spec, result)
+            rows.append({
+                "table_id": spec.table_id,
+                "monitor_type": spec.monitor_type.value,
+                "status": status.value,
+                "result_data": result.get("result_data") or {},
+                "error_message": result.get("error_message"),
+                "executed_at": executed_at
+            })
+            if status != CheckStatus.SKIPPED:  # Budget skips say nothing about the data
+                alert_checks.append(self._alert_check(spec, status, result, connection_ids.get(spec.table_id)))
+        
+        await self.result_writer.add(rows)
+        await self.alerts.evaluate(alert_checks, settings.ALERT_THRESHOLD_FAILURES)
+        await self.table_status.record_results(rows)
     
-    logger.info(f"Completed checks for table {table_id}")
+    @staticmethod
+    def evaluate(spec: CheckSpec, result: Dict[str, Any]) -> CheckStatus:
+        """
+        Turn a check result into a pass/fail status
+        Queries that ran successfully fail when they found a data problem
+        """
+        status = result["status"]
+        if status != CheckStatus.SUCCESS:
+            return status
+        
+        data = result.get("result_data") or {}
+        if spec.monitor_type == MonitorType.FRESHNESS:
+            failed = data.get("is_stale")
+        elif spec.monitor_type == MonitorType.VOLUME:
+            failed = data.get("is_anomaly") or data.get("has_zero_rows")
+        else:
+            failed = data.get("schema_changed")
+        return CheckStatus.FAILURE if failed else CheckStatus.SUCCESS
+    
+    @staticmethod
+    def _alert_check(
+        spec: CheckSpec,
+        status: CheckStatus,
+        result: Dict[str, Any],
+        connection_id: Optional[int]
+    ) -> AlertCheck:
+        table = f"{spec.schema_name}.{spec.table_name}"
+        if status == CheckStatus.SUCCESS:
+            message = f"{spec.monitor_type.value} check passing again for {table}"
+        else:
+            detail = result.get("error_message") or status.value
+            message = f"{spec.monitor_type.value} check failed for {table}: {detail}"
+        return AlertCheck(spec.table_id, spec.monitor_type, status != CheckStatus.SUCCESS, message, connection_id)
+
+
+# Singleton instance
+check_dispatcher = CheckDispatcher()
+
 
+async def run_scheduled_checks(table_id: int):
+    """
+    Run scheduled health checks for a table
+    Called by the scheduler; tables due together are batched per connection
+    """
+    await check_dispatcher.submit(table_id)
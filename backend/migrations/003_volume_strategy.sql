@@ -0,0 +1,5 @@
+-- Per-table volume measurement strategy
+
+-- 'exact' (COUNT(*)), 'estimate' (catalog statistics), 'windowed' (COUNT(*) over time_column window)
+ALTER TABLE tables ADD COLUMN volume_strategy VARCHAR(50) NOT NULL DEFAULT 'exact';
+ALTER TABLE tables ADD COLUMN volume_window_minutes INTEGER; -- Window for 'windowed', defaults to DEFAULT_VOLUME_WINDOW_MINUTES
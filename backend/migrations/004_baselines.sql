@@ -0,0 +1,21 @@
+-- Persistent baselines so anomaly detection survives restarts
+
+-- Volume baselines: recent window plus running aggregates per monitored table
+CREATE TABLE volume_baselines (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    recent_values BIGINT[] NOT NULL, -- Oldest first, at most window_size values
+    sample_count INTEGER NOT NULL,
+    value_sum NUMERIC NOT NULL,
+    value_sum_sq NUMERIC NOT NULL,
+    min_value BIGINT,
+    max_value BIGINT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Last known schema per table
+CREATE TABLE schema_snapshots (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    snapshot JSONB NOT NULL,
+    fingerprint VARCHAR(64),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
@@ -0,0 +1,15 @@
+-- Durable check schedule shared by all worker processes
+
+-- One row per monitored table. Workers claim due rows with
+-- FOR UPDATE SKIP LOCKED, so each run is executed by exactly one worker.
+CREATE TABLE check_schedule (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    connection_id INTEGER NOT NULL REFERENCES connections(id) ON DELETE CASCADE,
+    interval_minutes INTEGER NOT NULL,
+    next_run_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    lease_owner VARCHAR(255), -- Worker currently running the checks
+    lease_expires_at TIMESTAMP WITH TIME ZONE, -- Claimable again after this if the worker died
+    last_run_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX idx_check_schedule_due ON check_schedule(next_run_at);
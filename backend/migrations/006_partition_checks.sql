@@ -0,0 +1,132 @@
+-- Time-partitioned check results with hourly/daily rollups
+
+-- checks becomes range-partitioned by day on executed_at. Partitions are
+-- named checks_YYYYMMDD (UTC days), created ahead of time and dropped after
+-- CHECKS_RETENTION_DAYS by the scheduler's maintenance job. There is no
+-- default partition: a row outside every partition fails its flush and is
+-- retried once the maintenance job has created the partition.
+ALTER TABLE checks RENAME TO checks_unpartitioned;
+ALTER INDEX idx_checks_table_id RENAME TO idx_checks_unpartitioned_table_id;
+ALTER INDEX idx_checks_executed_at RENAME TO idx_checks_unpartitioned_executed_at;
+ALTER INDEX idx_checks_recent RENAME TO idx_checks_unpartitioned_recent;
+
+CREATE TABLE checks (
+    id BIGSERIAL,
+    table_id INTEGER NOT NULL REFERENCES tables(id) ON DELETE CASCADE,
+    monitor_type VARCHAR(50) NOT NULL, -- 'freshness', 'volume', 'schema'
+    status VARCHAR(50) NOT NULL, -- 'success', 'failure', 'error', 'skipped'
+    result_data JSONB,
+    error_message TEXT,
+    executed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, executed_at)
+) PARTITION BY RANGE (executed_at);
+
+-- One index serves both per-table history and time-range scans (with pruning)
+CREATE INDEX idx_checks_table_executed_at ON checks(table_id, executed_at DESC);
+
+-- Index for recent checks per table and monitor (from 002)
+CREATE INDEX idx_checks_recent ON checks(table_id, monitor_type, executed_at DESC);
+
+-- Partitions for existing rows plus the next week, then copy the rows over
+DO $$
+DECLARE
+    day DATE;
+    last_day DATE;
+BEGIN
+    SELECT COALESCE(MIN((executed_at AT TIME ZONE 'UTC')::date), (NOW() AT TIME ZONE 'UTC')::date)
+    INTO day
+    FROM checks_unpartitioned;
+    last_day := (NOW() AT TIME ZONE 'UTC')::date + 7;
+
+    WHILE day <= last_day LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF checks FOR VALUES FROM (%L) TO (%L)',
+            'checks_' || to_char(day, 'YYYYMMDD'),
+            day::timestamp AT TIME ZONE 'UTC',
+            (day + 1)::timestamp AT TIME ZONE 'UTC'
+        );
+        day := day + 1;
+    END LOOP;
+END $$;
+
+INSERT INTO checks (id, table_id, monitor_type, status, result_data, error_message, executed_at)
+SELECT id, table_id, monitor_type, status, result_data, error_message, COALESCE(executed_at, NOW())
+FROM checks_unpartitioned;
+
+SELECT setval(pg_get_serial_sequence('checks', 'id'), COALESCE((SELECT MAX(id) FROM checks), 0) + 1, false);
+
+DROP TABLE checks_unpartitioned;
+
+-- Rollups: one row per table, monitor and UTC hour/day. Dashboards read these
+-- instead of raw checks; they outlive the raw partitions. The row count
+-- columns aggregate result_data.row_count of volume checks.
+CREATE TABLE check_rollups_hourly (
+    table_id INTEGER NOT NULL REFERENCES tables(id) ON DELETE CASCADE,
+    monitor_type VARCHAR(50) NOT NULL,
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    check_count INTEGER NOT NULL,
+    success_count INTEGER NOT NULL,
+    failure_count INTEGER NOT NULL,
+    error_count INTEGER NOT NULL,
+    skipped_count INTEGER NOT NULL,
+    success_rate DOUBLE PRECISION GENERATED ALWAYS AS (
+        success_count::double precision / NULLIF(check_count - skipped_count, 0)
+    ) STORED, -- Skipped checks say nothing about the data
+    row_count_min BIGINT,
+    row_count_max BIGINT,
+    row_count_sum NUMERIC,
+    row_count_samples INTEGER NOT NULL DEFAULT 0,
+    row_count_avg DOUBLE PRECISION GENERATED ALWAYS AS (
+        row_count_sum::double precision / NULLIF(row_count_samples, 0)
+    ) STORED,
+    PRIMARY KEY (table_id, monitor_type, bucket_start)
+);
+
+CREATE TABLE check_rollups_daily (LIKE check_rollups_hourly INCLUDING DEFAULTS INCLUDING GENERATED);
+ALTER TABLE check_rollups_daily ADD PRIMARY KEY (table_id, monitor_type, bucket_start);
+ALTER TABLE check_rollups_daily
+    ADD FOREIGN KEY (table_id) REFERENCES tables(id) ON DELETE CASCADE;
+
+CREATE INDEX idx_check_rollups_hourly_bucket ON check_rollups_hourly(bucket_start);
+CREATE INDEX idx_check_rollups_daily_bucket ON check_rollups_daily(bucket_start);
+
+-- Backfill rollups for the rows copied above
+INSERT INTO check_rollups_hourly (
+    table_id, monitor_type, bucket_start, check_count, success_count, failure_count,
+    error_count, skipped_count, row_count_min, row_count_max, row_count_sum, row_count_samples
+)
+SELECT
+    table_id,
+    monitor_type,
+    date_trunc('hour', executed_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+    COUNT(*),
+    COUNT(*) FILTER (WHERE status = 'success'),
+    COUNT(*) FILTER (WHERE status = 'failure'),
+    COUNT(*) FILTER (WHERE status = 'error'),
+    COUNT(*) FILTER (WHERE status = 'skipped'),
+    MIN((result_data->>'row_count')::numeric::bigint),
+    MAX((result_data->>'row_count')::numeric::bigint),
+    SUM((result_data->>'row_count')::numeric::bigint),
+    COUNT(result_data->>'row_count')
+FROM checks
+GROUP BY 1, 2, 3;
+
+INSERT INTO check_rollups_daily (
+    table_id, monitor_type, bucket_start, check_count, success_count, failure_count,
+    error_count, skipped_count, row_count_min, row_count_max, row_count_sum, row_count_samples
+)
+SELECT
+    table_id,
+    monitor_type,
+    date_trunc('day', bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+    SUM(check_count),
+    SUM(success_count),
+    SUM(failure_count),
+    SUM(error_count),
+    SUM(skipped_count),
+    MIN(row_count_min),
+    MAX(row_count_max),
+    SUM(row_count_sum),
+    SUM(row_count_samples)
+FROM check_rollups_hourly
+GROUP BY 1, 2, 3;
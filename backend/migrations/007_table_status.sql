@@ -0,0 +1,53 @@
+-- Per-table status projection for the dashboard
+
+-- One row per table, updated incrementally as check results and alerts are
+-- written, so status endpoints never aggregate checks or alerts per request.
+-- last_checks holds the latest non-skipped result per monitor type:
+-- {"volume": {"status": "failure", "executed_at": "...", "error_message": null}, ...}
+CREATE TABLE table_status (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    last_checks JSONB NOT NULL DEFAULT '{}',
+    last_check_at TIMESTAMP WITH TIME ZONE,
+    active_alert_count INTEGER NOT NULL DEFAULT 0,
+    -- red: active alerts, yellow: a monitor's latest check failed, green: all passing
+    status VARCHAR(20) GENERATED ALWAYS AS (
+        CASE
+            WHEN active_alert_count > 0 THEN 'red'
+            WHEN jsonb_path_exists(last_checks, '$.*.status ? (@ == "failure" || @ == "error")') THEN 'yellow'
+            WHEN last_checks = '{}'::jsonb THEN 'unknown'
+            ELSE 'green'
+        END
+    ) STORED,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Backfill from the latest check per monitor and the active alerts
+INSERT INTO table_status (table_id, last_checks, last_check_at, active_alert_count)
+SELECT
+    t.id,
+    COALESCE(latest.last_checks, '{}'::jsonb),
+    latest.last_check_at,
+    COALESCE(active.alert_count, 0)
+FROM tables t
+LEFT JOIN (
+    SELECT
+        table_id,
+        jsonb_object_agg(
+            monitor_type,
+            jsonb_build_object('status', status, 'executed_at', executed_at, 'error_message', error_message)
+        ) AS last_checks,
+        MAX(executed_at) AS last_check_at
+    FROM (
+        SELECT DISTINCT ON (table_id, monitor_type) table_id, monitor_type, status, executed_at, error_message
+        FROM checks
+        WHERE status <> 'skipped'
+        ORDER BY table_id, monitor_type, executed_at DESC
+    ) last_per_monitor
+    GROUP BY table_id
+) latest ON latest.table_id = t.id
+LEFT JOIN (
+    SELECT table_id, COUNT(*) AS alert_count
+    FROM alerts
+    WHERE status = 'active'
+    GROUP BY table_id
+) active ON active.table_id = t.id;
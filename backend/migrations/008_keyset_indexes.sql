@@ -0,0 +1,26 @@
+-- Indexes for keyset (cursor) pagination on (created_at, id), newest first
+
+-- Row comparisons on (created_at, id) skip NULLs, so the key must be set
+UPDATE alerts SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE alerts ALTER COLUMN created_at SET NOT NULL;
+UPDATE tables SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE tables ALTER COLUMN created_at SET NOT NULL;
+
+-- All alerts; replaces the created_at-only index
+DROP INDEX IF EXISTS idx_alerts_created_at;
+CREATE INDEX idx_alerts_created_at ON alerts(created_at DESC, id DESC);
+
+-- Alerts of one table; replaces the table_id-only index
+DROP INDEX IF EXISTS idx_alerts_table_id;
+CREATE INDEX idx_alerts_table_created_at ON alerts(table_id, created_at DESC, id DESC);
+
+-- Active alerts only (the common dashboard filter); replaces (table_id, status)
+DROP INDEX IF EXISTS idx_alerts_active;
+CREATE INDEX idx_alerts_active ON alerts(table_id, created_at DESC, id DESC)
+WHERE status = 'active';
+CREATE INDEX idx_alerts_active_created_at ON alerts(created_at DESC, id DESC)
+WHERE status = 'active';
+
+-- Monitored tables, overall and per connection
+CREATE INDEX idx_tables_created_at ON tables(created_at DESC, id DESC);
+CREATE INDEX idx_tables_connection_created_at ON tables(connection_id, created_at DESC, id DESC);
@@ -0,0 +1,25 @@
+-- Durable alert state shared by all worker processes
+
+-- At most one active alert per table and monitor. Older duplicates left by
+-- in-memory alerting are resolved so the index can be built.
+UPDATE alerts a SET status = 'resolved', resolved_at = NOW()
+WHERE a.status = 'active'
+  AND EXISTS (
+      SELECT 1 FROM alerts b
+      WHERE b.table_id = a.table_id
+        AND b.monitor_type = a.monitor_type
+        AND b.status = 'active'
+        AND b.id > a.id
+  );
+
+CREATE UNIQUE INDEX uq_alerts_active_monitor ON alerts(table_id, monitor_type)
+WHERE status = 'active';
+
+-- Consecutive failures per table and monitor (reset by a passing check)
+CREATE TABLE alert_state (
+    table_id INTEGER NOT NULL REFERENCES tables(id) ON DELETE CASCADE,
+    monitor_type VARCHAR(50) NOT NULL,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (table_id, monitor_type)
+);
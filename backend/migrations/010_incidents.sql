@@ -0,0 +1,26 @@
+-- Incidents: concurrent alerts on one connection grouped into one record
+
+-- An incident opens with the first alert on a connection that has no active
+-- incident, collects every alert opened on that connection while it is
+-- active, and resolves once none of its alerts are active any more.
+CREATE TABLE incidents (
+    id SERIAL PRIMARY KEY,
+    connection_id INTEGER NOT NULL REFERENCES connections(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'active',
+    alert_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    last_alert_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    resolved_at TIMESTAMP WITH TIME ZONE
+);
+
+-- At most one active incident per connection (target of the grouping upsert)
+CREATE UNIQUE INDEX uq_incidents_active_connection ON incidents(connection_id)
+WHERE status = 'active';
+
+-- Keyset pagination, newest first (see app/db/keyset.py)
+CREATE INDEX idx_incidents_created_at ON incidents(created_at DESC, id DESC);
+CREATE INDEX idx_incidents_connection_created_at ON incidents(connection_id, created_at DESC, id DESC);
+
+ALTER TABLE alerts ADD COLUMN incident_id INTEGER REFERENCES incidents(id) ON DELETE SET NULL;
+
+CREATE INDEX idx_alerts_incident ON alerts(incident_id) WHERE incident_id IS NOT NULL;
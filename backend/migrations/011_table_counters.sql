@@ -0,0 +1,10 @@
+-- Last pg_stat_user_tables insert/delete counters per monitored table, so
+-- estimate volume checks report changes since the previous check on the
+-- same replica
+
+CREATE TABLE table_counters (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    n_tup_ins BIGINT NOT NULL,
+    n_tup_del BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
@@ -0,0 +1,10 @@
+-- Seasonal volume models (ANOMALY_DETECTOR=seasonal) per monitored table
+-- Each array holds the 168 hour-of-week buckets followed by the 24 hour-of-day buckets
+
+CREATE TABLE seasonal_models (
+    table_id INTEGER PRIMARY KEY REFERENCES tables(id) ON DELETE CASCADE,
+    bucket_mean REAL[] NOT NULL,
+    bucket_dev REAL[] NOT NULL,
+    bucket_count INTEGER[] NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
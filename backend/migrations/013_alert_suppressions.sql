@@ -0,0 +1,12 @@
+-- Alert suppression windows shared by all worker processes
+
+-- scope is 'connection' or 'table'. Failures inside a window still count
+-- towards alert_state; they just do not open alerts. Expired rows are left
+-- for the next window on the same target to overwrite.
+CREATE TABLE alert_suppressions (
+    scope VARCHAR(20) NOT NULL,
+    target_id INTEGER NOT NULL,
+    reason TEXT,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (scope, target_id)
+);
@@ -4,6 +4,8 @@ Manual worker execution for testing
 
 import asyncio
 import sys
+from app.services.baselines import baseline_service
+from app.services.check_results import check_result_writer
 from app.workers.run_checks import run_scheduled_checks
 
 
@@ -14,7 +16,12 @@ async def main():
         sys.exit(1)
     
     table_id = int(sys.argv[1])
-    await run_scheduled_checks(table_id)
+    try:
+        await run_scheduled_checks(table_id)
+    finally:
+        # Write out buffered check results and changed baselines, as on_shutdown does
+        await check_result_writer.close()
+        await baseline_service.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+"""
+Shared test fakes
+"""
+
+import time
+import pytest
+
+
+class FakeAlertStore:
+    """In-memory stand-in for AlertStore (shared counters, active alerts and suppression windows)"""
+    
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.failures = {}
+        self.active = {}
+        self.suppressions = {}  # {(scope, target_id): (expires_at, reason)}
+        self.next_id = 1
+        self.batches = []
+    
+    def evaluate(self, checks, threshold, grouping_window_seconds):
+        self.batches.append(checks)
+        transitions = []
+        for check in checks:
+            key = (check["table_id"], check["monitor_type"])
+            suppressed = check["failed"] and self.is_suppressed(check["table_id"], check["connection_id"])
+            opened_id = resolved_id = None
+            if check["failed"]:
+                self.failures[key] = self.failures.get(key, 0) + 1
+                if self.failures[key] >= threshold and key not in self.active and not suppressed:
+                    opened_id = self.active[key] = self.next_id
+                    self.next_id += 1
+            else:
+                self.failures[key] = 0
+                resolved_id = self.active.pop(key, None)
+            transitions.append({
+                "table_id": key[0],
+                "monitor_type": key[1],
+                "consecutive_failures": self.failures[key],
+                "suppressed": suppressed,
+                "opened_id": opened_id,
+                "resolved_id": resolved_id,
+                "active_id": self.active.get(key)
+            })
+        return transitions
+    
+    def suppress(self, scope, target_id, reason, seconds):
+        now = self.clock()
+        current = self.suppressions.get((scope, target_id))
+        opened = current is None or current[0] <= now
+        expires_at = now + seconds if opened else max(current[0], now + seconds)
+        self.suppressions[(scope, target_id)] = (expires_at, reason)
+        return opened
+    
+    def unsuppress(self, scope, target_id):
+        self.suppressions.pop((scope, target_id), None)
+    
+    def is_suppressed(self, table_id, connection_id=None):
+        now = self.clock()
+        return any(
+            self.suppressions.get(key, (0.0,))[0] > now
+            for key in (("table", table_id), ("connection", connection_id))
+        )
+    
+    def list_suppressions(self):
+        now = self.clock()
+        return [
+            {"scope": scope, "target_id": target_id, "reason": reason, "seconds_left": expires_at - now}
+            for (scope, target_id), (expires_at, reason) in sorted(self.suppressions.items())
+            if expires_at > now
+        ]
+
+
+@pytest.fixture
+def alert_store():
+    """Fresh in-memory alert store"""
+    return FakeAlertStore()
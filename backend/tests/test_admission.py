@@ -0,0 +1,68 @@
+"""
+Tests for admission control
+"""
+
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, AdmissionTimeout
+from app.services.safety import SafetyGuardrails
+
+
+def test_waiters_are_admitted_by_priority():
+    """Test that queued queries run highest priority first once a slot frees up"""
+    async def scenario():
+        controller = AdmissionController(
+            SafetyGuardrails(max_queries_per_minute=100, max_concurrent_queries=1), 1
+        )
+        order = []
+        
+        async def query(name, priority):
+            async with controller.admit(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+        
+        holder = asyncio.create_task(query("first", 0))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(query("low", 0)),
+            asyncio.create_task(query("high", 5)),
+            asyncio.create_task(query("mid", 1)),
+        ]
+        await asyncio.sleep(0)
+        depth = controller.get_stats()["queue_depth"]
+        await asyncio.gather(holder, *waiters)
+        return order, depth, controller
+    
+    order, depth, controller = asyncio.run(scenario())
+    
+    assert order == ["first", "high", "mid", "low"]
+    assert depth == 3
+    stats = controller.get_stats()
+    assert stats["admitted"] == 4
+    assert stats["waited"] == 3
+    assert stats["queue_depth"] == 0
+    assert controller.guardrails.get_stats(1)["in_flight"] == 0
+
+
+def test_admission_times_out_only_at_deadline():
+    """Test that a query waits for rate budget and is rejected once its deadline passes"""
+    async def scenario():
+        guardrails = SafetyGuardrails(max_queries_per_minute=1, max_concurrent_queries=5)
+        controller = AdmissionController(guardrails, 1)
+        loop = asyncio.get_running_loop()
+        
+        async with controller.admit():
+            pass
+        
+        started = loop.time()
+        with pytest.raises(AdmissionTimeout):
+            async with controller.admit(deadline=loop.time() + 0.05):
+                pass
+        return loop.time() - started, controller.get_stats(), guardrails.get_stats(1)
+    
+    waited, stats, guardrails_stats = asyncio.run(scenario())
+    
+    assert waited >= 0.05
+    assert stats["timeouts"] == 1
+    assert guardrails_stats["rejected_by_reason"] == {"deadline": 1}
+    assert stats["queue_depth"] == 0
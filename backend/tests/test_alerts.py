@@ -2,30 +2,125 @@
 Tests for alert service
 """
 
+import asyncio
 import pytest
-from app.services.alerts import AlertService
-from app.models.core import MonitorType, CheckStatus
+from app.services.alerts import AlertCheck, AlertService
+from app.models.core import MonitorType
 
 
-def test_alert_service_initialization():
+def test_alert_service_initialization(alert_store):
     """Test that alert service initializes correctly"""
-    service = AlertService()
+    service = AlertService(store=alert_store)
     assert service is not None
 
 
-def test_should_alert_on_consecutive_failures():
-    """Test that alerts are created after threshold failures"""
-    service = AlertService()
-    table_id = 1
-    monitor_type = MonitorType.VOLUME
+def test_alerts_on_consecutive_failures(alert_store):
+    """Test that alerts are created after threshold failures and resolved by a success"""
+    service = AlertService(store=alert_store)
+    failure = AlertCheck(1, MonitorType.VOLUME, failed=True, message="zero rows")
+    success = AlertCheck(1, MonitorType.VOLUME, failed=False)
     
     # First failure - should not alert
-    assert not service.should_alert(table_id, monitor_type, CheckStatus.FAILURE, threshold=2)
+    [transition] = asyncio.run(service.evaluate([failure], threshold=2))
+    assert transition["opened_id"] is None
+    assert service.is_failing(1)
+    assert (1, "volume") not in service._active_alerts
     
     # Second failure - should alert
-    assert service.should_alert(table_id, monitor_type, CheckStatus.FAILURE, threshold=2)
+    [transition] = asyncio.run(service.evaluate([failure], threshold=2))
+    assert transition["opened_id"] == 1
+    assert (1, "volume") in service._active_alerts
     
-    # Success resets counter
-    service.should_alert(table_id, monitor_type, CheckStatus.SUCCESS, threshold=2)
-    assert not service.should_alert(table_id, monitor_type, CheckStatus.FAILURE, threshold=2)
+    # Further failures keep the same alert
+    [transition] = asyncio.run(service.evaluate([failure], threshold=2))
+    assert transition["opened_id"] is None
+    assert transition["active_id"] == 1
+    
+    # Success resolves it and resets the counter
+    [transition] = asyncio.run(service.evaluate([success], threshold=2))
+    assert transition["resolved_id"] == 1
+    assert not service.is_failing(1)
+    [transition] = asyncio.run(service.evaluate([failure], threshold=2))
+    assert transition["opened_id"] is None
+
+
+def test_evaluate_is_one_batch_per_call(alert_store):
+    """Test that a batch of outcomes reaches the store once, deduplicated and in key order"""
+    store = alert_store
+    service = AlertService(store=store)
+    
+    asyncio.run(service.evaluate([
+        AlertCheck(2, MonitorType.SCHEMA, failed=True),
+        AlertCheck(1, MonitorType.VOLUME, failed=True),
+        AlertCheck(2, MonitorType.SCHEMA, failed=False),
+    ]))
+    
+    assert len(store.batches) == 1
+    assert [(c["table_id"], c["monitor_type"], c["failed"]) for c in store.batches[0]] == [
+        (1, "volume", True),
+        (2, "schema", False),
+    ]
+
+
+def test_evaluate_survives_store_errors():
+    """Test that a DB outage is logged and leaves the mirrored state alone"""
+    class FailingStore:
+        def evaluate(self, checks, threshold):
+            raise ConnectionError("pulse db down")
+    
+    service = AlertService(store=FailingStore())
+    assert asyncio.run(service.evaluate([AlertCheck(1, MonitorType.VOLUME, failed=True)])) == []
+    assert not service.is_failing(1)
+
 
+def test_suppressed_failures_are_counted_but_not_alerted(alert_store):
+    """Test that suppressed failures bump counters without alerting, and alert once the window ends"""
+    now = [0.0]
+    alert_store.clock = lambda: now[0]
+    service = AlertService(store=alert_store)
+    
+    asyncio.run(service.evaluate([AlertCheck(1, MonitorType.VOLUME, failed=True, connection_id=10)], threshold=1))
+    assert (1, "volume") in service._active_alerts
+    
+    service.suppress_connection(10, "replica lag 120s", seconds=60)
+    service.suppress_alerts(3, "maintenance", seconds=30)
+    asyncio.run(service.evaluate([
+        AlertCheck(1, MonitorType.VOLUME, failed=False, connection_id=10),
+        AlertCheck(2, MonitorType.VOLUME, failed=True, connection_id=10),
+        AlertCheck(3, MonitorType.VOLUME, failed=True, connection_id=20),
+        AlertCheck(4, MonitorType.VOLUME, failed=True, connection_id=20),
+    ], threshold=1))
+    
+    assert [c["table_id"] for c in alert_store.batches[-1]] == [1, 2, 3, 4]
+    assert (1, "volume") not in service._active_alerts
+    assert (2, "volume") not in service._active_alerts
+    assert (4, "volume") in service._active_alerts
+    assert service.is_failing(2)
+    assert service.suppressed_failures == 2
+    assert set(service.get_suppressions()["connections"]) == {10}
+    
+    # Windows expire on their own; a failure that outlasts one alerts right away
+    now[0] = 45.0
+    assert not service.is_suppressed(3)
+    assert service.is_suppressed(2, connection_id=10)
+    now[0] = 61.0
+    assert not service.is_suppressed(2, connection_id=10)
+    assert service.get_suppressions()["connections"] == {}
+    
+    asyncio.run(service.evaluate([AlertCheck(2, MonitorType.VOLUME, failed=True, connection_id=10)], threshold=2))
+    assert (2, "volume") in service._active_alerts
+
+
+def test_suppression_window_is_extended_not_shortened(alert_store):
+    """Test that re-suppressing keeps the later expiry"""
+    now = [0.0]
+    alert_store.clock = lambda: now[0]
+    service = AlertService(store=alert_store)
+    
+    service.suppress_connection(10, "replica lag", seconds=60)
+    service.suppress_connection(10, "replica lag", seconds=10)
+    now[0] = 30.0
+    assert service.is_suppressed(1, connection_id=10)
+    
+    service.unsuppress(connection_id=10)
+    assert not service.is_suppressed(1, connection_id=10)
@@ -0,0 +1,283 @@
+"""
+Tests for baseline service
+"""
+
+import asyncio
+import random
+import statistics
+from datetime import datetime, timedelta
+import pytest
+from app.services.anomaly import SeasonalDetector
+from app.services.baselines import BaselineService, RollingStats
+
+
+def make_schema(columns, fingerprint=None):
+    schema = {
+        "columns": [
+            {"name": name, "type": data_type, "nullable": True, "default": None}
+            for name, data_type in columns
+        ]
+    }
+    if fingerprint:
+        schema["fingerprint"] = fingerprint
+    return schema
+
+
+def test_schema_change_detection():
+    """Test that added columns and type changes are detected"""
+    service = BaselineService()
+
+    assert not service.check_schema_change(1, make_schema([("id", "integer")]))
+    assert not service.check_schema_change(1, make_schema([("id", "integer")]))
+    assert service.check_schema_change(1, make_schema([("id", "bigint")]))
+    assert service.check_schema_change(
+        1, make_schema([("id", "bigint"), ("total", "numeric")])
+    )
+
+
+def test_schema_change_skips_diff_when_fingerprint_matches():
+    """Test the fingerprint fast path"""
+    service = BaselineService()
+    service.check_schema_change(1, make_schema([("id", "integer")], "abc"))
+
+    # Same fingerprint: columns are not compared at all
+    assert not service.check_schema_change(1, {"columns": [], "fingerprint": "abc"})
+    assert service.check_schema_change(1, make_schema([("id", "bigint")], "def"))
+
+
+class FakeBaselineStore:
+    """In-memory stand-in for BaselineStore"""
+
+    def __init__(self, volume=None):
+        self.volume = volume or {}
+        self.schemas = {}
+        self.counters = {}
+        self.seasonal = {}
+        self.load_calls = 0
+        self.fail_loads = False
+        self.saved_rows = []
+
+    def load_volume(self, keys):
+        self.load_calls += 1
+        if self.fail_loads:
+            raise ConnectionError("Pulse DB unavailable")
+        return {key: self.volume[key] for key in keys if key in self.volume}
+
+    def save_volume(self, rows):
+        self.saved_rows.extend(rows)
+        for row in rows:
+            self.volume[row["table_id"]] = row["values"]
+
+    def load_schemas(self, keys):
+        return {key: self.schemas[key] for key in keys if key in self.schemas}
+
+    def save_schemas(self, snapshots):
+        self.schemas.update(snapshots)
+
+    def load_counters(self, keys):
+        return {key: self.counters[key] for key in keys if key in self.counters}
+
+    def save_counters(self, counters):
+        self.counters.update(counters)
+
+    def load_seasonal(self, keys):
+        return {key: self.seasonal[key] for key in keys if key in self.seasonal}
+
+    def save_seasonal(self, models):
+        self.seasonal.update(models)
+
+
+def test_volume_window_running_aggregates():
+    """Test that running aggregates match a full recomputation after evictions"""
+    service = BaselineService(window_size=3)
+    for value in [10, 50, 20, 30, 5]:
+        service.record_volume(1, value)
+
+    baseline = service.get_baseline(1)
+    assert baseline["count"] == 3
+    assert baseline["average"] == pytest.approx((20 + 30 + 5) / 3)
+    assert baseline["min"] == 5
+    assert baseline["max"] == 30
+
+
+def test_baselines_survive_restart_via_store():
+    """Test lazy loading and write-behind flushing through the store"""
+    store = FakeBaselineStore()
+    service = BaselineService(window_size=5, store=store)
+    asyncio.run(service.ensure_loaded([1]))
+    for value in [100, 110, 90]:
+        service.record_volume(1, value)
+    assert service.pending_writes == 1
+
+    asyncio.run(service.flush())
+    assert service.pending_writes == 0
+    assert store.volume[1] == [100, 110, 90]
+
+    restarted = BaselineService(window_size=5, store=store)
+    asyncio.run(restarted.ensure_loaded([1]))
+    asyncio.run(restarted.ensure_loaded([1]))
+
+    assert store.load_calls == 2  # One per service
+    assert restarted.get_baseline(1)["average"] == 100
+
+
+def test_same_named_tables_keep_separate_baselines():
+    """Test that baselines are keyed by table id, not by the (possibly shared) table name"""
+    store = FakeBaselineStore()
+    service = BaselineService(window_size=5, store=store)
+    asyncio.run(service.ensure_loaded([1, 2]))  # public.orders on two connections
+    service.record_volumes([1, 2], [100, 5000])
+    service.check_schema_change(1, make_schema([("id", "integer")]))
+    service.check_schema_change(2, make_schema([("id", "bigint")]))
+    asyncio.run(service.flush())
+
+    assert store.volume == {1: [100], 2: [5000]}
+    restarted = BaselineService(window_size=5, store=store)
+    asyncio.run(restarted.ensure_loaded([2]))
+    assert restarted.get_baseline(2)["average"] == 5000
+    assert not restarted.check_schema_change(2, make_schema([("id", "bigint")]))
+
+
+def test_failed_load_skips_write_behind_until_loaded():
+    """Test that a window recorded after a failed load never overwrites stored history"""
+    store = FakeBaselineStore({1: [100, 100, 100]})
+    service = BaselineService(window_size=5, store=store)
+
+    store.fail_loads = True
+    asyncio.run(service.ensure_loaded([1]))
+    service.record_volume(1, 40)
+    asyncio.run(service.flush())
+    assert store.saved_rows == []
+    assert service.pending_writes == 1
+
+    # The next check loads the history; the new measurement follows it
+    store.fail_loads = False
+    asyncio.run(service.ensure_loaded([1]))
+    asyncio.run(service.flush())
+    assert store.volume[1] == [100, 100, 100, 40]
+
+
+def test_counter_deltas_handle_stats_reset():
+    """Test that cumulative insert/delete counters become per-check deltas across restarts"""
+    store = FakeBaselineStore()
+    service = BaselineService(store=store)
+    asyncio.run(service.ensure_loaded([1]))
+    assert service.record_counters(1, 100, 10) == (None, None)
+    assert service.record_counters(1, 150, 12) == (50, 2)
+    asyncio.run(service.flush())
+
+    restarted = BaselineService(store=store)
+    asyncio.run(restarted.ensure_loaded([1]))
+    assert restarted.record_counters(1, 160, 12) == (10, 0)
+
+    # pg_stat_reset(): counters restart from zero
+    assert restarted.record_counters(1, 7, 1) == (7, 1)
+
+
+def test_counter_deltas_are_per_table():
+    """Test that same-named tables on two replicas never diff each other's counters"""
+    store = FakeBaselineStore()
+    service = BaselineService(store=store)
+    asyncio.run(service.ensure_loaded([1, 2]))
+    service.record_counters(1, 100, 10)
+    service.record_counters(2, 90000, 500)
+    assert service.record_counters(1, 120, 10) == (20, 0)
+    assert service.record_counters(2, 90005, 501) == (5, 1)
+    asyncio.run(service.flush())
+    assert store.counters == {1: (120, 10), 2: (90005, 501)}
+
+
+def test_rolling_stats_matches_recomputation():
+    """Test Welford and monotonic-deque statistics against brute force"""
+    rng = random.Random(7)
+    stats = RollingStats(window_size=8)
+    history = []
+    for _ in range(200):
+        value = rng.randint(0, 10_000)
+        stats.append(value)
+        history.append(value)
+        window = history[-8:]
+
+        result = stats.stats()
+        assert stats.values() == window
+        assert result["min"] == min(window)
+        assert result["max"] == max(window)
+        assert result["average"] == pytest.approx(statistics.fmean(window))
+        assert result["stddev"] == pytest.approx(statistics.pstdev(window), rel=1e-6, abs=1e-6)
+
+
+def test_seasonal_detector_learns_daily_cycle():
+    """Test that a regular daily cycle is not flagged but a spike is"""
+    service = BaselineService(detector_mode="seasonal")
+    start = datetime(2024, 1, 1)
+
+    def daily_volume(at):
+        return 1000 if 9 <= at.hour < 18 else 100  # Busy during the day
+
+    for hour in range(24 * 14):
+        at = start + timedelta(hours=hour)
+        service.record_volumes([2], [daily_volume(at)], at=at)
+
+    morning = start + timedelta(days=14, hours=9)
+    flags = service.detect_volume_anomalies(
+        [2] * 2, [1000, 10000], at=morning
+    )
+    assert flags == [False, True]
+
+    # The fixed 30% rule would flag the normal morning ramp-up
+    baseline = service.get_baseline(2)
+    assert BaselineService._exceeds_threshold(1000, baseline, 0.3)
+
+
+def test_seasonal_model_survives_restart_via_store():
+    """Test that the seasonal buckets are flushed and reloaded with the other baselines"""
+    store = FakeBaselineStore()
+    service = BaselineService(detector_mode="seasonal", store=store)
+    asyncio.run(service.ensure_loaded([2]))
+    start = datetime(2024, 1, 1)
+    for day in range(4):
+        at = start + timedelta(days=day, hours=9)
+        service.record_volumes([2], [1000], at=at)
+    asyncio.run(service.flush())
+    assert len(store.seasonal[2]["count"]) == 24 * 7 + 24
+
+    restarted = BaselineService(detector_mode="seasonal", store=store)
+    asyncio.run(restarted.ensure_loaded([2]))
+    morning = start + timedelta(days=4, hours=9)
+    scores = restarted.seasonal.score([2], [1000], morning)
+    assert scores[0] == 0
+    assert restarted.detect_volume_anomalies([2], [10000], at=morning) == [True]
+
+
+def test_seasonal_models_are_per_table():
+    """Test that same-named tables on two replicas get separate seasonal models"""
+    store = FakeBaselineStore()
+    service = BaselineService(detector_mode="seasonal", store=store)
+    asyncio.run(service.ensure_loaded([1, 2]))
+    start = datetime(2024, 1, 1)
+    for day in range(4):
+        service.record_volumes([1, 2], [1000, 10], at=start + timedelta(days=day, hours=9))
+    asyncio.run(service.flush())
+    assert set(store.seasonal) == {1, 2}
+
+    restarted = BaselineService(detector_mode="seasonal", store=store)
+    asyncio.run(restarted.ensure_loaded([1, 2]))
+    morning = start + timedelta(days=4, hours=9)
+    assert restarted.detect_volume_anomalies([1, 2], [1000, 10], at=morning) == [False, False]
+    assert restarted.detect_volume_anomalies([1, 2], [10, 1000], at=morning) == [True, True]
+
+
+def test_seasonal_detector_scores_large_batches():
+    """Test vectorized scoring across many tables in one call"""
+    detector = SeasonalDetector(min_samples=1)
+    keys = [f"public.t{i}" for i in range(50_000)]
+    at = datetime(2024, 1, 1, 12)
+
+    detector.update(keys, [100.0] * len(keys), at)
+    detector.update(keys, [110.0] * len(keys), at)
+    values = [105.0] * (len(keys) - 1) + [1_000_000.0]
+
+    flags = detector.is_anomaly(keys, values, at)
+    assert flags.shape == (50_000,)
+    assert flags.sum() == 1
+    assert flags[-1]
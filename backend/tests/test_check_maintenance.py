@@ -0,0 +1,67 @@
+"""
+Tests for checks table partitioning and rollups
+"""
+
+from datetime import date, datetime, timezone
+from app.config import settings
+from app.db.check_store import partition_day, partition_name
+from app.services.check_maintenance import CheckMaintenanceService, plan_partitions
+
+
+class FakePartitionStore:
+    """Keeps partition names in memory and records calls in order"""
+    
+    def __init__(self, partitions):
+        self.partitions = set(partitions)
+        self.calls = []
+    
+    def list_partitions(self):
+        return list(self.partitions)
+    
+    def create_partitions(self, days):
+        self.calls.append("create")
+        self.partitions.update(partition_name(day) for day in days)
+    
+    def rollup(self, start, end):
+        self.calls.append(("rollup", start, end))
+    
+    def drop_partitions(self, names):
+        self.calls.append("drop")
+        self.partitions.difference_update(names)
+
+
+def test_partition_names_round_trip():
+    """Test that partition names encode their UTC day"""
+    assert partition_name(date(2024, 3, 9)) == "checks_20240309"
+    assert partition_day("checks_20240309") == date(2024, 3, 9)
+
+
+def test_plan_creates_ahead_and_drops_past_retention():
+    """Test that missing future partitions are created and expired ones dropped"""
+    existing = ["checks_20240101", "checks_20240108", "checks_20240110", "checks_default_x"]
+    plan = plan_partitions(existing, date(2024, 1, 10), days_ahead=2, retention_days=2)
+    
+    assert plan["create"] == [date(2024, 1, 9), date(2024, 1, 11), date(2024, 1, 12)]
+    assert plan["drop"] == ["checks_20240101"]
+
+
+def test_maintain_rolls_up_before_dropping(monkeypatch):
+    """Test that a maintenance pass creates, rolls up, then drops partitions"""
+    monkeypatch.setattr(settings, "CHECKS_RETENTION_DAYS", 3)
+    monkeypatch.setattr(settings, "CHECKS_PARTITION_DAYS_AHEAD", 1)
+    monkeypatch.setattr(settings, "CHECK_ROLLUP_LOOKBACK_HOURS", 2)
+    
+    store = FakePartitionStore(["checks_20240101", "checks_20240110"])
+    now = datetime(2024, 1, 10, 14, 25, tzinfo=timezone.utc)
+    service = CheckMaintenanceService(store=store, clock=lambda: now)
+    service.maintain()
+    
+    assert store.calls[0] == "create"
+    assert store.calls[1] == (
+        "rollup",
+        datetime(2024, 1, 10, 12, tzinfo=timezone.utc),
+        datetime(2024, 1, 10, 15, tzinfo=timezone.utc)
+    )
+    assert store.calls[2] == "drop"
+    assert sorted(store.partitions) == ["checks_20240109", "checks_20240110", "checks_20240111"]
+    assert service.get_stats()["partitions_dropped"] == 1
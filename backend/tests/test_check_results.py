@@ -0,0 +1,63 @@
+"""
+Tests for write-behind check result buffering
+"""
+
+import asyncio
+from app.services.check_results import CheckResultWriter
+
+
+class FakeResultStore:
+    """Records bulk writes; can be told to fail"""
+    
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+    
+    def save(self, rows):
+        if self.fail:
+            raise ConnectionError("pulse db down")
+        self.batches.append(list(rows))
+
+
+def rows(n, start=0):
+    return [{"table_id": i} for i in range(start, start + n)]
+
+
+def test_flushes_in_bulk_on_size_trigger():
+    """Test that results are written in one batch once flush_size is reached"""
+    store = FakeResultStore()
+    writer = CheckResultWriter(store, flush_size=5, max_buffered=100)
+    
+    async def scenario():
+        await writer.add(rows(3))
+        assert store.batches == []
+        await writer.add(rows(3, start=3))
+        await writer.close()
+    
+    asyncio.run(scenario())
+    
+    assert [len(batch) for batch in store.batches] == [6]
+    assert writer.get_stats()["written"] == 6
+
+
+def test_full_buffer_applies_backpressure_then_drops_oldest():
+    """Test that producers wait for space and drop the oldest rows only after the timeout"""
+    store = FakeResultStore(fail=True)
+    writer = CheckResultWriter(store, flush_size=100, max_buffered=4, enqueue_timeout=0.05)
+    
+    async def scenario():
+        await writer.add(rows(4))
+        await writer.add(rows(2, start=4))
+        return list(writer._buffer)
+    
+    buffered = asyncio.run(scenario())
+    
+    stats = writer.get_stats()
+    assert [row["table_id"] for row in buffered] == [2, 3, 4, 5]
+    assert stats["producer_waits"] == 1
+    assert stats["dropped"] == 2
+    assert stats["failed_flushes"] >= 1
+    
+    store.fail = False
+    asyncio.run(writer.close())
+    assert [row["table_id"] for row in store.batches[0]] == [2, 3, 4, 5]
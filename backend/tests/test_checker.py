@@ -2,9 +2,17 @@
 Tests for checker service
 """
 
+import asyncio
+import psycopg
 import pytest
+from contextlib import asynccontextmanager
+from app.db.replica_db import QueryTimeout, ReplicaConnection, replica_db_manager
+from app.services.admission import AdmissionController
+from app.services.baselines import BaselineService
+from app.config import settings
 from app.services.checker import CheckerService
-from app.models.core import MonitorType
+from app.services.safety import ReplicaLagTracker, SafetyGuardrails
+from app.models.core import MonitorType, CheckSpec, VolumeStrategy
 
 
 def test_checker_service_initialization():
@@ -15,5 +23,180 @@ def test_checker_service_initialization():
     assert service.queries is not None
 
 
-# TODO: Add more tests for check execution, error handling, etc.
+class FakeAsyncCursor:
+    """Async cursor returning a canned row"""
 
+    def __init__(self, row):
+        self.row = row
+        self.executed = []
+
+    async def execute(self, query, params=None):
+        self.executed.append(query)
+
+    async def fetchone(self):
+        return self.row
+
+
+def test_execute_check_awaits_async_queries():
+    """Test that volume checks run through the async query path"""
+    service = CheckerService(BaselineService())
+    cursor = FakeAsyncCursor((42,))
+
+    result = asyncio.run(
+        service._execute_check(cursor, CheckSpec(1, "public", "orders", MonitorType.VOLUME))
+    )
+
+    assert len(cursor.executed) == 1
+    assert result["result_data"]["row_count"] == 42
+
+
+def test_single_schema_check_reports_missing_table():
+    """Test that a dropped table is an error on the single-table path, as in the batch path"""
+    class EmptyCatalogCursor(FakeAsyncCursor):
+        async def fetchall(self):
+            return []
+
+    service = CheckerService(BaselineService())
+    with pytest.raises(ValueError, match="Table public.orders not found"):
+        asyncio.run(service._execute_check(
+            EmptyCatalogCursor(None), CheckSpec(1, "public", "orders", MonitorType.SCHEMA)
+        ))
+
+
+class FakeReplica:
+    """Replica connection stub handing out one fake async connection"""
+
+    run_with_deadline = ReplicaConnection.run_with_deadline
+
+    def __init__(self, cursor):
+        self.cursor_obj = cursor
+        self.guardrails = SafetyGuardrails(max_queries_per_minute=100, max_concurrent_queries=100)
+        self.admission = AdmissionController(self.guardrails, 99)
+        self.connection_id = 99
+        self.lag = ReplicaLagTracker(99)
+        self.lag.update(0)
+
+    @asynccontextmanager
+    async def get_readonly_connection_async(self):
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield self.cursor_obj
+
+    async def rollback(self):
+        pass
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeBatchCursor(FakeAsyncCursor):
+    """Async cursor answering batched probes"""
+
+    async def fetchall(self):
+        return self.row
+
+
+def test_run_checks_batch_counts_one_query_per_statement(monkeypatch):
+    """Test that batched probes share a connection and count as one query"""
+    specs = [
+        CheckSpec(i, "public", f"t{i}", MonitorType.VOLUME) for i in range(3)
+    ]
+    cursor = FakeBatchCursor([(0, None, 5), (1, None, 0), (2, None, 7)])
+    replica = FakeReplica(cursor)
+    monkeypatch.setitem(replica_db_manager._connections, 99, replica)
+
+    results = asyncio.run(CheckerService(BaselineService()).run_checks_batch(99, specs))
+
+    assert len(cursor.executed) == 1
+    assert replica.guardrails.get_stats(99)["queries_last_minute"] == 1
+    assert replica.guardrails.get_stats(99)["in_flight"] == 0
+    assert [r["result_data"]["row_count"] for r in results] == [5, 0, 7]
+    assert results[1]["result_data"]["has_zero_rows"]
+
+
+def test_run_checks_batch_estimates_use_one_catalog_query(monkeypatch):
+    """Test that estimate-strategy volume checks share one catalog query"""
+    specs = [
+        CheckSpec(i, "public", f"t{i}", MonitorType.VOLUME, volume_strategy=VolumeStrategy.ESTIMATE)
+        for i in range(3)
+    ]
+    cursor = FakeBatchCursor([("public", f"t{i}", 100 * i, 0, 0, 0) for i in range(3)])
+    replica = FakeReplica(cursor)
+    monkeypatch.setitem(replica_db_manager._connections, 99, replica)
+
+    service = CheckerService(BaselineService())
+    results = asyncio.run(service.run_checks_batch(99, specs))
+
+    assert len(cursor.executed) == 1
+    assert [r["result_data"]["row_count"] for r in results] == [0, 100, 200]
+    assert results[0]["result_data"]["volume_strategy"] == "estimate"
+    assert results[0]["result_data"]["rows_inserted"] is None
+
+    # Cumulative counters are reported as changes since the previous check
+    cursor.row = [("public", f"t{i}", 100 * i, 0, 10 * i, 1) for i in range(3)]
+    results = asyncio.run(service.run_checks_batch(99, specs))
+    assert [r["result_data"]["rows_inserted"] for r in results] == [0, 10, 20]
+    assert [r["result_data"]["rows_deleted"] for r in results] == [1, 1, 1]
+
+
+class HangingCursor(FakeAsyncCursor):
+    """Async cursor whose query never returns until cancelled"""
+
+    async def execute(self, query, params=None):
+        await asyncio.sleep(3600)
+
+
+def test_run_with_deadline_cancels_runaway_queries(monkeypatch):
+    """Test that a query past its deadline is cancelled server-side and reported as timed out"""
+    monkeypatch.setattr(settings, "QUERY_CANCEL_GRACE_SECONDS", 0.01)
+    replica = FakeReplica(HangingCursor(None))
+    replica.guardrails.query_timeout_seconds = 0.02
+
+    with pytest.raises(QueryTimeout) as raised:
+        asyncio.run(replica.run_with_deadline(replica, replica.cursor_obj.execute("SELECT 1")))
+
+    assert replica.cancelled
+    assert raised.value.elapsed_ms >= 20
+
+    result = CheckerService._timeout_result(raised.value)
+    assert result["result_data"]["timed_out"]
+
+
+def test_run_checks_batch_splits_timed_out_probes(monkeypatch):
+    """Test that a timed-out batch is retried in halves, never table by table"""
+    specs = [CheckSpec(i, "public", f"t{i}", MonitorType.VOLUME) for i in range(8)]
+    replica = FakeReplica(FakeAsyncCursor(None))
+    monkeypatch.setitem(replica_db_manager._connections, 99, replica)
+    service = CheckerService(BaselineService())
+    statements = []
+
+    async def run_probe_batch(cursor, chunk_specs):
+        statements.append(len(chunk_specs))
+        if len(chunk_specs) > 2:
+            raise psycopg.errors.QueryCanceled("canceling statement due to statement timeout")
+        return [spec.table_id for spec in chunk_specs]
+
+    monkeypatch.setattr(service.queries, "run_probe_batch_async", run_probe_batch)
+    results = asyncio.run(service.run_checks_batch(99, specs))
+
+    assert statements == [8, 4, 2, 2, 4, 2, 2]
+    assert [r["result_data"]["row_count"] for r in results] == list(range(8))
+
+    # With no budget left the chunk is reported as timed out in one go
+    monkeypatch.setattr(settings, "BATCH_PROBE_SPLIT_BUDGET_SECONDS", 0)
+    statements.clear()
+    results = asyncio.run(service.run_checks_batch(99, specs))
+
+    assert statements == [8]
+    assert all(r["result_data"]["timed_out"] for r in results)
+
+
+def test_session_options_apply_guardrail_timeouts():
+    """Test that replica sessions carry statement_timeout and lock_timeout"""
+    replica = ReplicaConnection("postgresql://replica", 1, SafetyGuardrails(query_timeout_seconds=3))
+
+    assert "-c statement_timeout=3000" in replica.session_options
+    assert "-c lock_timeout=1500" in replica.session_options
+    assert "default_transaction_read_only=on" in replica.session_options
@@ -0,0 +1,144 @@
+"""
+Tests for pipeline metrics
+"""
+
+import asyncio
+import psycopg
+from datetime import datetime, timedelta, timezone
+import pytest
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED, JobExecutionEvent, JobSubmissionEvent
+from app.api import metrics as api_metrics
+from app.api.metrics import collect_runtime_metrics
+from app.db import pool as pool_module
+from app.db import replica_db
+from app.db.pool import ConnectionPool
+from app.db.replica_db import QueryTimeout, ReplicaConnection, replica_db_manager
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import SchedulerService
+from app.utils.metrics import MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    """Test counters, cumulative histogram buckets and label escaping"""
+    registry = MetricsRegistry()
+    checks = registry.counter("checks_total", "Checks run", ("monitor_type", "status"))
+    latency = registry.histogram("check_seconds", "Check latency", ("monitor_type",), buckets=(0.1, 1.0))
+    
+    checks.inc("volume", "success")
+    checks.inc("volume", "success", amount=2)
+    checks.inc('sch"ema', "error")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "volume")
+    
+    text = registry.render()
+    assert "# TYPE checks_total counter\n" in text
+    assert 'checks_total{monitor_type="volume",status="success"} 3\n' in text
+    assert 'checks_total{monitor_type="sch\\"ema",status="error"} 1\n' in text
+    assert "# TYPE check_seconds histogram\n" in text
+    assert 'check_seconds_bucket{monitor_type="volume",le="0.1"} 2\n' in text
+    assert 'check_seconds_bucket{monitor_type="volume",le="1"} 3\n' in text
+    assert 'check_seconds_bucket{monitor_type="volume",le="+Inf"} 4\n' in text
+    assert 'check_seconds_sum{monitor_type="volume"} 3.65\n' in text
+    assert 'check_seconds_count{monitor_type="volume"} 4\n' in text
+    
+    assert registry.counter("checks_total", "Checks run", ("monitor_type", "status")) is checks
+    with pytest.raises(ValueError):
+        registry.gauge("checks_total", "Checks run")
+    with pytest.raises(ValueError):
+        checks.inc("volume")
+
+
+def test_replica_queries_are_timed_by_outcome():
+    """Test that run_with_deadline records round-trip time for ok and timed-out queries"""
+    replica = ReplicaConnection("postgresql://replica/db", 9001)
+    
+    async def ok():
+        return 1
+    
+    async def cancelled():
+        raise psycopg.errors.QueryCanceled("canceling statement due to statement timeout")
+    
+    async def broken():
+        raise psycopg.OperationalError("server closed the connection")
+    
+    class FakeConn:
+        def cancel(self):
+            pass
+    
+    async def scenario():
+        await replica.run_with_deadline(FakeConn(), ok(), "probe_batch")
+        with pytest.raises(QueryTimeout):
+            await replica.run_with_deadline(FakeConn(), cancelled(), "probe_batch")
+        with pytest.raises(psycopg.OperationalError):
+            await replica.run_with_deadline(FakeConn(), broken(), "probe_batch")
+    
+    asyncio.run(scenario())
+    
+    assert replica_db.QUERIES.get(9001, "probe_batch", "ok") == 1
+    assert replica_db.QUERIES.get(9001, "probe_batch", "timeout") == 1
+    assert replica_db.QUERIES.get(9001, "probe_batch", "error") == 1
+    assert replica_db.QUERY_SECONDS.get(9001, "probe_batch")[0] == 3
+
+
+def test_pool_connects_and_saturation_are_exported(monkeypatch):
+    """Test connect timing, connect failures and scrape-time pool gauges"""
+    fail = [False]
+    
+    class FakeConnection:
+        def close(self):
+            pass
+    
+    def connect():
+        if fail[0]:
+            raise ConnectionError("refused")
+        return FakeConnection()
+    
+    pool = ConnectionPool(connect=connect, max_size=2, name="metrics-test")
+    with pool.connection():
+        fail[0] = True
+        with pytest.raises(ConnectionError):
+            with pool.connection():
+                pass
+    
+    assert pool_module.CONNECT_SECONDS.get("metrics-test")[0] == 1
+    assert pool_module.CONNECT_FAILURES.get("metrics-test") == 1
+    
+    class FakeReplica:
+        def get_pool_stats(self):
+            return {"sync": pool.get_stats()}
+        
+        def get_guardrail_stats(self):
+            return {"in_flight": 1, "rejected_by_reason": {"rate": 4}}
+        
+        def get_admission_stats(self):
+            return {"queue_depth": 3, "timeouts": 2}
+    
+    fake = FakeReplica()
+    fake.lag = type("Lag", (), {"get_stats": lambda self: {"lag_seconds": 1.5}})()
+    monkeypatch.setitem(replica_db_manager._connections, 9002, fake)
+    collect_runtime_metrics()
+    
+    assert api_metrics.POOL_SIZE.get("metrics-test") == 1
+    assert api_metrics.POOL_REQUESTS.get("metrics-test") == 2
+    assert api_metrics.GUARDRAIL_REJECTIONS.get(9002, "rate") == 4
+    assert api_metrics.ADMISSION_QUEUE_DEPTH.get(9002) == 3
+    assert api_metrics.REPLICA_LAG.get(9002) == 1.5
+
+
+def test_scheduler_records_lateness_and_misfires():
+    """Test that submitted jobs observe lateness and coalesced/missed runs count as misfires"""
+    now = datetime.now(timezone.utc)
+    before = scheduler_module.LATENESS_SECONDS.get("check_table")[0]
+    
+    SchedulerService._record_job_event(JobSubmissionEvent(
+        EVENT_JOB_SUBMITTED, "check_table_7", "default", [now - timedelta(seconds=70), now - timedelta(seconds=10)]
+    ))
+    SchedulerService._record_job_event(JobExecutionEvent(
+        EVENT_JOB_MISSED, "flush_baselines", "default", now - timedelta(seconds=90)
+    ))
+    
+    count, total = scheduler_module.LATENESS_SECONDS.get("check_table")
+    assert count == before + 1
+    assert total >= 10
+    assert scheduler_module.MISFIRES.get("check_table", "coalesced") >= 1
+    assert scheduler_module.MISFIRES.get("flush_baselines", "missed") >= 1
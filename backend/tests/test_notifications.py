@@ -0,0 +1,148 @@
+"""
+Tests for the alert notification queue
+"""
+
+import asyncio
+import json
+from app.models.core import MonitorType
+from app.services.alerts import AlertCheck, AlertService
+from app.services.notification_sinks import FileSink
+from app.services.notifications import Notification, NotificationQueue, Recipient, build_digest
+
+
+class RecordingSink:
+    """Collects digests; fails the first `failures` sends"""
+    
+    name = "recording"
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.attempts = 0
+        self.sent = []
+    
+    async def send(self, address, digest):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("relay unavailable")
+        self.sent.append((address, digest))
+
+
+def notification(alert_id, connection_id=10, kind="opened"):
+    return Notification(alert_id, kind, alert_id, connection_id, "volume", f"table {alert_id} failed", "")
+
+
+def make_queue(recipients, **kwargs):
+    options = {"quiet_seconds": 0.02, "max_window_seconds": 1.0, "retry_delay_seconds": 0}
+    options.update(kwargs)
+    return NotificationQueue(recipients=recipients, **options)
+
+
+def test_outage_becomes_one_digest_per_recipient():
+    """Test that hundreds of alerts from one outage are sent as one deduplicated message"""
+    sink = RecordingSink()
+    queue = make_queue([Recipient(sink, "oncall@example.com"), Recipient(sink, "data@example.com")])
+    
+    async def scenario():
+        for alert_id in range(500):
+            queue.enqueue(notification(alert_id))
+        queue.enqueue(notification(0))  # Duplicate within the window
+        await asyncio.sleep(0.1)
+    
+    asyncio.run(scenario())
+    
+    assert sorted(address for address, _ in sink.sent) == ["data@example.com", "oncall@example.com"]
+    digest = sink.sent[0][1]
+    assert digest.subject == "[Pulse] Alerts 500 opened on 1 connection(s)"
+    assert "... and 450 more" in digest.body
+    assert queue.get_stats()["duplicates"] == 1
+
+
+def test_max_window_caps_a_steady_trickle():
+    """Test that a window closes at max_window_seconds even if alerts keep arriving"""
+    sink = RecordingSink()
+    queue = make_queue([Recipient(sink, "oncall")], quiet_seconds=0.05, max_window_seconds=0.1)
+    
+    async def scenario():
+        for alert_id in range(10):
+            queue.enqueue(notification(alert_id))
+            await asyncio.sleep(0.02)
+        await queue.close()
+    
+    asyncio.run(scenario())
+    
+    assert len(sink.sent) == 2
+    assert sum(len(d.by_connection[10]) for _, d in sink.sent) == 10
+
+
+def test_digest_groups_by_connection_and_routes_per_recipient():
+    """Test grouping by connection and recipients limited to some connections"""
+    digest = build_digest([notification(1, 10), notification(2, 20), notification(3, 10, "resolved")], max_lines=5)
+    assert digest.subject == "[Pulse] Alerts 2 opened, 1 resolved on 2 connection(s)"
+    assert digest.body.index("Connection 10: 2 changes on 2 tables") < digest.body.index("Connection 20")
+    
+    everything, only_20 = RecordingSink(), RecordingSink()
+    queue = make_queue([Recipient(everything, "all"), Recipient(only_20, "team-20", frozenset({20}))])
+    
+    async def scenario():
+        queue.enqueue(notification(1, 10))
+        queue.enqueue(notification(2, 20))
+        await queue.close()
+    
+    asyncio.run(scenario())
+    
+    assert list(everything.sent[0][1].by_connection) == [10, 20]
+    assert list(only_20.sent[0][1].by_connection) == [20]
+
+
+def test_failed_sends_are_retried():
+    """Test that a transient sink failure is retried and then delivered"""
+    sink = RecordingSink(failures=2)
+    queue = make_queue([Recipient(sink, "oncall")], retry_attempts=3)
+    
+    async def scenario():
+        queue.enqueue(notification(1))
+        return await queue.flush()
+    
+    assert asyncio.run(scenario()) == 1
+    assert sink.attempts == 3
+    
+    sink = RecordingSink(failures=5)
+    queue = make_queue([Recipient(sink, "oncall")], retry_attempts=2)
+    
+    async def scenario():
+        queue.enqueue(notification(1))
+        return await queue.flush()
+    
+    assert asyncio.run(scenario()) == 0
+    assert queue.get_stats()["failed_sends"] == 1
+
+
+def test_file_sink_writes_json_lines(tmp_path):
+    """Test that the file sink appends one JSON object per digest"""
+    path = tmp_path / "alerts.jsonl"
+    digest = build_digest([notification(1)], max_lines=5)
+    
+    asyncio.run(FileSink().send(str(path), digest))
+    asyncio.run(FileSink().send(str(path), digest))
+    
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["subject"] == digest.subject
+
+
+def test_alert_transitions_are_enqueued(alert_store):
+    """Test that opened and resolved alerts reach the queue with their connection"""
+    sink = RecordingSink()
+    queue = make_queue([Recipient(sink, "oncall")])
+    service = AlertService(store=alert_store, notifier=queue)
+    failure = AlertCheck(1, MonitorType.VOLUME, failed=True, message="zero rows", connection_id=10)
+    
+    async def scenario():
+        await service.evaluate([failure], threshold=1)
+        await service.evaluate([failure._replace(failed=False, message="passing again")], threshold=1)
+        await queue.close()
+    
+    asyncio.run(scenario())
+    
+    [(_, digest)] = sink.sent
+    assert [(n.kind, n.connection_id) for n in digest.by_connection[10]] == [("opened", 10), ("resolved", 10)]
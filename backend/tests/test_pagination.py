@@ -0,0 +1,82 @@
+"""
+Tests for keyset pagination
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import orjson
+import pytest
+from fastapi import HTTPException
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, page_response
+from app.db.keyset import fetch_page
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+        self.description = [SimpleNamespace(name="id"), SimpleNamespace(name="created_at")]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def execute(self, query, params):
+        self.params = params
+    
+    def fetchall(self):
+        return self.rows
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.cursor = FakeCursor(rows)
+    
+    @contextmanager
+    def get_connection(self):
+        yield SimpleNamespace(cursor=lambda: self.cursor)
+
+
+def rows(*ids):
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [{"id": row_id, "created_at": created_at} for row_id in ids]
+
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes to the (created_at, id) of the row it was made from"""
+    row = rows(42)[0]
+    assert decode_cursor(encode_cursor(row)) == (row["created_at"], 42)
+    assert decode_cursor(None) is None
+    
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor")
+    assert error.value.status_code == 400
+
+
+def test_page_response_sets_next_cursor_only_when_more_rows():
+    """Test that the extra row becomes the next cursor and is not returned"""
+    response = page_response(rows(5, 4, 3), limit=2)
+    assert [row["id"] for row in orjson.loads(response.body)] == [5, 4]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER])[1] == 4
+    
+    response = page_response(rows(5, 4), limit=2)
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_fetch_page_binds_filters_and_cursor():
+    """Test that only set filters are bound and one extra row is requested"""
+    db = FakeDB([(3, datetime(2024, 1, 1, tzinfo=timezone.utc))])
+    after = (datetime(2024, 1, 2, tzinfo=timezone.utc), 7)
+    
+    page = fetch_page(db, "SELECT id, created_at FROM alerts", {"table_id": 1, "status": None}, after, 50)
+    
+    assert page == [{"id": 3, "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)}]
+    assert db.cursor.params == {
+        "table_id": 1,
+        "after_created_at": after[0],
+        "after_id": 7,
+        "limit": 51,
+    }
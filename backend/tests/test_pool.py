@@ -0,0 +1,261 @@
+"""
+Tests for connection pools
+"""
+
+import asyncio
+import threading
+import pytest
+from contextlib import contextmanager
+from app.db.pool import AsyncConnectionPool, ConnectionPool, PoolTimeout, SharedLimit
+
+
+class FakeConnection:
+    """Stand-in for a psycopg connection"""
+
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+        self.configured = 0
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    def configure(conn):
+        conn.configured += 1
+
+    pool = ConnectionPool(connect=connect, configure=configure, **kwargs)
+    return pool, created
+
+
+def test_pool_reuses_connections():
+    """Test that idle connections are reused and configured only once"""
+    pool, created = make_pool(max_size=2)
+
+    for _ in range(5):
+        with pool.connection() as conn:
+            assert conn.configured == 1
+
+    stats = pool.get_stats()
+    assert len(created) == 1
+    assert stats["connections_created"] == 1
+    assert stats["hits"] == 4
+    assert stats["in_use"] == 0
+
+
+def test_pool_is_bounded():
+    """Test that the pool never exceeds max_size and times out waiters"""
+    pool, created = make_pool(max_size=1)
+
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection(timeout=0.01):
+                pass
+
+    stats = pool.get_stats()
+    assert len(created) == 1
+    assert stats["waits"] == 1
+    assert stats["timeouts"] == 1
+
+
+def test_pool_waiter_gets_released_connection():
+    """Test that a waiting thread receives a connection when one is returned"""
+    pool, created = make_pool(max_size=1)
+    acquired = threading.Event()
+    got = []
+
+    def worker():
+        acquired.wait()
+        with pool.connection(timeout=2) as conn:
+            got.append(conn)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    with pool.connection():
+        acquired.set()
+        while pool.get_stats()["waits"] == 0:
+            pass
+    thread.join()
+
+    assert got == created
+
+
+def test_pool_recycles_and_discards():
+    """Test lifetime recycling and discarding of broken connections"""
+    pool, created = make_pool(max_size=1, max_lifetime_seconds=0)
+
+    with pool.connection():
+        pass
+    assert created[0].closed
+    assert pool.get_stats()["recycled"] == 1
+
+    pool, created = make_pool(max_size=1)
+    with pool.connection() as conn:
+        conn.broken = True
+    with pool.connection():
+        pass
+    assert len(created) == 2
+    assert pool.get_stats()["discarded"] == 1
+
+
+class FakeAsyncConnection(FakeConnection):
+    """Stand-in for a psycopg AsyncConnection"""
+
+    async def close(self):
+        self.closed = True
+
+
+def test_async_pool_bounds_concurrency():
+    """Test that concurrent tasks share a bounded set of async connections"""
+    created = []
+
+    async def connect():
+        conn = FakeAsyncConnection()
+        created.append(conn)
+        return conn
+
+    async def scenario():
+        pool = AsyncConnectionPool(connect=connect, max_size=2)
+        in_flight = 0
+        peak = 0
+
+        async def task():
+            nonlocal in_flight, peak
+            async with pool.connection(timeout=1):
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.001)
+                in_flight -= 1
+
+        await asyncio.gather(*(task() for _ in range(20)))
+        stats = pool.get_stats()
+        await pool.close()
+        return peak, stats
+
+    peak, stats = asyncio.run(scenario())
+    assert peak == 2
+    assert len(created) == 2
+    assert stats["waits"] > 0
+    assert stats["hits"] == 18
+    assert all(conn.closed for conn in created)
+
+
+def test_pool_prefills_and_reaps_idle():
+    """Test that open() pre-opens min_size and idle connections above it are closed"""
+    pool, created = make_pool(min_size=2, max_size=4, max_idle_seconds=0)
+    pool.open()
+    assert len(created) == 2
+    assert pool.get_stats()["idle"] == 2
+
+    with pool.connection():
+        with pool.connection():
+            with pool.connection():
+                assert pool.get_stats()["utilization"] == 0.75
+
+    # Everything went idle immediately, but min_size connections stay open
+    stats = pool.get_stats()
+    assert stats["size"] == 2
+    assert stats["reaped"] == 1
+    assert stats["peak_in_use"] == 3
+    assert sum(conn.closed for conn in created) == 1
+
+    pool, created = make_pool(min_size=0, max_size=2, max_idle_seconds=0)
+    with pool.connection():
+        pass
+    assert pool.reap() == 0  # Already closed on return
+    assert pool.get_stats()["size"] == 0
+
+
+def test_shared_limit_caps_sync_and_async_pools_together():
+    """Test that two pools on one SharedLimit never open more than its max_size"""
+    limit = SharedLimit(2)
+    sync_pool = ConnectionPool(connect=FakeConnection, max_size=2, limit=limit)
+
+    async def connect():
+        return FakeAsyncConnection()
+
+    async def scenario():
+        async_pool = AsyncConnectionPool(connect=connect, max_size=2, limit=limit)
+        with sync_pool.connection():
+            async with async_pool.connection(timeout=1):
+                assert limit.open == 2
+                with pytest.raises(PoolTimeout):
+                    async with async_pool.connection(timeout=0.1):
+                        pass
+
+        assert limit.open == 2  # Both connections are idle now
+
+        async def hold_two():
+            async with async_pool.connection(timeout=1):
+                async with async_pool.connection(timeout=1):
+                    return limit.open
+
+        task = asyncio.create_task(hold_two())
+        await asyncio.sleep(0.01)
+        assert limit.waiting == 1
+        assert sync_pool.reap() == 1  # The idle sync connection hands its slot over
+        assert await task == 2
+        await async_pool.close()
+
+    asyncio.run(scenario())
+    assert sync_pool.get_stats()["size"] == 0
+    assert limit.open == 0
+    assert limit.waiting == 0
+
+
+def test_pulse_db_commits_and_rolls_back(monkeypatch):
+    """Test that PulseDB borrows pooled connections and ends each transaction"""
+    from app.db.pulse_db import PulseDB
+
+    class FakePulseConnection(FakeConnection):
+        def __init__(self):
+            super().__init__()
+            self.commits = 0
+            self.rollbacks = 0
+
+        def commit(self):
+            self.commits += 1
+
+        def rollback(self):
+            self.rollbacks += 1
+
+        @contextmanager
+        def cursor(self):
+            yield ("cursor", self)
+
+    created = []
+
+    def connect(self):
+        conn = FakePulseConnection()
+        created.append(conn)
+        return conn
+
+    monkeypatch.setattr(PulseDB, "_connect", connect)
+    db = PulseDB("postgresql://unused")
+
+    with db.get_connection() as conn:
+        pass
+    with pytest.raises(ValueError):
+        with db.get_connection():
+            raise ValueError("boom")
+
+    with db.get_cursor() as cur:
+        assert cur == ("cursor", conn)
+
+    assert len(created) == 1
+    assert conn.commits == 2
+    assert conn.rollbacks >= 1
+    stats = db.get_pool_stats()["sync"]
+    assert stats["requests"] == 3
+    assert stats["in_use"] == 0
+
+    asyncio.run(db.close())
+    assert conn.closed
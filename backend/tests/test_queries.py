@@ -3,7 +3,9 @@ Tests for safe queries
 """
 
 import pytest
+from datetime import datetime
 from app.db.queries import SafeQueries
+from app.models.core import CheckSpec, MonitorType
 
 
 def test_safe_queries_initialization():
@@ -19,3 +21,75 @@ def test_safe_queries_initialization():
 
 # TODO: Add integration tests with test database
 
+
+
+class FakeCursor:
+    """Cursor returning canned rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_probe_batch_splits_rows_per_table():
+    """Test that one batched statement is split back into per-spec values"""
+    specs = [
+        CheckSpec(1, "public", "orders", MonitorType.FRESHNESS, "created_at"),
+        CheckSpec(2, "public", "orders", MonitorType.VOLUME),
+        CheckSpec(3, "public", "users", MonitorType.VOLUME),
+    ]
+    ts = datetime(2024, 1, 1, 12, 0)
+    cursor = FakeCursor([(2, None, None), (0, ts, None), (1, None, 10)])
+
+    values = SafeQueries.run_probe_batch(cursor, specs)
+
+    assert len(cursor.executed) == 1
+    assert values == [ts, 10, 0]
+
+
+def test_chunk_probes():
+    """Test that probes are split into statements of bounded size"""
+    chunks = SafeQueries.chunk_probes(list(range(120)), 50)
+    assert [len(c) for c in chunks] == [50, 50, 20]
+
+
+def test_fetch_table_stats_prefers_live_tuples():
+    """Test catalog estimates fall back to reltuples when stats counters are empty"""
+    cursor = FakeCursor([
+        ("public", "orders", 1000, 1200, 50, 5),
+        ("public", "events", 500000000, 0, 0, 0),  # Standby: counters not replicated
+        ("public", "new_table", -1, None, None, None),  # Never analyzed
+    ])
+
+    stats = SafeQueries.fetch_table_stats(
+        cursor, [("public", "orders"), ("public", "events"), ("public", "new_table")]
+    )
+
+    assert len(cursor.executed) == 1
+    assert stats[("public", "orders")]["row_count"] == 1200
+    assert stats[("public", "events")]["row_count"] == 500000000
+    assert stats[("public", "new_table")]["row_count"] == 0
+
+
+def test_fetch_schemas_groups_columns_with_fingerprint():
+    """Test bulk schema fetch splits catalog rows per table"""
+    rows = [
+        ("public", "orders", "id", "integer", False, "nextval('orders_id_seq'::regclass)"),
+        ("public", "orders", "created_at", "timestamp with time zone", True, None),
+        ("public", "users", "id", "bigint", False, None),
+    ]
+
+    schemas = SafeQueries.fetch_schemas(FakeCursor(rows), [("public", "orders"), ("public", "users")])
+    again = SafeQueries.fetch_schemas(FakeCursor(rows), [("public", "orders"), ("public", "users")])
+
+    orders = schemas[("public", "orders")]
+    assert [c["name"] for c in orders["columns"]] == ["id", "created_at"]
+    assert orders["columns"][1]["nullable"]
+    assert orders["fingerprint"] == again[("public", "orders")]["fingerprint"]
+    assert orders["fingerprint"] != schemas[("public", "users")]["fingerprint"]
@@ -0,0 +1,187 @@
+"""
+Tests for grouped check dispatch
+"""
+
+import asyncio
+from types import SimpleNamespace
+from app.db.replica_db import replica_db_manager
+from app.models.core import CheckSpec, CheckStatus, MonitorType
+from app.services.alerts import AlertService
+from app.services.check_results import CheckResultWriter
+from app.services.safety import ReplicaLagTracker
+from app.services.table_status import TableStatusService
+from app.workers.run_checks import CheckDispatcher
+
+
+class FakeTableStore:
+    """In-memory stand-in for TableStore"""
+    
+    def __init__(self, targets):
+        self.targets = targets
+        self.loads = []
+    
+    def load_check_specs(self, table_ids):
+        table_ids = list(table_ids)
+        self.loads.append(table_ids)
+        return [(conn_id, spec) for conn_id, spec in self.targets if spec.table_id in table_ids]
+
+
+class FakeResultStore:
+    def __init__(self):
+        self.rows = []
+    
+    def save(self, rows):
+        self.rows.extend(rows)
+
+
+class FakeStatusStore:
+    def __init__(self):
+        self.updates = []
+    
+    def apply(self, updates):
+        self.updates.extend(updates)
+
+
+class FakeChecker:
+    """Records one batch per connection and returns canned results"""
+    
+    def __init__(self, results):
+        self.results = results
+        self.batches = []
+    
+    async def run_checks_batch(self, connection_id, specs, priority=0):
+        self.batches.append((connection_id, [spec.table_id for spec in specs]))
+        return [self.results[(spec.table_id, spec.monitor_type)] for spec in specs]
+    
+    async def refresh_replica_lag(self, connection_id):
+        self.lag_probes = getattr(self, "lag_probes", 0) + 1
+
+
+def success(**result_data):
+    return {"status": CheckStatus.SUCCESS, "result_data": result_data}
+
+
+def make_dispatcher(alert_store):
+    targets = [
+        (10, CheckSpec(1, "public", "orders", MonitorType.FRESHNESS, "created_at")),
+        (10, CheckSpec(1, "public", "orders", MonitorType.VOLUME)),
+        (10, CheckSpec(2, "public", "users", MonitorType.VOLUME)),
+        (20, CheckSpec(3, "public", "events", MonitorType.SCHEMA)),
+    ]
+    results = {
+        (1, MonitorType.FRESHNESS): success(is_stale=True),
+        (1, MonitorType.VOLUME): success(row_count=10, has_zero_rows=False, is_anomaly=False),
+        (2, MonitorType.VOLUME): success(row_count=0, has_zero_rows=True, is_anomaly=False),
+        (3, MonitorType.SCHEMA): {"status": CheckStatus.SKIPPED, "error_message": "Query budget exceeded", "result_data": {}},
+    }
+    checker = FakeChecker(results)
+    dispatcher = CheckDispatcher(
+        checker=checker,
+        table_store=FakeTableStore(targets),
+        result_writer=CheckResultWriter(FakeResultStore()),
+        alerts=AlertService(store=alert_store),
+        table_status=TableStatusService(store=FakeStatusStore()),
+        coalesce_seconds=0.01
+    )
+    return dispatcher, checker
+
+
+def test_dispatch_groups_checks_by_connection(alert_store):
+    """Test that due tables run as one batch per connection and fan back out"""
+    dispatcher, checker = make_dispatcher(alert_store)
+    
+    async def scenario():
+        by_table = await dispatcher.run([1, 2, 3])
+        await dispatcher.result_writer.flush()
+        return by_table
+    
+    by_table = asyncio.run(scenario())
+    
+    assert sorted(checker.batches) == [(10, [1, 1, 2]), (20, [3])]
+    assert len(by_table[1]) == 2
+    rows = dispatcher.result_writer.store.rows
+    statuses = {(row["table_id"], row["monitor_type"]): row["status"] for row in rows}
+    assert statuses == {
+        (1, "freshness"): "failure",
+        (1, "volume"): "success",
+        (2, "volume"): "failure",
+        (3, "schema"): "skipped",
+    }
+
+
+def test_dispatch_alerts_after_consecutive_failures(alert_store):
+    """Test that failures feed alerting and skips do not"""
+    dispatcher, _ = make_dispatcher(alert_store)
+    
+    asyncio.run(dispatcher.run([1, 2, 3]))
+    assert dispatcher.alerts._active_alerts == {}
+    
+    asyncio.run(dispatcher.run([1, 2, 3]))
+    assert set(dispatcher.alerts._active_alerts) == {(1, "freshness"), (2, "volume")}
+    assert len(dispatcher.alerts.store.batches) == 2  # One alert round trip per dispatch
+    assert all((3, "schema") != (c["table_id"], c["monitor_type"]) for c in dispatcher.alerts.store.batches[0])
+
+
+def test_submissions_in_one_tick_share_a_dispatch(alert_store):
+    """Test that tables submitted together are loaded and run in one dispatch"""
+    dispatcher, checker = make_dispatcher(alert_store)
+    
+    async def scenario():
+        await asyncio.gather(*(dispatcher.submit(table_id) for table_id in (1, 2, 3)))
+    
+    asyncio.run(scenario())
+    
+    assert len(dispatcher.table_store.loads) == 1
+    assert len(checker.batches) == 2
+
+
+def test_dispatch_backs_off_lagging_connections(monkeypatch, alert_store):
+    """Test that paused connections only probe lag and slowed ones run every other time"""
+    dispatcher, checker = make_dispatcher(alert_store)
+    paused = ReplicaLagTracker(10)
+    paused.update(1000)
+    slow = ReplicaLagTracker(20)
+    slow.update(45)
+    monkeypatch.setitem(replica_db_manager._connections, 10, SimpleNamespace(lag=paused))
+    monkeypatch.setitem(replica_db_manager._connections, 20, SimpleNamespace(lag=slow))
+    
+    asyncio.run(dispatcher.run([1, 2, 3]))
+    assert checker.batches == []
+    assert checker.lag_probes == 1
+    
+    asyncio.run(dispatcher.run([1, 2, 3]))
+    assert checker.batches == [(20, [3])]
+
+
+def test_dispatch_updates_table_status(alert_store):
+    """Test that each table's latest results reach the status projection"""
+    dispatcher, _ = make_dispatcher(alert_store)
+    
+    asyncio.run(dispatcher.run([1, 2, 3]))
+    asyncio.run(dispatcher.run([1, 2, 3]))
+    
+    updates = dispatcher.table_status.store.updates
+    latest = {update["table_id"]: update for update in updates}
+    assert len(updates) == 4  # Table 3 was only skipped
+    assert set(latest) == {1, 2}
+    assert {m: check["status"] for m, check in latest[1]["last_checks"].items()} == {
+        "freshness": "failure",
+        "volume": "success",
+    }
+
+
+def test_paused_connection_suppresses_alerts_after_recovery(monkeypatch, alert_store):
+    """Test that a replica that was paused for lag does not alert on its first checks back"""
+    dispatcher, _ = make_dispatcher(alert_store)
+    lag = ReplicaLagTracker(10)
+    lag.update(1000)
+    monkeypatch.setitem(replica_db_manager._connections, 10, SimpleNamespace(lag=lag))
+    
+    asyncio.run(dispatcher.run([1, 2]))
+    assert dispatcher.alerts.is_suppressed(1, connection_id=10)
+    
+    lag.update(0)
+    asyncio.run(dispatcher.run([1, 2]))
+    asyncio.run(dispatcher.run([1, 2]))
+    assert dispatcher.alerts._active_alerts == {}
+    assert dispatcher.alerts.suppressed_failures == 4
@@ -0,0 +1,129 @@
+"""
+Tests for safety guardrails
+"""
+
+import asyncio
+import threading
+import pytest
+from app.services.safety import (
+    AsyncSlidingWindowLimiter, BackpressureState, QueryBudgetExceeded,
+    ReplicaLagTracker, SafetyGuardrails, SlidingWindowLimiter
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+def test_sliding_window_expires_old_slots():
+    """Test that capacity frees up slot by slot as the window slides"""
+    clock = FakeClock()
+    limiter = SlidingWindowLimiter(3, window_seconds=60, slots=60, clock=clock)
+    
+    assert limiter.try_acquire()
+    clock.now += 30
+    assert limiter.try_acquire(2)
+    assert not limiter.try_acquire()
+    assert limiter.retry_after() == 30
+    
+    clock.now += 30
+    assert limiter.count() == 2
+    assert limiter.try_acquire()
+    
+    clock.now += 3600
+    assert limiter.count() == 0
+
+
+def test_sliding_window_is_atomic_across_threads():
+    """Test that concurrent reservations never exceed the limit"""
+    limiter = SlidingWindowLimiter(100)
+    granted = []
+    
+    def worker():
+        granted.append(sum(limiter.try_acquire() for _ in range(50)))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert sum(granted) == 100
+    assert limiter.count() == 100
+
+
+def test_async_limiter_waits_for_capacity():
+    """Test that the asyncio limiter waits within its timeout and gives up past it"""
+    async def scenario():
+        limiter = AsyncSlidingWindowLimiter(1, window_seconds=0.2, slots=4)
+        assert await limiter.acquire()
+        assert not await limiter.acquire(timeout=0.01)
+        return await limiter.acquire(timeout=1)
+    
+    assert asyncio.run(scenario())
+
+
+def test_try_reserve_checks_and_records_together():
+    """Test that try_reserve enforces both limits and records only on success"""
+    guardrails = SafetyGuardrails(max_queries_per_minute=2, max_concurrent_queries=5)
+    
+    assert guardrails.try_reserve(1)
+    assert guardrails.try_reserve(1)
+    assert not guardrails.try_reserve(1)
+    stats = guardrails.get_stats(1)
+    assert stats["queries_last_minute"] == 2
+    assert stats["in_flight"] == 2
+    assert stats["rejected_by_reason"] == {"rate": 1}
+    
+    guardrails = SafetyGuardrails(max_queries_per_minute=10, max_concurrent_queries=1)
+    assert guardrails.try_reserve(1)
+    assert not guardrails.try_reserve(1)
+    assert guardrails.get_stats(1)["queries_last_minute"] == 1
+
+
+def test_query_slots_are_released_on_error():
+    """Test that slots come back even when the query fails, so throughput never collapses"""
+    guardrails = SafetyGuardrails(max_queries_per_minute=100, max_concurrent_queries=2)
+    
+    for _ in range(10):
+        with pytest.raises(ValueError):
+            with guardrails.query_slot(1):
+                raise ValueError("query failed")
+    
+    async def scenario():
+        async with guardrails.query_slot_async(1):
+            async with guardrails.query_slot_async(1):
+                with pytest.raises(QueryBudgetExceeded):
+                    async with guardrails.query_slot_async(1):
+                        pass
+    
+    asyncio.run(scenario())
+    
+    stats = guardrails.get_stats(1)
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] == 2
+    assert stats["reserved"] == 12
+    assert stats["rejected_by_reason"] == {"concurrency": 1}
+
+
+def test_lag_tracker_slows_pauses_and_resumes():
+    """Test backpressure transitions, holding the pause until lag is under the threshold"""
+    clock = FakeClock()
+    tracker = ReplicaLagTracker(1, refresh_seconds=30, clock=clock)
+    assert tracker.needs_refresh()
+    
+    assert tracker.update(5) == BackpressureState.NORMAL
+    assert not tracker.needs_refresh()
+    assert tracker.update(45) == BackpressureState.SLOW
+    assert tracker.update(90) == BackpressureState.PAUSED
+    assert tracker.update(45) == BackpressureState.PAUSED
+    assert tracker.update(10) == BackpressureState.NORMAL
+    
+    clock.now += 30
+    assert tracker.needs_refresh()
+    tracker.record_failure()
+    assert not tracker.needs_refresh()
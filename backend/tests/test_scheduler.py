@@ -0,0 +1,147 @@
+"""
+Tests for scheduler service
+"""
+
+import asyncio
+import pytest
+from app.db.job_store import ClaimedCheck
+from app.services import scheduler as scheduler_module
+from app.services.placement import PhasePlanner, expected_qps_histogram
+from app.services.scheduler import SchedulerService
+
+
+class FakeScheduleStore:
+    """In-memory stand-in for CheckScheduleStore"""
+    
+    def __init__(self, due):
+        self.due = list(due)
+        self.completed = []
+        self.upserted = []
+    
+    def claim_due(self, worker_id, limit, lease_seconds):
+        claimed, self.due = self.due[:limit], self.due[limit:]
+        return claimed
+    
+    def complete(self, worker_id, table_ids):
+        self.completed.extend(table_ids)
+    
+    def upsert(self, table_id, interval_minutes):
+        self.upserted.append((table_id, interval_minutes))
+
+
+def test_durable_dispatch_runs_and_releases_claimed_tables(monkeypatch):
+    """Test that claimed tables are dispatched together and their leases released"""
+    store = FakeScheduleStore([ClaimedCheck(1, 10), ClaimedCheck(2, 10), ClaimedCheck(3, 20)])
+    service = SchedulerService(job_store=store)
+    dispatched = []
+    
+    class FakeDispatcher:
+        async def run(self, table_ids):
+            dispatched.append(list(table_ids))
+            raise RuntimeError("replica down")
+    
+    monkeypatch.setattr(scheduler_module, "check_dispatcher", FakeDispatcher())
+    asyncio.run(service.dispatch_due_checks())
+    asyncio.run(service.dispatch_due_checks())
+    
+    assert dispatched == [[1, 2, 3]]
+    assert sorted(store.completed) == [1, 2, 3]
+
+
+def test_durable_schedule_writes_to_store():
+    """Test that scheduling in durable mode goes to the job store, not APScheduler"""
+    store = FakeScheduleStore([])
+    service = SchedulerService(job_store=store)
+    
+    service.schedule_table_check(7, 5, 10)
+    
+    assert store.upserted == [(7, 5)]
+    assert service.scheduler.get_job("check_table_7") is None
+
+
+def test_memory_schedules_restored_from_tables():
+    """Test that the memory store re-places every table on startup from one bulk read"""
+    class FakeTableStore:
+        calls = 0
+        
+        def list_schedules(self):
+            self.calls += 1
+            return [(1, 10, 1), (2, 10, 1), (3, 10, 1), (4, 20, 5)]
+    
+    table_store = FakeTableStore()
+    service = SchedulerService(table_store=table_store)
+    asyncio.run(service.restore_schedules())
+    
+    assert table_store.calls == 1
+    assert all(service.scheduler.get_job(f"check_table_{table_id}") for table_id in range(1, 5))
+    assert sorted(offset for _, offset in service.planner.placements(10)) == [0, 20, 40]
+    assert service.planner.placements(20) == [(300, 0)]
+
+
+def test_phase_planner_spreads_and_rebalances():
+    """Test that tables on a connection are spread evenly and rebalanced on removal"""
+    planner = PhasePlanner()
+    for table_id in range(1, 5):
+        planner.add(table_id, 10, 60)
+    planner.add(99, 20, 60)
+    
+    assert sorted(offset for _, offset in planner.placements(10)) == [0, 15, 30, 45]
+    assert planner.placements(20) == [(60, 0)]
+    
+    changed = planner.remove(2)
+    
+    assert sorted(offset for _, offset in planner.placements(10)) == [0, 20, 40]
+    assert 99 not in changed
+
+
+def test_phase_planner_interleaves_interval_groups():
+    """Test that groups with different intervals don't share a phase"""
+    planner = PhasePlanner()
+    planner.add(1, 10, 60)
+    planner.add(2, 10, 300)
+    
+    assert planner.placement(1) == (60, 0)
+    assert planner.placement(2) == (300, 150)
+
+
+def test_phase_planner_snaps_offsets_to_dispatch_slots():
+    """Test that offsets land on slot boundaries so close tables share a dispatch"""
+    planner = PhasePlanner(slot_seconds=5)
+    for table_id in range(7):
+        planner.add(table_id, 10, 60)
+    
+    offsets = sorted(offset for _, offset in planner.placements(10))
+    assert offsets == [0, 5, 15, 25, 30, 40, 50]
+    
+    for table_id in range(7, 30):
+        planner.add(table_id, 10, 60)
+    offsets = [offset for _, offset in planner.placements(10)]
+    assert all(offset % 5 == 0 for offset in offsets)
+    assert len(set(offsets)) == 12  # 30 tables share 12 slots
+
+
+def test_expected_qps_histogram_flattens_with_placement():
+    """Test that spread placements lower the expected peak QPS"""
+    herd = expected_qps_histogram([(60, 0)] * 6, bucket_seconds=10)
+    spread = expected_qps_histogram([(60, offset) for offset in range(0, 60, 10)], bucket_seconds=10)
+    
+    assert herd["peak_qps"] == 0.6
+    assert spread["peak_qps"] == 0.1
+    assert herd["mean_qps"] == pytest.approx(spread["mean_qps"])
+
+
+def test_memory_schedule_uses_planned_phase():
+    """Test that in-memory jobs fire on their planned offsets"""
+    service = SchedulerService()
+    
+    service.schedule_table_check(1, 1, connection_id=10)
+    service.schedule_table_check(2, 1, connection_id=10)
+    
+    trigger = service.scheduler.get_job("check_table_2").trigger
+    assert trigger.start_date.timestamp() % 60 == 30
+    assert service.expected_load(10)["tables"] == 2
+    
+    service.unschedule_table_check(1)
+    
+    assert service.scheduler.get_job("check_table_1") is None
+    assert service.scheduler.get_job("check_table_2").trigger.start_date.timestamp() % 60 == 0
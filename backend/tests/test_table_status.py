@@ -0,0 +1,72 @@
+"""
+Tests for the table status cache
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from app.services.table_status import TableStatusService
+
+
+class FakeStatusStore:
+    """Serves status rows from a dict and counts loads"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.loads = []
+        self.updates = []
+    
+    def load(self, table_ids):
+        self.loads.append(sorted(table_ids))
+        return {table_id: dict(self.rows[table_id]) for table_id in table_ids if table_id in self.rows}
+    
+    def apply(self, updates):
+        self.updates.extend(updates)
+
+
+def status_row(table_id, status="green"):
+    return {"id": table_id, "status": status, "last_check_at": None, "last_checks": {}, "active_alert_count": 0}
+
+
+def test_reads_through_and_caches():
+    """Test that misses are loaded in one query and hits are served from memory"""
+    store = FakeStatusStore({1: status_row(1), 2: status_row(2)})
+    service = TableStatusService(store=store, ttl_seconds=60)
+    
+    async def scenario():
+        first = await service.get_many([1, 2, 3])
+        second = await service.get(1)
+        return first, second
+    
+    first, second = asyncio.run(scenario())
+    
+    assert set(first) == {1, 2}
+    assert second["status"] == "green"
+    assert store.loads == [[1, 2, 3]]
+    assert service.get_stats()["hits"] == 1
+
+
+def test_new_results_invalidate_cached_status():
+    """Test that recording results writes one update per table and drops its cache entry"""
+    store = FakeStatusStore({1: status_row(1)})
+    service = TableStatusService(store=store, ttl_seconds=60)
+    executed_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {"table_id": 1, "monitor_type": "volume", "status": "failure", "error_message": None, "executed_at": executed_at},
+        {"table_id": 1, "monitor_type": "schema", "status": "skipped", "error_message": None, "executed_at": executed_at},
+    ]
+    
+    async def scenario():
+        await service.get(1)
+        store.rows[1] = status_row(1, "yellow")
+        await service.record_results(rows)
+        return await service.get(1)
+    
+    status = asyncio.run(scenario())
+    
+    assert status["status"] == "yellow"
+    assert len(store.loads) == 2
+    assert store.updates == [{
+        "table_id": 1,
+        "last_checks": {"volume": {"status": "failure", "executed_at": executed_at.isoformat(), "error_message": None}},
+        "last_check_at": executed_at.isoformat()
+    }]